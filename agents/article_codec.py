@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+文章正文压缩（基于自有语料训练的字典）
+生成的文章高度重复：相同的标题层级、FAQ 骨架、对比表格、SMZDM 话术。
+用这些文章训练一个压缩字典，再用字典压缩每篇正文，单篇短文本也能得到很高的压缩比。
+
+- 后端：已安装 zstandard 时使用 zstd 字典压缩，否则回退到 zlib 预置字典（zdict，最多 32KB）
+- 版本：每次训练生成新版本字典（output/dicts/v<版本>.<后端>.dict），旧版本保留，
+  压缩块头部记录后端与字典版本，旧数据在重新训练后仍可解压；版本 0 表示不用字典
+- 压缩块格式：b"GZ" + 后端标记（1 字节）+ 字典版本（2 字节，大端）+ 压缩数据
+- 文章记录：content 压缩后存为 content_z（base85 文本，可直接放进 JSON），
+  读取时只有真正需要 content 时才解压
+
+配置（.env 或环境变量）：
+- GEO_ARTICLE_COMPRESS：off / history（只压缩 api/data/articles.json，默认）/ all（output/articles 也压缩）
+- GEO_ARTICLE_DICT_DIR：字典目录，默认 output/dicts
+
+用法：
+    python agents/article_codec.py train               # 用现有文章训练新版本字典
+    python agents/article_codec.py train --recompress  # 训练后用新字典重写 articles.json
+    python agents/article_codec.py stats               # 查看当前字典与压缩比
+"""
+
+import base64
+import os
+import sys
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.serializer import dump_file, load_file
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard 为可选依赖
+    zstandard = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DICT_DIR = os.path.join(ROOT_DIR, "output", "dicts")
+HISTORY_FILE = os.path.join(ROOT_DIR, "api", "data", "articles.json")
+
+MAGIC = b"GZ"
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+HEADER_SIZE = 5
+ZLIB_DICT_LIMIT = 32 * 1024
+DEFAULT_DICT_SIZE = 64 * 1024
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+# 训练所需的最少文章数
+MIN_TRAIN_SAMPLES = 20
+
+
+def compression_mode() -> str:
+    load_dotenv()
+    return os.environ.get("GEO_ARTICLE_COMPRESS", "history").lower()
+
+
+def _fragments(text: str) -> Iterable[str]:
+    """zlib 字典的候选片段：整行 + 按中文标点切分的短语"""
+    for line in text.splitlines():
+        line = line.rstrip()
+        if len(line) >= 4:
+            yield line
+        start = 0
+        for i, ch in enumerate(line):
+            if ch in "，。！？：；、,.!?:;":
+                if i + 1 - start >= 4:
+                    yield line[start:i + 1].strip()
+                start = i + 1
+
+
+def train_zlib_dictionary(samples: List[str], size: int = ZLIB_DICT_LIMIT) -> bytes:
+    """
+    zlib 没有字典训练器：统计在多篇文章中出现的行和短语，按 文档频次 × 长度 打分，
+    高分片段放在字典末尾（离待压缩数据最近，引用距离最短）
+    """
+    size = min(size, ZLIB_DICT_LIMIT)
+    df: Counter = Counter()
+    for text in samples:
+        df.update(set(_fragments(text)))
+    ranked = sorted(
+        (frag for frag, n in df.items() if n >= 2),
+        key=lambda frag: df[frag] * len(frag.encode("utf-8")),
+        reverse=True,
+    )
+    chosen, total = [], 0
+    for frag in ranked:
+        data = (frag + "\n").encode("utf-8")
+        if total + len(data) > size:
+            continue
+        chosen.append(data)
+        total += len(data)
+    return b"".join(reversed(chosen))
+
+
+class ArticleCodec:
+    """
+    用法：
+        codec = get_article_codec()
+        blob = codec.compress(text)
+        text = codec.decompress(blob)
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        load_dotenv()
+        self.directory = directory or os.environ.get("GEO_ARTICLE_DICT_DIR") or DEFAULT_DICT_DIR
+        self._lock = threading.Lock()
+        self._dicts: Dict[Tuple[bytes, int], bytes] = {}
+        self._current: Optional[Dict] = None
+
+    # -- 字典 ----------------------------------------------------------------
+
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.directory, "current.json")
+
+    def current(self) -> Dict:
+        """当前字典信息；还没训练过时为版本 0（不用字典）"""
+        if self._current is None:
+            if os.path.exists(self.current_path):
+                self._current = load_file(self.current_path)
+            else:
+                self._current = {"version": 0, "codec": "zstd" if zstandard is not None else "zlib"}
+        return self._current
+
+    @staticmethod
+    def _codec_flag(name: str) -> bytes:
+        return CODEC_ZSTD if name == "zstd" else CODEC_ZLIB
+
+    def _dict_path(self, flag: bytes, version: int) -> str:
+        name = "zstd" if flag == CODEC_ZSTD else "zlib"
+        return os.path.join(self.directory, f"v{version}.{name}.dict")
+
+    def _dictionary(self, flag: bytes, version: int) -> Optional[bytes]:
+        if version == 0:
+            return None
+        key = (flag, version)
+        with self._lock:
+            data = self._dicts.get(key)
+            if data is None:
+                with open(self._dict_path(flag, version), "rb") as f:
+                    data = self._dicts[key] = f.read()
+            return data
+
+    def train(self, samples: List[str], size: int = DEFAULT_DICT_SIZE) -> Dict:
+        """用文章正文训练新版本字典并设为当前版本"""
+        if len(samples) < MIN_TRAIN_SAMPLES:
+            raise ValueError(f"训练字典至少需要 {MIN_TRAIN_SAMPLES} 篇文章，当前 {len(samples)} 篇")
+        os.makedirs(self.directory, exist_ok=True)
+        if zstandard is not None:
+            codec = "zstd"
+            data = zstandard.train_dictionary(size, [s.encode("utf-8") for s in samples]).as_bytes()
+        else:
+            codec = "zlib"
+            data = train_zlib_dictionary(samples, size)
+        version = self.current()["version"] + 1
+        flag = self._codec_flag(codec)
+        with open(self._dict_path(flag, version), "wb") as f:
+            f.write(data)
+        info = {
+            "version": version,
+            "codec": codec,
+            "size": len(data),
+            "samples": len(samples),
+            "trained_at": datetime.now().isoformat(),
+        }
+        dump_file(self.current_path, info, pretty=True)
+        with self._lock:
+            self._dicts[(flag, version)] = data
+            self._current = info
+        return info
+
+    # -- 压缩 ----------------------------------------------------------------
+
+    def compress(self, text: str) -> bytes:
+        info = self.current()
+        flag = self._codec_flag(info["codec"])
+        if flag == CODEC_ZSTD and zstandard is None:
+            # 字典由 zstd 训练但当前环境没有 zstandard：退回无字典的 zlib
+            flag, version = CODEC_ZLIB, 0
+        else:
+            version = info["version"]
+        zdict = self._dictionary(flag, version)
+        raw = text.encode("utf-8")
+        if flag == CODEC_ZSTD:
+            dict_data = zstandard.ZstdCompressionDict(zdict) if zdict else None
+            payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(raw)
+        else:
+            compressor = zlib.compressobj(ZLIB_LEVEL, zdict=zdict) if zdict else zlib.compressobj(ZLIB_LEVEL)
+            payload = compressor.compress(raw) + compressor.flush()
+        return MAGIC + flag + version.to_bytes(2, "big") + payload
+
+    def decompress(self, blob: bytes) -> str:
+        if blob[:2] != MAGIC:
+            raise ValueError("不是压缩的文章数据")
+        flag, version = blob[2:3], int.from_bytes(blob[3:5], "big")
+        zdict = self._dictionary(flag, version)
+        payload = blob[HEADER_SIZE:]
+        if flag == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("该文章使用 zstd 压缩，需要安装 zstandard")
+            dict_data = zstandard.ZstdCompressionDict(zdict) if zdict else None
+            raw = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+        else:
+            decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+            raw = decompressor.decompress(payload) + decompressor.flush()
+        return raw.decode("utf-8")
+
+    # -- 文章记录 --------------------------------------------------------------
+
+    def encode_record(self, article: Dict) -> Dict:
+        """content → content_z；已压缩的记录原样返回"""
+        if "content" not in article:
+            return article
+        record = {k: v for k, v in article.items() if k != "content"}
+        record["content_z"] = base64.b85encode(self.compress(article["content"])).decode("ascii")
+        return record
+
+    def content_of(self, article: Dict) -> str:
+        """读取正文：未压缩的记录直接返回，压缩的记录此时才解压"""
+        if "content" in article:
+            return article["content"]
+        if "content_z" in article:
+            return self.decompress(base64.b85decode(article["content_z"]))
+        return ""
+
+    def decode_record(self, article: Dict) -> Dict:
+        """带 content 的完整记录（用于返回给调用方）"""
+        if "content_z" not in article:
+            return article
+        record = {k: v for k, v in article.items() if k != "content_z"}
+        record["content"] = self.content_of(article)
+        return record
+
+    def recompress(self, articles: List[Dict]) -> List[Dict]:
+        """用当前字典重新压缩所有记录"""
+        return [self.encode_record(self.decode_record(a)) for a in articles]
+
+
+_default_codec: Optional[ArticleCodec] = None
+_codec_lock = threading.Lock()
+
+
+def get_article_codec() -> ArticleCodec:
+    global _default_codec
+    with _codec_lock:
+        if _default_codec is None:
+            _default_codec = ArticleCodec()
+        return _default_codec
+
+
+def collect_samples() -> List[str]:
+    """训练语料：api/data/articles.json 的历史文章 + output/articles 中各商品各策略的最新文章"""
+    from agents.article_output import get_article_index, read_article_text, split_front_matter
+
+    codec = get_article_codec()
+    samples = []
+    if os.path.exists(HISTORY_FILE):
+        samples.extend(codec.content_of(a) for a in load_file(HISTORY_FILE))
+    index = get_article_index()
+    for _, _, entry in index.items():
+        path = index.path_of(entry)
+        if os.path.exists(path):
+            samples.append(split_front_matter(read_article_text(path))[1])
+    return [s for s in samples if s]
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    codec = get_article_codec()
+
+    if command == "train":
+        samples = collect_samples()
+        info = codec.train(samples)
+        print(f"✅ 已训练字典 v{info['version']}（{info['codec']}，{info['size']} 字节，{info['samples']} 篇文章）")
+        if "--recompress" in sys.argv and os.path.exists(HISTORY_FILE):
+            articles = codec.recompress(load_file(HISTORY_FILE))
+            dump_file(HISTORY_FILE, articles)
+            print(f"♻️  已用 v{info['version']} 重新压缩 {len(articles)} 篇历史文章")
+        return
+
+    info = codec.current()
+    print(f"📖 当前字典: v{info['version']}（{info['codec']}）")
+    if os.path.exists(HISTORY_FILE):
+        articles = load_file(HISTORY_FILE)
+        raw = sum(len(codec.content_of(a).encode("utf-8")) for a in articles)
+        stored = sum(len(a["content_z"]) if "content_z" in a else len(a.get("content", "").encode("utf-8")) for a in articles)
+        ratio = raw / stored if stored else 0.0
+        print(f"   历史文章 {len(articles)} 篇：正文 {raw} 字节 → 存储 {stored} 字节（{ratio:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+文章输出层
+- 文件名：{前缀}{类型}_{spu}_{内容哈希}.md，同一内容重复保存得到同一个文件，不同内容不会互相覆盖
+- 原子写入：先写临时文件再 os.replace，读者不会看到写了一半的文章
+- 索引：SPU → 策略 → 最新文章（文件名、生成时间、内容哈希、prompt 哈希），
+  查找最新文章为 O(1)，不再需要列目录、解析文件名
+
+索引由快照 manifest.json 和追加日志 manifest.log 组成：每次保存只追加一行日志，
+日志行数超过快照条目数时合并成新快照。目录里只有旧版文章、还没有索引时，
+首次加载会扫描 front-matter 重建索引。
+
+GEO_ARTICLE_COMPRESS=all 时文章以字典压缩的 .mdz 保存（见 agents/article_codec.py），
+读取统一经过 read_article_text，.md 与 .mdz 可以混存。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from agents.fileio import atomic_write
+
+DEFAULT_ARTICLES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "articles"
+)
+MANIFEST_FILE = "manifest.json"
+MANIFEST_LOG = "manifest.log"
+
+SMZDM_PLATFORM = "什么值得买"
+
+# (平台, article_type) → 策略
+ARTICLE_STRATEGIES = {
+    ("", "comparison"): "comparison",
+    ("", "persona"): "persona",
+    (SMZDM_PLATFORM, "review"): "smzdm_review",
+    (SMZDM_PLATFORM, "short_review"): "smzdm_short",
+}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def prompt_hash(prompt: str) -> str:
+    """prompt 指纹（记录文章由哪个版本的 prompt 生成）"""
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def article_strategy(platform: str, article_type: str) -> Optional[str]:
+    return ARTICLE_STRATEGIES.get((platform or "", article_type or ""))
+
+
+COMPRESSED_SUFFIX = ".mdz"
+
+
+def read_article_text(path: str) -> str:
+    """读取文章全文（front-matter + 正文），.mdz 自动解压"""
+    if path.endswith(COMPRESSED_SUFFIX):
+        from agents.article_codec import get_article_codec
+
+        with open(path, "rb") as f:
+            return get_article_codec().decompress(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def read_front_matter(path: str) -> Dict[str, str]:
+    """只读取文件开头的 front-matter"""
+    if path.endswith(COMPRESSED_SUFFIX):
+        return split_front_matter(read_article_text(path))[0]
+    meta = {}
+    with open(path, "r", encoding="utf-8") as f:
+        if f.readline().strip() != "---":
+            return meta
+        for line in f:
+            line = line.strip()
+            if line == "---":
+                break
+            key, _, value = line.partition(":")
+            meta[key.strip()] = value.strip()
+    return meta
+
+
+def split_front_matter(text: str) -> Tuple[Dict[str, str], str]:
+    """拆分 front-matter 与正文"""
+    meta: Dict[str, str] = {}
+    if not text.startswith("---\n"):
+        return meta, text
+    end = text.find("\n---", 4)
+    if end == -1:
+        return meta, text
+    for line in text[4:end].splitlines():
+        key, _, value = line.partition(":")
+        meta[key.strip()] = value.strip()
+    return meta, text[end + 4:].lstrip("\n")
+
+
+class ArticleIndex:
+    """
+    文章目录 + 最新文章索引
+
+    用法：
+        index = get_article_index()
+        filename = index.save(article)
+        latest = index.latest(spu, "comparison")
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or DEFAULT_ARTICLES_DIR
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Dict]]] = None
+        self._log_lines = 0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_LOG)
+
+    # -- 加载 ----------------------------------------------------------------
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if self._entries is not None:
+            return self._entries
+        os.makedirs(self.directory, exist_ok=True)
+        entries: Dict[str, Dict[str, Dict]] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            if os.path.exists(self.log_path):
+                with open(self.log_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # 进程中途退出留下的半行
+                            continue
+                        self._apply(entries, record)
+                        self._log_lines += 1
+        else:
+            entries = self._rebuild()
+        self._entries = entries
+        return entries
+
+    @staticmethod
+    def _apply(entries: Dict[str, Dict[str, Dict]], record: Dict) -> bool:
+        """记录比当前最新的更新时才替换"""
+        current = entries.get(record["spu"], {}).get(record["strategy"])
+        if current is not None and current["generated_at"] > record["generated_at"]:
+            return False
+        entries.setdefault(record["spu"], {})[record["strategy"]] = {
+            k: v for k, v in record.items() if k not in ("spu", "strategy")
+        }
+        return True
+
+    def _rebuild(self) -> Dict[str, Dict[str, Dict]]:
+        """从旧版文章的 front-matter 重建索引并写出快照"""
+        entries: Dict[str, Dict[str, Dict]] = {}
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith((".md", COMPRESSED_SUFFIX)):
+                continue
+            meta, body = split_front_matter(read_article_text(entry.path))
+            strategy = article_strategy(meta.get("platform", ""), meta.get("article_type", ""))
+            if not strategy or not meta.get("product_spu") or not meta.get("generated_at"):
+                continue
+            digest = content_hash(body)
+            self._apply(entries, {
+                "spu": meta["product_spu"],
+                "strategy": strategy,
+                "file": entry.name,
+                "name": meta.get("product_name", ""),
+                "generated_at": meta["generated_at"],
+                "hash": digest,
+                "prompt_hash": meta.get("prompt_hash", ""),
+            })
+        atomic_write(self.manifest_path, json.dumps(entries, ensure_ascii=False, separators=(",", ":")))
+        return entries
+
+    def compact(self) -> None:
+        """把日志合并进快照"""
+        with self._lock:
+            entries = self._load()
+            atomic_write(self.manifest_path, json.dumps(entries, ensure_ascii=False, separators=(",", ":")))
+            open(self.log_path, "w").close()
+            self._log_lines = 0
+
+    # -- 查询 ----------------------------------------------------------------
+
+    def latest(self, spu: str, strategy: str) -> Optional[Dict]:
+        return self._load().get(str(spu), {}).get(strategy)
+
+    def for_spu(self, spu: str) -> Dict[str, Dict]:
+        return dict(self._load().get(str(spu), {}))
+
+    def items(self) -> Iterator[Tuple[str, str, Dict]]:
+        """遍历 (spu, 策略, 最新文章)"""
+        for spu, strategies in self._load().items():
+            for strategy, entry in strategies.items():
+                yield spu, strategy, entry
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self._load().values())
+
+    def path_of(self, entry: Dict) -> str:
+        return os.path.join(self.directory, entry["file"])
+
+    @staticmethod
+    def _compress() -> bool:
+        from agents.article_codec import compression_mode
+
+        return compression_mode() == "all"
+
+    # -- 写入 ----------------------------------------------------------------
+
+    def save(self, article: Dict, platform: str = "") -> str:
+        """
+        保存一篇文章并更新索引
+
+        Args:
+            article: {"type", "product_spu", "product_name", "content", 可选 "prompt_hash"}
+            platform: 发布平台（什么值得买文章传 SMZDM_PLATFORM）
+
+        Returns:
+            文件名
+        """
+        now = datetime.now().isoformat()
+        strategy = article_strategy(platform, article["type"])
+        lines = ["---"]
+        if platform:
+            lines.append(f"platform: {platform}")
+        lines += [
+            f"product_spu: {article['product_spu']}",
+            f"product_name: {article['product_name']}",
+            f"article_type: {article['type']}",
+            f"generated_at: {now}",
+        ]
+        if article.get("prompt_hash"):
+            lines.append(f"prompt_hash: {article['prompt_hash']}")
+        lines += ["---", "", ""]
+        text = "\n".join(lines) + article["content"]
+
+        # 文件名只取决于正文，元信息里的时间戳不影响去重
+        body_hash = content_hash(article["content"])
+        prefix = "smzdm_" if platform == SMZDM_PLATFORM else ""
+        compress = self._compress()
+        suffix = COMPRESSED_SUFFIX if compress else ".md"
+        filename = f"{prefix}{article['type']}_{article['product_spu']}_{body_hash[:12]}{suffix}"
+
+        with self._lock:
+            entries = self._load()
+            if compress:
+                from agents.article_codec import get_article_codec
+
+                atomic_write(os.path.join(self.directory, filename), get_article_codec().compress(text))
+            else:
+                atomic_write(os.path.join(self.directory, filename), text)
+            if strategy is None:
+                return filename
+            record = {
+                "spu": str(article["product_spu"]),
+                "strategy": strategy,
+                "file": filename,
+                "name": article["product_name"],
+                "generated_at": now,
+                "hash": body_hash,
+                "prompt_hash": article.get("prompt_hash", ""),
+            }
+            self._apply(entries, record)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._log_lines += 1
+            compact = self._log_lines > max(1000, len(entries))
+        if compact:
+            self.compact()
+        return filename
+
+
+_indexes: Dict[str, ArticleIndex] = {}
+
+
+def get_article_index(directory: Optional[str] = None) -> ArticleIndex:
+    """同一目录共用一个索引实例"""
+    directory = os.path.abspath(directory or DEFAULT_ARTICLES_DIR)
+    index = _indexes.get(directory)
+    if index is None:
+        index = _indexes[directory] = ArticleIndex(directory)
+    return index
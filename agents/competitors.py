@@ -0,0 +1,205 @@
+"""
+竞品信息检索
+用本地竞品目录替代写死在 Prompt 里的竞品段落：按商品的品类、材质和价格带
+从目录中挑选最相关的 top-k 行，只把这几行写进 Prompt。
+
+目录默认使用内置的 DEFAULT_CATALOG，可通过 COMPETITOR_CATALOG_FILE 指向
+维护中的 JSON 文件（字段同 DEFAULT_CATALOG）。
+
+排序信号：
+- 品类命中（含品类分组，如“外套”覆盖大衣/夹克）
+- 材质成分重合
+- 价格带距离
+- 商品名/描述与竞品描述的 BM25 文本相关度（可选）
+
+价格带和文本相关度只给品类或材质已命中的竞品加分；目录里没有同品类/同材质的竞品时
+（如鞋履）不返回任何竞品，而不是拿价格相近的外套凑数。
+品类只是笼统的“服装”（生成接口未填品类时的默认值）时，目录中的竞品都算同品类，按价格带和文本相关度排序。
+没有竞品时 format_competitor_info 明确告诉模型不做竞品对比，生成接口同时去掉对比表格检查。
+"""
+
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.prices import parse_price
+from agents.sku_graph import CATEGORY_GROUPS, split_list, split_materials
+from agents.text_index import InvertedIndex
+
+# 价格带边界（元）
+PRICE_BANDS = (200, 400, 800, 1500)
+# 覆盖目录中全部品类的笼统品类
+GENERIC_CATEGORY = "服装"
+
+# 内置竞品目录（2026年春季市场调研，需随调研更新）
+DEFAULT_CATALOG = [
+    {"brand": "优衣库 (UNIQLO)", "product": "米兰罗纹针织外套", "category": "外套", "price": 599,
+     "material": "70%棉+30%聚酯纤维", "note": "UNIQLO:C系列，注重基础款品质与百搭性"},
+    {"brand": "H&M", "product": "羊毛混纺针织外套", "category": "外套", "price": 399,
+     "material": "35%羊毛+45%腈纶", "note": "快时尚定位，款式多样，更新快"},
+    {"brand": "韩都衣舍", "product": "针织开衫外套", "category": "开衫", "price": 155,
+     "material": "46%腈纶+33%聚酯纤维+21%尼龙", "note": "韩系设计，价格亲民"},
+    {"brand": "Massimo Dutti", "product": "纯羊毛外套", "category": "大衣", "price": 1290,
+     "material": "100%美利奴羊毛", "note": "高端定位，欧洲风格"},
+    {"brand": "优衣库 (UNIQLO)", "product": "美利奴羊毛圆领针织衫", "category": "针织衫", "price": 199,
+     "material": "100%美利奴羊毛", "note": "基础款，可机洗"},
+    {"brand": "H&M", "product": "亚麻混纺衬衫", "category": "衬衫", "price": 229,
+     "material": "55%亚麻+45%棉", "note": "夏季透气款"},
+    {"brand": "优衣库 (UNIQLO)", "product": "高级亚麻衬衫", "category": "衬衫", "price": 199,
+     "material": "100%亚麻", "note": "经典基础款"},
+    {"brand": "Massimo Dutti", "product": "真丝衬衫", "category": "衬衫", "price": 899,
+     "material": "100%真丝", "note": "轻商务风格"},
+    {"brand": "H&M", "product": "印花连衣裙", "category": "连衣裙", "price": 299,
+     "material": "100%粘胶纤维", "note": "度假风印花"},
+    {"brand": "优衣库 (UNIQLO)", "product": "弹力连衣裙", "category": "连衣裙", "price": 249,
+     "material": "聚酯纤维+氨纶", "note": "通勤易打理"},
+    {"brand": "COS", "product": "羊毛混纺半身裙", "category": "半身裙", "price": 650,
+     "material": "60%羊毛+40%聚酯纤维", "note": "极简设计"},
+    {"brand": "优衣库 (UNIQLO)", "product": "宽腿西装裤", "category": "长裤", "price": 249,
+     "material": "聚酯纤维+氨纶", "note": "通勤百搭"},
+    {"brand": "优衣库 (UNIQLO)", "product": "轻型羽绒服", "category": "羽绒服", "price": 499,
+     "material": "90%羽绒+10%羽毛", "note": "轻薄便携"},
+    {"brand": "H&M", "product": "棉质基础T恤", "category": "T恤", "price": 59,
+     "material": "100%棉", "note": "入门基础款"},
+]
+
+
+def _price_band(price) -> Optional[int]:
+    try:
+        value = float(price)
+    except (TypeError, ValueError):
+        return None
+    for band, upper in enumerate(PRICE_BANDS):
+        if value < upper:
+            return band
+    return len(PRICE_BANDS)
+
+
+def _expand_categories(values: Sequence[str]) -> List[str]:
+    """品类 + 所属分组"""
+    expanded = list(values)
+    for group, members in CATEGORY_GROUPS.items():
+        if any(v in members for v in values):
+            expanded.append(group)
+    return list(dict.fromkeys(expanded))
+
+
+class CompetitorCatalog:
+    """带品类/材质/价格带索引的竞品目录"""
+
+    def __init__(self, rows: Sequence[Dict], use_text_ranker: bool = True):
+        # JSON 目录中的价格可能是字符串（"¥599"），统一转为数字
+        self.rows = [dict(row, price=parse_price(row.get("price"))) for row in rows]
+        self._by_category: Dict[str, List[int]] = defaultdict(list)
+        self._by_material: Dict[str, List[int]] = defaultdict(list)
+        self._by_band: Dict[int, List[int]] = defaultdict(list)
+        self._text_index = InvertedIndex({"product": 2.0, "note": 1.0, "category": 2.0}) if use_text_ranker else None
+
+        for row_id, row in enumerate(self.rows):
+            for category in _expand_categories([row.get("category", "")]):
+                self._by_category[category].append(row_id)
+            for fiber in set(split_materials(row.get("material", ""))):
+                self._by_material[fiber].append(row_id)
+            band = _price_band(row.get("price"))
+            if band is not None:
+                self._by_band[band].append(row_id)
+            if self._text_index is not None:
+                self._text_index.add(str(row_id), {k: str(row.get(k, "")) for k in ("product", "note", "category")})
+
+    @classmethod
+    def load(cls, file_path: Optional[str] = None) -> "CompetitorCatalog":
+        """加载竞品目录：显式路径 > COMPETITOR_CATALOG_FILE > 内置目录"""
+        load_dotenv()
+        path = file_path or os.environ.get("COMPETITOR_CATALOG_FILE")
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        return cls(DEFAULT_CATALOG)
+
+    def select(self, product: dict, k: int = 4) -> List[Dict]:
+        """为商品挑选最相关的 k 个竞品"""
+        categories = _expand_categories(
+            split_list(product.get("categories")) + split_list(product.get("mainCategory"))
+            + split_list(product.get("category"))
+        )
+        materials = set(split_materials(product.get("material", "")))
+        band = _price_band(product.get("price"))
+
+        scores: Dict[int, float] = defaultdict(float)
+        for category in categories:
+            for row_id in self._by_category.get(category, ()):
+                scores[row_id] += 3.0 if category == self.rows[row_id].get("category") else 2.0
+        for fiber in materials:
+            for row_id in self._by_material.get(fiber, ()):
+                scores[row_id] += 2.0 / max(1, len(materials))
+        # 没有品类/材质命中的竞品不参与比较；笼统的“服装”与目录中所有竞品同品类
+        if not scores:
+            if GENERIC_CATEGORY not in categories:
+                return []
+            scores = defaultdict(float, {row_id: 1.0 for row_id in range(len(self.rows))})
+        if band is not None:
+            for delta in (-1, 0, 1):
+                for row_id in self._by_band.get(band + delta, ()):
+                    if row_id in scores:
+                        scores[row_id] += 1.0 if delta == 0 else 0.5
+        if self._text_index is not None:
+            query = " ".join(str(product.get(key, "")) for key in ("name", "description"))
+            hits = [
+                (doc_id, score) for doc_id, score in self._text_index.search(query, limit=k * 4, match_all=False)
+                if int(doc_id) in scores
+            ]
+            top = hits[0][1] if hits else 0
+            for doc_id, score in hits:
+                scores[int(doc_id)] += score / top if top else 0.0
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        # 同一品牌最多保留两条，保证对比覆盖面
+        picked, per_brand = [], defaultdict(int)
+        for row_id, _ in ranked:
+            brand = self.rows[row_id].get("brand")
+            if per_brand[brand] >= 2:
+                continue
+            per_brand[brand] += 1
+            picked.append(self.rows[row_id])
+            if len(picked) >= k:
+                break
+        return picked
+
+
+def format_competitor_info(rows: Sequence[Dict]) -> str:
+    """渲染为写入 Prompt 的竞品段落"""
+    if not rows:
+        return "\n暂无同品类竞品数据：本次不做竞品对比，规格表格只列本品参数，请不要编造竞品价格和参数\n"
+    lines = []
+    for row in rows:
+        price = f"¥{row['price']:g}" if row.get("price") is not None else "价格未知"
+        line = f"- {row['brand']} {row['product']}：{price}，{row.get('material', '')}"
+        if row.get("note"):
+            line += f"（{row['note']}）"
+        lines.append(line)
+    return "\n" + "\n".join(lines) + "\n"
+
+
+_default_catalog: Optional[CompetitorCatalog] = None
+
+
+def get_catalog() -> CompetitorCatalog:
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = CompetitorCatalog.load()
+    return _default_catalog
+
+
+def build_competitor_info(product: dict, k: int = 4) -> str:
+    """检索并渲染商品的竞品信息"""
+    return format_competitor_info(get_catalog().select(product, k))
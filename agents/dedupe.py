@@ -0,0 +1,149 @@
+"""
+生成文章近重复检测
+对 Markdown 正文做字符 shingle，计算 64 位 SimHash 指纹，
+再按“分段 LSH”建立索引：最大汉明距离为 k 时把指纹切成 k+1 段，
+两个指纹距离 ≤ k 必然至少有一段完全相同（抽屉原理），
+因此只需比较同段命中的候选，不做全量两两比较。
+
+索引按商品分桶，只和同一商品的历史文章比较。
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+FINGERPRINT_BITS = 64
+DEFAULT_SHINGLE_SIZE = 4
+DEFAULT_MAX_DISTANCE = 6
+
+# 去掉 Markdown 标记、标点和空白，只保留正文字符
+_MARKDOWN_NOISE = re.compile(r"[#>*_`|\-:=\[\]()!~\s，。、；：？！“”‘’（）【】《》…,.;?\"']+")
+
+
+def normalize_markdown(text: str) -> str:
+    """规范化 Markdown 正文，去掉格式噪声"""
+    return _MARKDOWN_NOISE.sub("", text or "").lower()
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> Counter:
+    """字符级 shingle（对中文无需分词）"""
+    normalized = normalize_markdown(text)
+    if len(normalized) <= size:
+        return Counter([normalized]) if normalized else Counter()
+    return Counter(normalized[i:i + size] for i in range(len(normalized) - size + 1))
+
+
+_BYTES_WITH_BIT = [[v for v in range(256) if v >> bit & 1] for bit in range(8)]
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> int:
+    """计算 64 位 SimHash 指纹（按 shingle 出现次数加权）"""
+    # 先按字节累计权重（每个 shingle 8 次加法），最后再展开到 64 个位
+    byte_weights = [[0] * 256 for _ in range(FINGERPRINT_BITS // 8)]
+    total = 0
+    for token, count in shingles(text, shingle_size).items():
+        h = _hash64(token)
+        total += count
+        for j in range(FINGERPRINT_BITS // 8):
+            byte_weights[j][h >> (8 * j) & 0xFF] += count
+
+    fingerprint = 0
+    for j, counts in enumerate(byte_weights):
+        for bit in range(8):
+            set_weight = sum(counts[v] for v in _BYTES_WITH_BIT[bit])
+            if 2 * set_weight > total:
+                fingerprint |= 1 << (8 * j + bit)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _band_masks(max_distance: int) -> List[Tuple[int, int]]:
+    """把 64 位切成 max_distance+1 段，返回 (位移, 掩码)"""
+    bands = max_distance + 1
+    base, extra = divmod(FINGERPRINT_BITS, bands)
+    masks, shift = [], 0
+    for i in range(bands):
+        width = base + (1 if i < extra else 0)
+        masks.append((shift, (1 << width) - 1))
+        shift += width
+    return masks
+
+
+class SimHashIndex:
+    """按商品分桶的 SimHash 分段 LSH 索引（线程安全）"""
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        if not 0 <= max_distance < FINGERPRINT_BITS:
+            raise ValueError("max_distance 必须在 0-63 之间")
+        self.max_distance = max_distance
+        self._masks = _band_masks(max_distance)
+        self._buckets: Dict[Tuple[str, int, int], Set[str]] = defaultdict(set)
+        self._docs: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def _keys(self, group: str, fingerprint: int) -> Iterable[Tuple[str, int, int]]:
+        for band, (shift, mask) in enumerate(self._masks):
+            yield group, band, fingerprint >> shift & mask
+
+    def add(self, doc_id: str, group: str, fingerprint: int) -> None:
+        with self._lock:
+            if doc_id in self._docs:
+                self._remove_locked(doc_id)
+            self._docs[doc_id] = (group, fingerprint)
+            for key in self._keys(group, fingerprint):
+                self._buckets[key].add(doc_id)
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return False
+        for key in self._keys(*entry):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[key]
+        return True
+
+    def query(self, group: str, fingerprint: int, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """返回同组内距离不超过阈值的文档 [(doc_id, 距离)]，按距离升序"""
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        with self._lock:
+            candidates: Set[str] = set()
+            for key in self._keys(group, fingerprint):
+                candidates.update(self._buckets.get(key, ()))
+            matches = []
+            for doc_id in candidates:
+                distance = hamming_distance(fingerprint, self._docs[doc_id][1])
+                if distance <= limit:
+                    matches.append((doc_id, distance))
+        matches.sort(key=lambda item: item[1])
+        return matches
+
+    def nearest(self, group: str, fingerprint: int) -> Optional[Tuple[str, int]]:
+        matches = self.query(group, fingerprint)
+        return matches[0] if matches else None
+
+
+def similarity(distance: int) -> float:
+    """把汉明距离换算成 0-1 的相似度"""
+    return round(1 - distance / FINGERPRINT_BITS, 4)
@@ -2,11 +2,10 @@
 """
 Zara商品数据获取与分析脚本（独立版本）
 用于GEO内容Agent的商品数据采集阶段
-不依赖外部BrandMessage模块
+不依赖外部BrandMessage模块，HTTP 接口统一走 agents/zara_client.py
 """
 
-import requests
-import json
+import asyncio
 import os
 from datetime import datetime
 from typing import Any, Dict, List, Optional
@@ -20,17 +19,18 @@ except ModuleNotFoundError:  # pragma: no cover
     sys.path.append(str(Path(__file__).resolve().parents[1]))
     from agents._env import load_dotenv
 
+from agents.image_store import cache_product_images
+from agents.product_store import get_product_store
+from agents.serializer import dump_file
+from agents.tracing import traced
+from agents.zara_client import AsyncZaraClient, get_zara_client
+
 
 class ZaraAPI:
-    """Zara API 封装（独立版本）"""
+    """Zara API 封装（委托给 agents/zara_client.py 的统一客户端，保留原有方法名）"""
     
     def __init__(self):
-        self._search_api = "https://search.moechat.cn/api/search/mixed"
-        self._product_list_api = "https://admin.moechat.cn/admin-api/search/product/list"
-        load_dotenv()
-        self._recall_token = os.environ.get("ZARA_RECALL_TOKEN", "")
-        self._token = os.environ.get("ZARA_ADMIN_TOKEN", "")
-        self._tag_api = "https://admin.moechat.cn/admin-api/search/product/showTag"
+        self._client = get_zara_client()
     
     def search_products(self, keyword: str, category: str = "女士", page_size: int = 10) -> Dict[str, Any]:
         """
@@ -41,167 +41,146 @@ class ZaraAPI:
             category: 品类（女士/男士/儿童/家居）
             page_size: 每页数量
         """
-        category_map = {
-            "男士": "MAN",
-            "女士": "WOMAN", 
-            "儿童": "KID",
-            "家居": "HOME"
-        }
-        
-        data = {
-            "keyword": keyword,
-            "pageSize": page_size,
-            "pageNum": 1,
-            "handletype": "200",
-        }
-        
-        if category:
-            data["filters"] = [{
-                "dimensionName": "gender",
-                "tagNames": [category_map.get(category, "WOMAN")]
-            }]
-        
-        if not self._recall_token:
-            raise RuntimeError("缺少 ZARA_RECALL_TOKEN：请在 .env 或环境变量中配置")
-
-        response = requests.post(
-            self._search_api, 
-            json=data, 
-            headers={"Authorization": self._recall_token}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"搜索失败: {response.status_code} - {response.text}")
+        return self._client.search(keyword, category, page_size)
     
     def get_product_details(self, spu: str) -> Dict[str, Any]:
         """获取商品详情"""
-        if not self._token:
-            raise RuntimeError("缺少 ZARA_ADMIN_TOKEN：请在 .env 或环境变量中配置")
-
-        data = {
-            "spu": spu,
-            "pageNo": 1,
-            "pageSize": 10
-        }
-        
-        response = requests.post(
-            self._product_list_api,
-            json=data,
-            headers={"Authorization": self._token}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"获取详情失败: {response.status_code}")
+        return self._client.product_details(spu)
     
     def get_tag_info(self, product_id: str) -> Dict[str, Any]:
         """获取商品标签信息"""
-        if not self._token:
-            raise RuntimeError("缺少 ZARA_ADMIN_TOKEN：请在 .env 或环境变量中配置")
-
-        params = {"productId": f"zara-new_{product_id}"}
-        
-        response = requests.get(
-            self._tag_api,
-            params=params,
-            headers={"Authorization": self._token}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"获取标签失败: {response.status_code}")
+        return self._client.tag_info(product_id)
+
+
+def _product_data(product: Dict, category: str, keyword: str) -> Dict:
+    """搜索结果行 → 商品数据（使用API返回的正确字段名）"""
+    return {
+        "spu": product.get("spuId") or product.get("productId", ""),
+        "name": product.get("productName", ""),
+        "price": product.get("price", ""),
+        "discountPrice": product.get("discountPrice", ""),
+        "image": product.get("mainImage", ""),
+        "description": product.get("description", ""),
+        "material": product.get("material", ""),
+        "color": product.get("color", ""),
+        "categories": product.get("categories", []),
+        "tags": product.get("tags", []),
+        "isNew": product.get("isNew", 0),
+        "releaseDate": product.get("releaseDate", ""),
+        "mainCategory": product.get("mainCategory", ""),
+        "gender": category,
+        "search_keyword": keyword,
+    }
 
 
-def fetch_zara_products(category: str = "女士", keywords: List[str] = None, limit_per_keyword: int = 3):
+async def crawl_zara_products(
+    category: str = "女士",
+    keywords: List[str] = None,
+    limit_per_keyword: int = 3,
+    concurrency: int = 8,
+    client: Optional[AsyncZaraClient] = None,
+) -> List[Dict]:
     """
-    获取Zara商品数据
+    并发采集Zara商品数据（asyncio）
+    所有关键词的搜索并发执行，去重后再并发获取AI标签，结果顺序与串行采集一致
     
     Args:
         category: 品类
         keywords: 搜索关键词列表
         limit_per_keyword: 每个关键词获取的商品数量
-        
-    Returns:
-        商品列表，每个商品包含基本信息、详情和标签
+        concurrency: 同时进行的请求数上限
+        client: 复用已有的异步客户端，默认新建一个并在结束时关闭
     """
     if keywords is None:
         keywords = ["春季", "外套", "新款", "连衣裙"]
     
-    api = ZaraAPI()
-    all_products = []
-    seen_ids = set()  # 去重
+    own_client = client is None
+    client = client or AsyncZaraClient()
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def limited(coro):
+        async with slots:
+            return await coro
     
     print(f"🔍 开始获取Zara {category} 商品数据...")
     print(f"   关键词: {keywords}")
     print()
     
-    for keyword in keywords:
-        print(f"📦 搜索关键词: {keyword}")
+    try:
+        searches = await asyncio.gather(
+            *(limited(client.search(keyword, category, limit_per_keyword)) for keyword in keywords),
+            return_exceptions=True,
+        )
         
-        try:
-            result = api.search_products(keyword=keyword, category=category, page_size=limit_per_keyword)
-            
+        all_products = []
+        seen_ids = set()  # 去重
+        for keyword, result in zip(keywords, searches):
+            print(f"📦 搜索关键词: {keyword}")
+            if isinstance(result, Exception):
+                print(f"   ❌ {result}")
+                continue
             if result.get("code") == 200 and "data" in result:
                 # 注意：API返回的是 rows 不是 products
-                products = result["data"].get("rows", [])
-                print(f"   找到 {len(products)} 个商品")
-                
-                for product in products:
-                    # 使用正确的字段名：spuId 或 productId
-                    spu = product.get("spuId") or product.get("productId", "")
-                    
-                    # 去重
-                    if spu in seen_ids:
+                rows = result["data"].get("rows", [])
+                print(f"   找到 {len(rows)} 个商品")
+                for row in rows:
+                    product_data = _product_data(row, category, keyword)
+                    if product_data["spu"] in seen_ids:
                         continue
-                    seen_ids.add(spu)
-                    
-                    # 商品数据（使用API返回的正确字段名）
-                    product_data = {
-                        "spu": spu,
-                        "name": product.get("productName", ""),
-                        "price": product.get("price", ""),
-                        "discountPrice": product.get("discountPrice", ""),
-                        "image": product.get("mainImage", ""),
-                        "description": product.get("description", ""),
-                        "material": product.get("material", ""),
-                        "color": product.get("color", ""),
-                        "categories": product.get("categories", []),
-                        "tags": product.get("tags", []),
-                        "isNew": product.get("isNew", 0),
-                        "releaseDate": product.get("releaseDate", ""),
-                        "mainCategory": product.get("mainCategory", ""),
-                        "search_keyword": keyword,
-                    }
-                    
-                    # 获取更详细的AI标签信息
-                    try:
-                        tag_info = api.get_tag_info(spu)
-                        if tag_info.get("code") == 0 and "data" in tag_info:
-                            tag_data = tag_info["data"]
-                            product_data["ai_tags"] = {
-                                "mainCategory": tag_data.get("mainCategory", ""),
-                                "mainCategoryAi": tag_data.get("mainCategoryAi", ""),
-                                "whiteList": tag_data.get("whiteList", ""),
-                                "whiteListAi": tag_data.get("whiteListAi", ""),
-                            }
-                            print(f"   ✅ {product_data['name'][:20]}... - AI标签获取成功")
-                    except Exception as e:
-                        print(f"   ⚠️ {product_data['name'][:20]}... - AI标签获取失败")
-                    
+                    seen_ids.add(product_data["spu"])
                     all_products.append(product_data)
-                    
-        except Exception as e:
-            print(f"   ❌ 搜索失败: {e}")
         
-        print()
-    
+        # 获取更详细的AI标签信息
+        tag_results = await asyncio.gather(
+            *(limited(client.tag_info(p["spu"])) for p in all_products),
+            return_exceptions=True,
+        )
+        for product_data, tag_info in zip(all_products, tag_results):
+            if isinstance(tag_info, Exception):
+                print(f"   ⚠️ {product_data['name'][:20]}... - AI标签获取失败")
+                continue
+            if tag_info.get("code") == 0 and "data" in tag_info:
+                tag_data = tag_info["data"]
+                product_data["ai_tags"] = {
+                    "mainCategory": tag_data.get("mainCategory", ""),
+                    "mainCategoryAi": tag_data.get("mainCategoryAi", ""),
+                    "whiteList": tag_data.get("whiteList", ""),
+                    "whiteListAi": tag_data.get("whiteListAi", ""),
+                }
+    finally:
+        # 本轮采集触发的缓存后台刷新在同一个事件循环上，返回前等它们完成（aclose 也会等待）
+        if own_client:
+            await client.aclose()
+        elif client.cache is not None:
+            await client.cache.drain()
+    
+    print(f"   ✅ 共 {len(all_products)} 个商品，AI标签获取完成")
+    print()
     return all_products
 
 
+@traced("crawl.fetch_zara_products")
+def fetch_zara_products(category: str = "女士", keywords: List[str] = None, limit_per_keyword: int = 3,
+                        concurrency: int = 8, store: bool = True):
+    """
+    获取Zara商品数据（同步入口，内部运行并发采集）
+    
+    Args:
+        category: 品类
+        keywords: 搜索关键词列表
+        limit_per_keyword: 每个关键词获取的商品数量
+        concurrency: 同时进行的请求数上限
+        store: 是否写入商品库（output/products.db），供没有 SPU 的生成请求反查真实 SPU
+        
+    Returns:
+        商品列表，每个商品包含基本信息、详情和标签
+    """
+    products = asyncio.run(crawl_zara_products(category, keywords, limit_per_keyword, concurrency))
+    if store:
+        get_product_store().upsert_many([p for p in products if p.get("spu")], source="crawl")
+    return products
+
+
 def save_products_data(products: List[Dict], output_dir: str = None):
     """保存商品数据到JSON文件"""
     if output_dir is None:
@@ -217,8 +196,7 @@ def save_products_data(products: List[Dict], output_dir: str = None):
     
     output_file = os.path.join(output_dir, "zara_products_data.json")
     
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    dump_file(output_file, output_data)
     
     return output_file
 
@@ -242,6 +220,10 @@ def main():
     print("=" * 60)
     print(f"• 共获取 {len(products)} 个商品")
     
+    # 缓存商品主图（已缓存的图片不再请求），写入 image_file / image_variants 等字段
+    images = cache_product_images(products)
+    print(f"• 图片: {images['images']} 张，去重后 {images['groups']} 组，新下载 {images['downloaded']} 张")
+    
     # 保存数据
     output_file = save_products_data(products)
     print(f"• 数据已保存到: {output_file}")
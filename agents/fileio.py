@@ -0,0 +1,19 @@
+"""
+原子写文件
+先写到同目录的临时文件再 os.replace，读者要么看到旧文件、要么看到完整的新文件；
+临时文件名带进程号和线程号，多个进程/线程同时写同一路径也不会写坏对方的临时文件。
+"""
+
+import os
+import threading
+from typing import Union
+
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """写入文本（UTF-8）或 bytes，目录需已存在"""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
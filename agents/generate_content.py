@@ -8,8 +8,7 @@ GEO内容生成脚本
 
 import json
 import os
-from datetime import datetime
-from langchain_openai import ChatOpenAI
+from typing import Optional
 
 try:
     from agents._env import load_dotenv
@@ -20,22 +19,55 @@ except ModuleNotFoundError:  # pragma: no cover
     sys.path.append(str(Path(__file__).resolve().parents[1]))
     from agents._env import load_dotenv
 
+from agents.article_output import get_article_index
+from agents.competitors import build_competitor_info
+from agents.model_router import get_model_router
+from agents.product_brief import BASE_FIELDS, briefed_product_info, product_brief
+from agents.prompt_layout import PromptLayout, product_block
+from agents.sku_graph import SkuGraph, classify_tags
+from agents.tracing import traced
 
-# 使用Gemini 3 Flash模型配置
+
+# 模型调用经由多模型路由：按 (策略, 目标平台) 选择模型池，默认沿用 OPENAI_* 配置
 load_dotenv()
-_api_key = os.environ.get("OPENAI_API_KEY")
-if not _api_key:
-    raise RuntimeError("缺少 OPENAI_API_KEY：请在 .env 或环境变量中配置")
+router = get_model_router()
+
+PRODUCT_FIELDS = (
+    ("商品名称", "name"),
+    ("价格", "price"),
+    ("材质", "material"),
+    ("颜色", "color"),
+    ("描述", "description"),
+    ("品类", "mainCategory"),
+    ("标签", "tags"),
+)
 
-_base_url = os.environ.get("OPENAI_BASE_URL")
-_model_name = os.environ.get("OPENAI_MODEL", "gemini-3-flash-preview")
+# 静态部分（角色、写作要求）放在 system 消息，所有调用共享同一前缀，可命中服务商的 prompt 缓存
+COMPARISON_LAYOUT = PromptLayout("comparison", """你是一位专业的时尚评测博主，请基于用户提供的Zara商品信息和竞品资料，撰写一篇专业的评测对比文章。
 
-model = ChatOpenAI(
-    model=_model_name,
-    api_key=_api_key,
-    base_url=_base_url,
-    temperature=0.3
-)
+## 写作要求
+1. 文章标题需包含商品名称和"评测"、"对比"等关键词
+2. 必须包含规格对比表格（与优衣库、H&M同类产品对比）
+3. 详细分析材质工艺和技术特点
+4. 提供客观的优缺点分析
+5. 给出明确的购买建议和适用人群
+6. 添加常见问题FAQ（至少3个问题）
+7. 文章结构清晰，使用Markdown格式
+8. 内容专业权威，适合被AI大模型引用
+""")
+
+PERSONA_LAYOUT = PromptLayout("persona", """你是一位懂时尚的购物博主，请基于用户提供的Zara商品信息，撰写一篇实用的购物指南文章，帮助特定用户群体做出购买决策。
+
+## 写作要求
+1. 标题吸引目标用户，包含场景词（如"通勤"、"约会"、"日常"）
+2. 开篇描述目标用户的穿搭痛点和需求
+3. 详细介绍商品如何满足这些需求
+4. 提供3-5套具体的搭配方案
+5. 说明适合什么场合、什么季节穿着
+6. 真诚分享购买建议（是否值得入手）
+7. 文章温暖亲切，像朋友推荐一样
+8. 使用Markdown格式，适当使用emoji
+""")
 
 
 def load_product_data(file_path: str = None):
@@ -51,84 +83,57 @@ def load_product_data(file_path: str = None):
         return json.load(f)
 
 
-def generate_comparison_article(product: dict, competitor_info: str):
+@traced("agent.generate_comparison_article")
+def generate_comparison_article(product: dict, competitor_info: str, target: Optional[str] = None):
     """
     策略一：生成评测对比型内容
     符合DeepSeek偏好的高密度技术细节风格
     """
     
-    prompt = f"""你是一位专业的时尚评测博主，请基于以下Zara商品信息和竞品资料，撰写一篇专业的评测对比文章。
-
-## 商品信息
-- 商品名称：{product['name']}
-- 价格：¥{product['price']}
-- 材质：{product['material']}
-- 颜色：{product['color']}
-- 描述：{product['description']}
-- 品类：{product['mainCategory']}
-- 标签：{', '.join(product['tags'][:15])}
-
-## 竞品市场信息
-{competitor_info}
-
-## 写作要求
-1. 文章标题需包含商品名称和"评测"、"对比"等关键词
-2. 必须包含规格对比表格（与优衣库、H&M同类产品对比）
-3. 详细分析材质工艺和技术特点
-4. 提供客观的优缺点分析
-5. 给出明确的购买建议和适用人群
-6. 添加常见问题FAQ（至少3个问题）
-7. 文章结构清晰，使用Markdown格式
-8. 内容专业权威，适合被AI大模型引用
-
-请直接输出完整文章内容：
-"""
+    messages = COMPARISON_LAYOUT.build(
+        ("竞品市场信息", competitor_info),
+        ("商品信息", briefed_product_info(product, PRODUCT_FIELDS, target=target)),
+        closing="请直接输出完整文章内容：",
+    )
     
-    response = model.invoke(prompt)
+    response = router.invoke(messages, strategy="comparison", target=target)
     return response.content
 
 
-def generate_persona_article(product: dict, persona_analysis: str):
+@traced("agent.generate_persona_article")
+def generate_persona_article(product: dict, persona_analysis: str, graph: Optional[SkuGraph] = None, target: Optional[str] = None):
     """
     策略二：生成用户画像匹配型干货内容
     面向特定用户群体的购物指南
+
+    graph 中有该 SKU 时直接使用预分类的风格/季节标签（含AI白名单标签）
     """
     
     # 基于商品标签推理用户画像
-    tags = product.get('tags', [])
-    style_tags = [t for t in tags if t in ['温柔风', '小香风', '清冷风', '盐系', '优雅', '休闲', '通勤', '约会穿搭', '松弛感']]
-    season_tags = [t for t in tags if t in ['春季', '秋冬', '春秋', '早春', '早秋']]
-    
-    prompt = f"""你是一位懂时尚的购物博主，请基于以下Zara商品信息，撰写一篇实用的购物指南文章，帮助特定用户群体做出购买决策。
-
-## 商品信息
-- 商品名称：{product['name']}
-- 价格：¥{product['price']}
-- 材质：{product['material']}
-- 颜色：{product['color']}
-- 描述：{product['description']}
-- 品类：{product['mainCategory']}
+    if graph is not None and product.get('spu') in graph:
+        context = graph.context_for(product['spu'])
+        style_tags, season_tags = context['style_tags'], context['season_tags']
+    else:
+        classified = classify_tags(product.get('tags', []))
+        style_tags, season_tags = classified['style'], classified['season']
+    
+    # 有商品简报时用简报代替原始材质/描述/标签
+    brief = product_brief(product, target)
+    tag_info = f"""
 - 风格标签：{', '.join(style_tags) if style_tags else '日常百搭'}
-- 季节标签：{', '.join(season_tags) if season_tags else '春秋季节'}
-- 其他标签：{', '.join(product['tags'][:10])}
-
-## 用户画像分析
-{persona_analysis}
-
-## 写作要求
-1. 标题吸引目标用户，包含场景词（如"通勤"、"约会"、"日常"）
-2. 开篇描述目标用户的穿搭痛点和需求
-3. 详细介绍商品如何满足这些需求
-4. 提供3-5套具体的搭配方案
-5. 说明适合什么场合、什么季节穿着
-6. 真诚分享购买建议（是否值得入手）
-7. 文章温暖亲切，像朋友推荐一样
-8. 使用Markdown格式，适当使用emoji
-
-请直接输出完整文章内容：
-"""
-    
-    response = model.invoke(prompt)
+- 季节标签：{', '.join(season_tags) if season_tags else '春秋季节'}"""
+    if brief is None:
+        product_info = product_block(product, PRODUCT_FIELDS[:-1]) + tag_info + f"""
+- 其他标签：{', '.join(product['tags'][:10])}"""
+    else:
+        product_info = product_block(product, BASE_FIELDS) + tag_info + "\n\n" + brief
+    messages = PERSONA_LAYOUT.build(
+        ("用户画像分析", persona_analysis),
+        ("商品信息", product_info),
+        closing="请直接输出完整文章内容：",
+    )
+    
+    response = router.invoke(messages, strategy="persona", target=target)
     return response.content
 
 
@@ -141,22 +146,10 @@ def save_articles(articles: list, output_dir: str = None):
             "articles"
         )
     
-    os.makedirs(output_dir, exist_ok=True)
-    
+    # 内容哈希文件名 + 原子写入，同时更新最新文章索引
+    index = get_article_index(output_dir)
     for article in articles:
-        filename = f"{article['type']}_{article['product_spu']}_{datetime.now().strftime('%Y%m%d_%H%M')}.md"
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, "w", encoding="utf-8") as f:
-            # 添加元信息
-            f.write(f"---\n")
-            f.write(f"product_spu: {article['product_spu']}\n")
-            f.write(f"product_name: {article['product_name']}\n")
-            f.write(f"article_type: {article['type']}\n")
-            f.write(f"generated_at: {datetime.now().isoformat()}\n")
-            f.write(f"---\n\n")
-            f.write(article['content'])
-        
+        filename = index.save(article)
         print(f"✅ 已保存: {filename}")
     
     return output_dir
@@ -173,6 +166,7 @@ def main():
     print("📦 加载商品数据...")
     data = load_product_data()
     products = data['products']
+    graph = SkuGraph.from_products(products)
     print(f"   共 {len(products)} 个商品")
     
     # 2. 选择测试商品（纯羊毛修身外套）
@@ -187,30 +181,8 @@ def main():
     
     print(f"\n🎯 选择测试商品: {test_product['name']} (¥{test_product['price']})")
     
-    # 3. 准备竞品信息（基于联网搜索结果）
-    competitor_info = """
-根据2026年春季市场调研：
-
-**优衣库 (UNIQLO)**
-- 米兰罗纹针织外套：约¥400-600（5990日元）
-- 材质：高品质棉+米兰罗纹针织，强调柔软触感
-- 特点：UNIQLO:C系列，注重基础款品质与百搭性
-
-**H&M**
-- 羊毛混纺针织外套：约¥299-499
-- 材质：通常为羊毛混纺（羊毛含量30-50%）
-- 特点：快时尚定位，款式多样，更新快
-
-**韩都衣舍**
-- 针织开衫外套：约¥155-300
-- 材质：混纺化纤为主（腈纶46%+聚酯32%+尼龙21%）
-- 特点：韩系设计，价格亲民
-
-**Massimo Dutti**
-- 纯羊毛外套：约¥800-1500
-- 材质：高含量羊毛或纯羊毛
-- 特点：高端定位，欧洲风格
-"""
+    # 3. 准备竞品信息（从竞品目录检索相关行）
+    competitor_info = build_competitor_info(test_product)
     
     # 4. 准备用户画像分析
     persona_analysis = """
@@ -245,7 +217,7 @@ def main():
     # 6. 生成用户画像匹配文章（策略二）
     print("\n📝 生成用户画像匹配文章（策略二）...")
     try:
-        persona_content = generate_persona_article(test_product, persona_analysis)
+        persona_content = generate_persona_article(test_product, persona_analysis, graph)
         articles.append({
             'type': 'persona',
             'product_spu': test_product['spu'],
@@ -6,8 +6,7 @@
 
 import json
 import os
-from datetime import datetime
-from langchain_openai import ChatOpenAI
+from typing import Optional
 
 try:
     from agents._env import load_dotenv
@@ -18,22 +17,17 @@ except ModuleNotFoundError:  # pragma: no cover
     sys.path.append(str(Path(__file__).resolve().parents[1]))
     from agents._env import load_dotenv
 
+from agents.article_output import SMZDM_PLATFORM, get_article_index
+from agents.competitors import build_competitor_info
+from agents.model_router import get_model_router
+from agents.product_brief import briefed_product_info
+from agents.prompt_layout import PromptLayout
+from agents.tracing import traced
 
-# 使用Gemini 3 Flash模型配置
-load_dotenv()
-_api_key = os.environ.get("OPENAI_API_KEY")
-if not _api_key:
-    raise RuntimeError("缺少 OPENAI_API_KEY：请在 .env 或环境变量中配置")
-
-_base_url = os.environ.get("OPENAI_BASE_URL")
-_model_name = os.environ.get("OPENAI_MODEL", "gemini-3-flash-preview")
 
-model = ChatOpenAI(
-    model=_model_name,
-    api_key=_api_key,
-    base_url=_base_url,
-    temperature=0.3
-)
+# 模型调用经由多模型路由：按 (策略, 目标平台) 选择模型池，默认沿用 OPENAI_* 配置
+load_dotenv()
+router = get_model_router()
 
 
 # 什么值得买平台内容特征总结
@@ -60,44 +54,23 @@ SMZDM_STYLE_GUIDE = """
 - 分类标签精准（#老用户回馈、#实测体验）
 """
 
+REVIEW_PRODUCT_FIELDS = (
+    ("商品名称", "name"),
+    ("价格", "price"),
+    ("材质", "material"),
+    ("颜色", "color"),
+    ("描述", "description"),
+    ("品类", "mainCategory"),
+    ("标签", "tags"),
+)
+SHORT_PRODUCT_FIELDS = tuple(f for f in REVIEW_PRODUCT_FIELDS if f[1] != "mainCategory")
 
-def load_product_data(file_path: str = None):
-    """加载商品数据"""
-    if file_path is None:
-        file_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "output",
-            "zara_products_data.json"
-        )
-    
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def generate_smzdm_article(product: dict, competitor_info: str):
-    """
-    生成符合什么值得买平台风格的文章
-    结合评测+避坑指南风格
-    """
-    
-    prompt = f"""你是一位资深的什么值得买(SMZDM)平台创作者，请基于以下商品信息撰写一篇符合平台用户(值友)偏好的高质量文章。
+# 静态部分（角色、平台风格、写作要求）放在 system 消息，所有调用共享同一前缀，可命中服务商的 prompt 缓存
+SMZDM_REVIEW_LAYOUT = PromptLayout("smzdm_review", f"""你是一位资深的什么值得买(SMZDM)平台创作者，请基于用户提供的商品信息撰写一篇符合平台用户(值友)偏好的高质量文章。
 
 ## 平台风格要求
 {SMZDM_STYLE_GUIDE}
 
-## 商品信息
-- 商品名称：{product['name']}
-- 品牌：Zara
-- 价格：¥{product['price']}
-- 材质：{product['material']}
-- 颜色：{product['color']}
-- 描述：{product['description']}
-- 品类：{product['mainCategory']}
-- 标签：{', '.join(product['tags'][:15])}
-
-## 竞品参考信息
-{competitor_info}
-
 ## 写作要求
 1. **标题**：必须包含数字+情绪词+利益点，如"Zara这件纯羊毛外套我穿了2周，告诉你5个买前必知的真相！"
 2. **正文结构**：
@@ -112,29 +85,9 @@ def generate_smzdm_article(product: dict, competitor_info: str):
    - 适当使用emoji增强可读性
 4. **信息密度**：文章需包含具体数据（价格对比、材质成分、尺码建议等）
 5. **互动引导**：文末邀请值友评论讨论
+""")
 
-请输出完整文章（约1500-2000字）：
-"""
-    
-    response = model.invoke(prompt)
-    return response.content
-
-
-def generate_smzdm_short_review(product: dict):
-    """
-    生成什么值得买短评测风格内容
-    更侧重"好物分享"风格
-    """
-    
-    prompt = f"""你是什么值得买平台的活跃创作者，请为以下Zara新品撰写一篇"好物分享"风格的短评测。
-
-## 商品信息
-- 商品名称：{product['name']}
-- 价格：¥{product['price']}
-- 材质：{product['material']}
-- 颜色：{product['color']}
-- 描述：{product['description']}
-- 标签：{', '.join(product['tags'][:10])}
+SMZDM_SHORT_LAYOUT = PromptLayout("smzdm_short", """你是什么值得买平台的活跃创作者，请为用户提供的Zara新品撰写一篇"好物分享"风格的短评测。
 
 ## 平台风格
 - 标题要吸睛：包含价格数字+"值不值"争议点
@@ -145,11 +98,53 @@ def generate_smzdm_short_review(product: dict):
 ## 示例标题风格
 - "549买Zara纯羊毛外套，收到后我愣住了…值不值自己看！"
 - "Zara春季新款实测：这3点打动我，但有1个坑要避"
+""")
 
-请输出完整文章：
-"""
+
+def load_product_data(file_path: str = None):
+    """加载商品数据"""
+    if file_path is None:
+        file_path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "output",
+            "zara_products_data.json"
+        )
     
-    response = model.invoke(prompt)
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@traced("agent.generate_smzdm_article")
+def generate_smzdm_article(product: dict, competitor_info: str, target: Optional[str] = None):
+    """
+    生成符合什么值得买平台风格的文章
+    结合评测+避坑指南风格
+    """
+    
+    product_info = "- 品牌：Zara\n" + briefed_product_info(product, REVIEW_PRODUCT_FIELDS, target=target)
+    messages = SMZDM_REVIEW_LAYOUT.build(
+        ("竞品参考信息", competitor_info),
+        ("商品信息", product_info),
+        closing="请输出完整文章（约1500-2000字）：",
+    )
+    
+    response = router.invoke(messages, strategy="smzdm_review", target=target)
+    return response.content
+
+
+@traced("agent.generate_smzdm_short_review")
+def generate_smzdm_short_review(product: dict, target: Optional[str] = None):
+    """
+    生成什么值得买短评测风格内容
+    更侧重"好物分享"风格
+    """
+    
+    messages = SMZDM_SHORT_LAYOUT.build(
+        ("商品信息", briefed_product_info(product, SHORT_PRODUCT_FIELDS, target=target, tag_limit=10)),
+        closing="请输出完整文章：",
+    )
+    
+    response = router.invoke(messages, strategy="smzdm_short", target=target)
     return response.content
 
 
@@ -162,22 +157,10 @@ def save_smzdm_articles(articles: list, output_dir: str = None):
             "articles"
         )
     
-    os.makedirs(output_dir, exist_ok=True)
-    
+    # 内容哈希文件名 + 原子写入，同时更新最新文章索引
+    index = get_article_index(output_dir)
     for article in articles:
-        filename = f"smzdm_{article['type']}_{article['product_spu']}_{datetime.now().strftime('%Y%m%d_%H%M')}.md"
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"---\n")
-            f.write(f"platform: 什么值得买\n")
-            f.write(f"product_spu: {article['product_spu']}\n")
-            f.write(f"product_name: {article['product_name']}\n")
-            f.write(f"article_type: {article['type']}\n")
-            f.write(f"generated_at: {datetime.now().isoformat()}\n")
-            f.write(f"---\n\n")
-            f.write(article['content'])
-        
+        filename = index.save(article, platform=SMZDM_PLATFORM)
         print(f"✅ 已保存: {filename}")
     
     return output_dir
@@ -208,12 +191,7 @@ def main():
     print(f"🎯 测试商品: {test_product['name']} (¥{test_product['price']})")
     
     # 竞品信息
-    competitor_info = """
-- 优衣库 米兰罗纹针织外套：¥599，70%棉+30%聚酯纤维
-- H&M 羊毛混纺针织外套：¥399，35%羊毛+45%腈纶
-- 韩都衣舍 针织开衫：¥155，46%腈纶+33%聚酯
-- Massimo Dutti 纯羊毛外套：¥1290，100%美利奴羊毛
-"""
+    competitor_info = build_competitor_info(test_product)
     
     articles = []
     
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+商品图片管线
+采集到的商品带主图 URL（product["image"]），发布和多模态生成都要用这张图。这里统一下载一次并复用：
+- 内容寻址缓存：原图按 sha256 存于 output/images/objects/<前两位>/<sha256>.<扩展名>，
+  url → sha256 的映射存于 output/images/index.json；URL 已在索引且文件存在时不发请求，
+  商品没有变化的重复采集不产生任何图片请求（Zara 的图片 URL 带版本，换图即换 URL）
+- 并发下载：httpx.AsyncClient + 信号量，下载完成的图片立即交给进程池处理，下载与处理重叠
+- 变体：已安装 Pillow 时在进程池中生成各尺寸 JPEG（variants/<sha256>/<尺寸名>.jpg）并计算感知哈希；
+  未安装时只缓存原图，去重退化为内容完全相同（sha256 相同）
+- 感知哈希分组：64 位 DCT pHash，汉明距离不超过阈值的图片归为一组（同一张图被重新压缩/缩放），
+  组号记入 product["image_group"]，只用于统计重复图片；灰度 pHash 分不清颜色，
+  商品的图片字段始终指向自己那张图（存储按 sha256 去重，内容相同的图片只存一份）
+
+配置（.env 或环境变量）：
+- GEO_IMAGE_DIR：缓存目录，默认 output/images
+- GEO_IMAGE_CONCURRENCY：同时下载数，默认 8
+- GEO_IMAGE_WORKERS：处理进程数，默认 CPU 核数
+- GEO_IMAGE_DEDUPE_DISTANCE：pHash 汉明距离阈值，默认 6
+
+用法：
+    python agents/image_store.py    # 为 output/zara_products_data.json 中的商品缓存图片并写回图片字段
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.dedupe import SimHashIndex
+from agents.fileio import atomic_write
+from agents.serializer import dump_file, dumps, load_file
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_IMAGE_DIR = os.path.join(ROOT_DIR, "output", "images")
+PRODUCTS_FILE = os.path.join(ROOT_DIR, "output", "zara_products_data.json")
+
+# 变体名 → 最长边像素
+VARIANT_SIZES = {"thumb": 256, "medium": 800}
+JPEG_QUALITY = 85
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+}
+
+PHASH_SIZE = 32
+PHASH_BITS = 8
+# 行/列 DCT 只需要前 8 个系数：cos((2x+1)uπ / 2N)
+_DCT_COS = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_SIZE)) for x in range(PHASH_SIZE)]
+    for u in range(PHASH_BITS)
+]
+
+
+def phash_from_pixels(pixels: bytes) -> int:
+    """
+    32×32 灰度像素（行优先）→ 64 位 pHash：
+    取二维 DCT 左上角 8×8 低频系数，与除直流分量外的中位数比较，大于中位数的位为 1
+    """
+    rows = [pixels[y * PHASH_SIZE:(y + 1) * PHASH_SIZE] for y in range(PHASH_SIZE)]
+    # 先对每行做 DCT（32×8），再对每列做 DCT（8×8）
+    row_coeffs = [[sum(c * p for c, p in zip(cos_u, row)) for cos_u in _DCT_COS] for row in rows]
+    coeffs = [
+        sum(cos_v[y] * row_coeffs[y][u] for y in range(PHASH_SIZE))
+        for cos_v in _DCT_COS
+        for u in range(PHASH_BITS)
+    ]
+    ac = sorted(coeffs[1:])
+    median = ac[len(ac) // 2]
+    fingerprint = 0
+    for i, c in enumerate(coeffs):
+        if c > median:
+            fingerprint |= 1 << i
+    return fingerprint
+
+
+def _process_image(path: str, variant_dir: str) -> Dict:
+    """进程池任务：生成各尺寸变体并计算 pHash（需要 Pillow）"""
+    resample = getattr(Image, "Resampling", Image).LANCZOS
+    with Image.open(path) as opened:
+        image = opened.convert("RGB")
+    width, height = image.size
+    fingerprint = phash_from_pixels(image.convert("L").resize((PHASH_SIZE, PHASH_SIZE), resample).tobytes())
+
+    os.makedirs(variant_dir, exist_ok=True)
+    variants = {}
+    for name, edge in VARIANT_SIZES.items():
+        variant = image.copy()
+        variant.thumbnail((edge, edge), resample)
+        filename = f"{name}.jpg"
+        tmp = os.path.join(variant_dir, f"{filename}.{os.getpid()}.tmp")
+        variant.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(tmp, os.path.join(variant_dir, filename))
+        variants[name] = filename
+    return {"width": width, "height": height, "phash": f"{fingerprint:016x}", "variants": variants}
+
+
+def _extension(url: str, content_type: str) -> str:
+    ext = CONTENT_TYPE_EXTENSIONS.get(content_type.split(";")[0].strip().lower())
+    if ext:
+        return ext
+    suffix = os.path.splitext(urlparse(url).path)[1].lower()
+    return suffix if suffix in CONTENT_TYPE_EXTENSIONS.values() or suffix == ".jpeg" else ".img"
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, data)
+
+
+class ImageStore:
+    """
+    用法：
+        store = ImageStore()
+        report = await store.attach(products)   # 或 cache_product_images(products)
+        path = image_file(product, "thumb")
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        workers: Optional[int] = None,
+        max_distance: Optional[int] = None,
+    ):
+        load_dotenv()
+        self.directory = directory or os.environ.get("GEO_IMAGE_DIR") or DEFAULT_IMAGE_DIR
+        # .env 中留空的配置按未设置处理
+        self.concurrency = concurrency or int(os.environ.get("GEO_IMAGE_CONCURRENCY") or 8)
+        self.workers = workers or int(os.environ.get("GEO_IMAGE_WORKERS") or 0) or os.cpu_count() or 1
+        if max_distance is None:
+            max_distance = int(os.environ.get("GEO_IMAGE_DEDUPE_DISTANCE") or 6)
+        self.index_path = os.path.join(self.directory, "index.json")
+        self._urls: Dict[str, str] = {}
+        self._objects: Dict[str, Dict] = {}
+        if os.path.exists(self.index_path):
+            index = load_file(self.index_path)
+            self._urls = index.get("urls", {})
+            self._objects = index.get("objects", {})
+        # 只收录各组的代表图，新图与代表图比较
+        self._phashes = SimHashIndex(max_distance)
+        for sha, entry in self._objects.items():
+            if entry.get("phash") and entry.get("group") == sha:
+                self._phashes.add(sha, "", int(entry["phash"], 16))
+        self._processing = set()
+        self._stats = {"requests": 0, "cached": 0, "downloaded": 0, "failed": 0, "processed": 0, "deduped": 0}
+
+    # -- 路径 ----------------------------------------------------------------
+
+    def object_relpath(self, sha: str) -> str:
+        return os.path.join("objects", sha[:2], sha + self._objects[sha]["ext"])
+
+    def variant_relpath(self, sha: str, name: str) -> Optional[str]:
+        filename = self._objects[sha].get("variants", {}).get(name)
+        return os.path.join("variants", sha, filename) if filename else None
+
+    def _cached(self, url: str) -> Optional[str]:
+        sha = self._urls.get(url)
+        if sha and sha in self._objects and os.path.exists(os.path.join(self.directory, self.object_relpath(sha))):
+            return sha
+        return None
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        _write_bytes(self.index_path, dumps({"urls": self._urls, "objects": self._objects}))
+
+    # -- 下载与处理 -------------------------------------------------------------
+
+    async def _download(self, client, url: str) -> str:
+        self._stats["requests"] += 1
+        response = await client.get(url)
+        response.raise_for_status()
+        data = response.content
+        sha = hashlib.sha256(data).hexdigest()
+        if sha not in self._objects:
+            self._objects[sha] = {
+                "ext": _extension(url, response.headers.get("content-type", "")),
+                "size": len(data),
+                "group": sha,
+            }
+        path = os.path.join(self.directory, self.object_relpath(sha))
+        if not os.path.exists(path):
+            _write_bytes(path, data)
+        self._urls[url] = sha
+        return sha
+
+    async def _process(self, pool: Optional[ProcessPoolExecutor], sha: str) -> None:
+        entry = self._objects[sha]
+        if pool is None or "phash" in entry or sha in self._processing:
+            return
+        self._processing.add(sha)
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                pool,
+                _process_image,
+                os.path.join(self.directory, self.object_relpath(sha)),
+                os.path.join(self.directory, "variants", sha),
+            )
+        except Exception as e:
+            # 不是可识别的图片：保留原图，不生成变体
+            entry["error"] = str(e)
+            return
+        finally:
+            self._processing.discard(sha)
+        entry.update(result)
+        self._stats["processed"] += 1
+        self._assign_group(sha)
+
+    def _assign_group(self, sha: str) -> None:
+        """与各组代表图比较，距离在阈值内则并入该组，否则自成一组"""
+        entry = self._objects[sha]
+        fingerprint = int(entry["phash"], 16)
+        nearest = self._phashes.nearest("", fingerprint)
+        if nearest is not None and nearest[0] != sha:
+            entry["group"] = nearest[0]
+            self._stats["deduped"] += 1
+        else:
+            entry["group"] = sha
+            self._phashes.add(sha, "", fingerprint)
+
+    async def fetch(self, urls: Iterable[str], client=None) -> Dict[str, Optional[str]]:
+        """
+        缓存一批图片 URL，返回 url → sha256（下载失败为 None）
+        已缓存的 URL 不发请求；新下载的图片立即在进程池中处理
+        """
+        urls = list(dict.fromkeys(u for u in urls if u))
+        result: Dict[str, Optional[str]] = {}
+        missing = []
+        for url in urls:
+            sha = self._cached(url)
+            if sha is None:
+                missing.append(url)
+            else:
+                result[url] = sha
+                self._stats["cached"] += 1
+
+        pending = [sha for sha in set(result.values()) if "phash" not in self._objects[sha] and "error" not in self._objects[sha]]
+        if not missing and not (pending and Image is not None):
+            return result
+
+        own_client = client is None
+        if own_client:
+            import httpx
+
+            client = httpx.AsyncClient(timeout=30, follow_redirects=True)
+        pool = ProcessPoolExecutor(max_workers=self.workers) if Image is not None else None
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def one(url: str) -> None:
+            try:
+                async with slots:
+                    sha = await self._download(client, url)
+            except Exception as e:
+                print(f"   ⚠️ 图片下载失败: {url} - {e}")
+                self._stats["failed"] += 1
+                result[url] = None
+                return
+            self._stats["downloaded"] += 1
+            result[url] = sha
+            await self._process(pool, sha)
+
+        try:
+            await asyncio.gather(
+                *(one(url) for url in missing),
+                *(self._process(pool, sha) for sha in pending),
+            )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if own_client:
+                await client.aclose()
+            self.save()
+        return result
+
+    async def attach(self, products: List[Dict], client=None) -> Dict:
+        """
+        为商品缓存主图并写入图片字段：
+        image_sha256、image_file、image_variants（相对缓存目录，都是本商品自己的图片）、
+        image_group（pHash 分组，只用于统计，同款不同颜色可能落在同一组）
+        """
+        shas = await self.fetch((p.get("image", "") for p in products), client=client)
+        groups = set()
+        for product in products:
+            sha = shas.get(product.get("image", ""))
+            if sha is None:
+                continue
+            group = self._objects[sha].get("group", sha)
+            groups.add(group)
+            product["image_sha256"] = sha
+            product["image_group"] = group
+            product["image_file"] = self.object_relpath(sha)
+            variants = {name: self.variant_relpath(sha, name) for name in VARIANT_SIZES}
+            product["image_variants"] = {k: v for k, v in variants.items() if v}
+        return {
+            "products": len(products),
+            "images": len(shas),
+            "groups": len(groups),
+            **self._stats,
+        }
+
+    def stats(self) -> Dict:
+        return dict(self._stats)
+
+
+def image_file(product: Dict, variant: Optional[str] = None, directory: Optional[str] = None) -> Optional[str]:
+    """商品图片的本地路径（优先指定尺寸的变体，没有则用原图）；未缓存时返回 None"""
+    relpath = (product.get("image_variants") or {}).get(variant) or product.get("image_file")
+    if not relpath:
+        return None
+    load_dotenv()
+    path = os.path.join(directory or os.environ.get("GEO_IMAGE_DIR") or DEFAULT_IMAGE_DIR, relpath)
+    return path if os.path.exists(path) else None
+
+
+def cache_product_images(products: List[Dict], directory: Optional[str] = None) -> Dict:
+    """同步入口：缓存商品图片并写入图片字段"""
+    return asyncio.run(ImageStore(directory).attach(products))
+
+
+def main():
+    if not os.path.exists(PRODUCTS_FILE):
+        print(f"❌ 商品数据不存在: {PRODUCTS_FILE}")
+        return
+    data = load_file(PRODUCTS_FILE)
+    report = cache_product_images(data.get("products", []))
+    dump_file(PRODUCTS_FILE, data)
+    print(f"🖼️  {report['products']} 个商品，{report['images']} 张图片，去重后 {report['groups']} 组")
+    print(f"   命中缓存 {report['cached']} | 下载 {report['downloaded']} | 失败 {report['failed']} | "
+          f"处理 {report['processed']} | 合并 {report['deduped']}")
+    if Image is None:
+        print("   未安装 Pillow：只缓存原图，不生成缩略图和感知哈希")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+"""
+多模型路由
+把 (策略, 目标平台) 映射到一组 OpenAI 兼容接口的模型池，每个池有独立的客户端（连接池）、
+并发上限、健康状态和延迟统计：
+- 选择：候选池中优先健康的，再按负载（在途请求 / 并发上限）和路由顺序排序，
+  批量生成时请求自然分摊到多个服务商
+- 故障转移：调用失败换下一个池；连续失败达到阈值的池熔断一段时间（指数退避），
+  熔断期间的调用直接拒绝；冷却后进入半开状态，只放行一个试探请求，
+  试探成功则恢复，失败则以更长的冷却时间再次熔断
+- 统计：每个池的请求数、失败数、在途数（含排队）、EWMA 和 p50/p95/p99 延迟、首 token 延迟；
+  metered_tokens() 统计一段代码内模型调用实际消耗的 token（按服务商返回的 usage）
+- 对冲请求（可选，GEO_MODEL_HEDGE=1）：以流式调用首选池，超过该池首 token 延迟的
+  指定分位数仍未收到首 token 时，向下一个候选池（只有一个池时为同一个池）发出重复请求，
+  取先完成的结果并取消另一个；额外请求数受预算比例限制
+
+配置：GEO_MODEL_POOLS 指向 JSON 文件，未配置时只有一个沿用 OPENAI_* 的 default 池。
+    {
+      "pools": {
+        "default":  {"model": "gemini-3-flash-preview"},
+        "deepseek": {"model": "deepseek-chat", "base_url": "https://api.deepseek.com/v1",
+                     "api_key_env": "DEEPSEEK_API_KEY", "max_concurrency": 8, "timeout": 120}
+      },
+      "routes": {
+        "comparison": {"deepseek": ["deepseek", "default"]},
+        "*": {"*": ["default"]}
+      }
+    }
+routes 按 策略 → 目标平台 → 池列表 查找，"*" 为通配。
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.prompt_layout import CacheUsage, cached_tokens, total_tokens
+from agents.tracing import span
+
+DEFAULT_MODEL = "gemini-3-flash-preview"
+DEFAULT_POOL = "default"
+FAILURE_THRESHOLD = 3
+BASE_COOLDOWN = 10.0
+MAX_COOLDOWN = 300.0
+LATENCY_WINDOW = 200
+EWMA_ALPHA = 0.2
+
+
+class NoHealthyPoolError(RuntimeError):
+    """所有候选模型池都调用失败"""
+
+
+class RequestCancelled(Exception):
+    """对冲请求中落败的一方被取消"""
+
+
+class CircuitOpenError(RuntimeError):
+    """模型池熔断中（或半开状态的试探请求在途），本次调用未发出"""
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _prompt_chars(messages) -> int:
+    if isinstance(messages, str):
+        return len(messages)
+    total = 0
+    for m in messages:
+        if isinstance(m, tuple):
+            total += len(m[1])
+        elif isinstance(m, dict):
+            total += len(m.get("content", ""))
+        else:
+            total += len(getattr(m, "content", "") or "")
+    return total
+
+
+class TokenMeter:
+    """metered_tokens() 块内成功的模型调用次数与实际 token 消耗"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens = 0
+
+    def add(self, response) -> None:
+        with self._lock:
+            self.calls += 1
+            self.tokens += total_tokens(response)
+
+
+_token_meter: contextvars.ContextVar[Optional[TokenMeter]] = contextvars.ContextVar("token_meter", default=None)
+
+
+@contextmanager
+def metered_tokens():
+    """
+    统计 with 块内经由路由的模型调用实际消耗的 token
+
+    用法：
+        with metered_tokens() as meter:
+            content = generate_comparison_article(product, competitor_info)
+        budget.charge(meter.tokens)
+    """
+    meter = TokenMeter()
+    token = _token_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _token_meter.reset(token)
+
+
+class ModelPool:
+    """一个 OpenAI 兼容接口 + 模型"""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_concurrency: int = 4,
+        temperature: float = 0.3,
+        timeout: Optional[float] = None,
+        client: Any = None,
+    ):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.temperature = temperature
+        self.timeout = timeout
+        self._client = client
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        # 0 表示闭合；否则为熔断结束时刻，之后进入半开状态
+        self.open_until = 0.0
+        self._probing = False
+        self.ewma_ms: Optional[float] = None
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._ttfts: deque = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def client(self):
+        """每个池一个 ChatOpenAI 实例（各自持有 HTTP 连接池），首次使用时创建"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from langchain_openai import ChatOpenAI
+
+                    if not self.api_key:
+                        raise RuntimeError(f"模型池 {self.name} 缺少 API Key：请在 .env 或环境变量中配置")
+                    self._client = ChatOpenAI(
+                        model=self.model,
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        temperature=self.temperature,
+                        timeout=self.timeout,
+                        max_retries=0,
+                    )
+        return self._client
+
+    def state(self, now: Optional[float] = None) -> str:
+        """closed / open / half_open"""
+        if not self.open_until:
+            return "closed"
+        return "half_open" if (now or time.monotonic()) >= self.open_until else "open"
+
+    def healthy(self, now: Optional[float] = None) -> bool:
+        """闭合，或半开且试探请求还没有发出"""
+        state = self.state(now)
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def _admit(self) -> bool:
+        """
+        调用前检查熔断状态，返回本次调用是否为半开状态的试探请求
+        熔断中、或已有试探请求在途时抛出 CircuitOpenError
+        """
+        with self._lock:
+            state = self.state()
+            if state == "closed":
+                return False
+            if state == "open" or self._probing:
+                raise CircuitOpenError(f"模型池 {self.name} 熔断中")
+            self._probing = True
+            return True
+
+    def load(self) -> float:
+        return self.inflight / self.max_concurrency
+
+    def _record(self, elapsed_ms: Optional[float], failed: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= FAILURE_THRESHOLD:
+                    cooldown = min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (self.consecutive_failures - FAILURE_THRESHOLD))
+                    self.open_until = time.monotonic() + cooldown
+                return
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            self._latencies.append(elapsed_ms)
+            self.ewma_ms = elapsed_ms if self.ewma_ms is None else \
+                EWMA_ALPHA * elapsed_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+
+    def _call(self, messages, call):
+        """占用并发槽位执行 call(span)，记录延迟与成败；试探请求结束（成败已记录）后才放行下一个试探"""
+        probe = self._admit()
+        # 在途数包含排队等待并发槽位的请求，选池时据此分摊负载
+        with self._lock:
+            self.inflight += 1
+        try:
+            with self._slots:
+                started = time.perf_counter()
+                try:
+                    with span("llm.invoke", pool=self.name, model=self.model, prompt_chars=_prompt_chars(messages)) as s:
+                        if probe:
+                            s.set_attribute("circuit_probe", True)
+                        response = call(s)
+                        s.set_attribute("output_chars", len(response.content))
+                        input_tokens, cached = cached_tokens(response)
+                        s.set_attribute("input_tokens", input_tokens)
+                        s.set_attribute("cached_tokens", cached)
+                except RequestCancelled:
+                    # 被取消不代表池不健康，不计入失败
+                    raise
+                except Exception:
+                    self._record(None, failed=True)
+                    raise
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            self._record(elapsed_ms, failed=False)
+        finally:
+            with self._lock:
+                self.inflight -= 1
+                if probe:
+                    self._probing = False
+        return response
+
+    def invoke(self, messages, **kwargs):
+        """调用模型，返回 AIMessage"""
+        return self._call(messages, lambda s: self.client.invoke(messages, **kwargs))
+
+    def stream(self, messages, settled: Optional[threading.Event] = None,
+               cancelled: Optional[threading.Event] = None, **kwargs):
+        """
+        流式调用模型，拼接为完整消息返回
+        收到首 token（或调用结束）时置位 settled；cancelled 置位后在下一个分块处中断并关闭连接。
+        注意：首 token 到达之前无法中断，落败请求会在首个分块到达时退出。
+        默认开启 stream_usage，最后一个分块带回 usage（含缓存命中 token），与非流式调用统计口径一致。
+        """
+        kwargs.setdefault("stream_usage", True)
+
+        def call(s):
+            started = time.perf_counter()
+            response = None
+            chunks = self.client.stream(messages, **kwargs)
+            try:
+                for chunk in chunks:
+                    if response is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                        with self._lock:
+                            self._ttfts.append(ttft_ms)
+                        s.set_attribute("ttft_ms", round(ttft_ms, 1))
+                        if settled is not None:
+                            settled.set()
+                        response = chunk
+                    else:
+                        response = response + chunk
+                    if cancelled is not None and cancelled.is_set():
+                        raise RequestCancelled(self.name)
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+            if response is None:
+                raise RuntimeError(f"模型池 {self.name} 返回了空响应")
+            return response
+
+        try:
+            return self._call(messages, call)
+        finally:
+            if settled is not None:
+                settled.set()
+
+    def hedge_delay(self, percentile: float, min_samples: int, fallback: float) -> float:
+        """发出对冲请求前等待首 token 的时间（秒）：首 token 延迟的分位数，样本不足时用 fallback"""
+        ttfts = list(self._ttfts)
+        if len(ttfts) < min_samples:
+            return fallback
+        return _percentile(ttfts, percentile) / 1000
+
+    def stats(self) -> Dict:
+        latencies = list(self._latencies)
+        ttfts = list(self._ttfts)
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "errors": self.errors,
+            "inflight": self.inflight,
+            "max_concurrency": self.max_concurrency,
+            "healthy": self.healthy(),
+            "circuit": self.state(),
+            "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            "p50_ms": _percentile(latencies, 0.5),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "ttft_p50_ms": _percentile(ttfts, 0.5),
+            "ttft_p95_ms": _percentile(ttfts, 0.95),
+        }
+
+
+class HedgePolicy:
+    """
+    对冲请求策略与预算
+
+    预算按比例累积：每个可对冲的请求存入 budget 个令牌（上限 MAX_TOKENS），
+    每发出一次对冲消耗 1 个，长期看额外请求不超过总请求的 budget 比例。
+    """
+
+    MAX_TOKENS = 10.0
+
+    def __init__(self, enabled: bool = False, percentile: float = 0.95, budget: float = 0.1,
+                 fallback_delay: float = 5.0, min_samples: int = 20):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.fallback_delay = fallback_delay
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        load_dotenv()
+        return cls(
+            enabled=os.environ.get("GEO_MODEL_HEDGE", "0") == "1",
+            percentile=float(os.environ.get("GEO_MODEL_HEDGE_PERCENTILE", "0.95")),
+            budget=float(os.environ.get("GEO_MODEL_HEDGE_BUDGET", "0.1")),
+            fallback_delay=float(os.environ.get("GEO_MODEL_HEDGE_DELAY_MS", "5000")) / 1000,
+        )
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.MAX_TOKENS, self._tokens + self.budget)
+
+    def try_acquire(self) -> bool:
+        """预算允许时占用一次对冲"""
+        with self._lock:
+            if self._tokens < 1:
+                self.denied += 1
+                return False
+            self._tokens -= 1
+            self.hedged += 1
+            return True
+
+    def record_win(self, hedge: bool) -> None:
+        if hedge:
+            with self._lock:
+                self.hedge_wins += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "budget_denied": self.denied,
+                "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+                "win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+            }
+
+
+class ModelRouter:
+    """
+    (策略, 目标平台) → 模型池
+
+    用法：
+        response = get_model_router().invoke(prompt, strategy="comparison", target="deepseek")
+        text = response.content
+    """
+
+    def __init__(self, pools: Dict[str, ModelPool], routes: Optional[Dict[str, Dict[str, List[str]]]] = None,
+                 hedging: Optional[HedgePolicy] = None):
+        if not pools:
+            raise ValueError("至少需要一个模型池")
+        self.pools = pools
+        self.routes = routes or {"*": {"*": list(pools)}}
+        # 按策略统计 prompt 缓存命中
+        self.cache_usage = CacheUsage()
+        self.hedging = hedging or HedgePolicy()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ModelRouter":
+        pools = {}
+        for name, spec in config.get("pools", {}).items():
+            api_key = os.environ.get(spec["api_key_env"]) if spec.get("api_key_env") else spec.get("api_key")
+            pools[name] = ModelPool(
+                name,
+                spec.get("model") or os.environ.get("OPENAI_MODEL", DEFAULT_MODEL),
+                base_url=spec.get("base_url") or os.environ.get("OPENAI_BASE_URL"),
+                api_key=api_key or os.environ.get("OPENAI_API_KEY"),
+                max_concurrency=int(spec.get("max_concurrency", 4)),
+                temperature=float(spec.get("temperature", 0.3)),
+                timeout=spec.get("timeout"),
+            )
+        return cls(pools, config.get("routes"), HedgePolicy.from_env())
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        load_dotenv()
+        path = os.environ.get("GEO_MODEL_POOLS")
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_config(json.load(f))
+        return cls.from_config({"pools": {DEFAULT_POOL: {
+            "max_concurrency": int(os.environ.get("GEO_MODEL_MAX_CONCURRENCY", "8")),
+        }}})
+
+    def route(self, strategy: Optional[str] = None, target: Optional[str] = None) -> List[str]:
+        """按 策略 → 目标平台 查找池列表，逐级回退到通配"""
+        for strategy_key in (strategy, "*"):
+            targets = self.routes.get(strategy_key) if strategy_key else None
+            if not targets:
+                continue
+            for target_key in (target, "*"):
+                if target_key and target_key in targets:
+                    return [name for name in targets[target_key] if name in self.pools]
+        return list(self.pools)
+
+    def candidates(self, strategy: Optional[str] = None, target: Optional[str] = None) -> List[ModelPool]:
+        """健康的池按负载排序在前；熔断中的池排在最后，冷却结束时由先到的请求试探，未冷却时直接拒绝"""
+        names = self.route(strategy, target) or list(self.pools)
+        now = time.monotonic()
+        order = {name: i for i, name in enumerate(names)}
+        pools = [self.pools[name] for name in names]
+        healthy = sorted((p for p in pools if p.healthy(now)), key=lambda p: (p.load() >= 1, p.load(), order[p.name]))
+        unhealthy = sorted((p for p in pools if not p.healthy(now)), key=lambda p: p.open_until)
+        return healthy + unhealthy
+
+    def invoke(self, messages, strategy: Optional[str] = None, target: Optional[str] = None,
+               hedge: Optional[bool] = None, **kwargs):
+        """
+        调用模型，失败时依次转移到下一个候选池
+
+        Args:
+            messages: prompt 字符串或消息列表（见 agents/prompt_layout.py）
+            hedge: 是否使用对冲请求，默认按 GEO_MODEL_HEDGE
+        """
+        candidates = self.candidates(strategy, target)
+        last_error: Optional[Exception] = None
+        use_hedge = self.hedging.enabled if hedge is None else hedge
+        if use_hedge and candidates:
+            tried: List[ModelPool] = []
+            try:
+                response = self._hedged_invoke(candidates, messages, tried, **kwargs)
+            except Exception as e:
+                last_error = e
+                candidates = [p for p in candidates if p not in tried]
+            else:
+                return self._record_usage(strategy, response)
+        for pool in candidates:
+            try:
+                response = pool.invoke(messages, **kwargs)
+            except Exception as e:
+                last_error = e
+                continue
+            return self._record_usage(strategy, response)
+        raise NoHealthyPoolError(f"所有模型池调用失败（策略: {strategy}, 平台: {target}）: {last_error}") from last_error
+
+    def _record_usage(self, strategy: Optional[str], response):
+        self.cache_usage.record(strategy, response)
+        meter = _token_meter.get()
+        if meter is not None:
+            meter.add(response)
+        return response
+
+    def _submit(self, fn, *args, **kwargs):
+        with self._executor_lock:
+            if self._executor is None:
+                workers = 2 * sum(p.max_concurrency for p in self.pools.values())
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-hedge")
+        # 在工作线程中延续当前的追踪上下文
+        return self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def _hedged_invoke(self, candidates: List[ModelPool], messages, tried: List[ModelPool], **kwargs):
+        """首选池超过首 token 延迟分位数未响应时，向下一个候选池发出重复请求，取先完成者"""
+        primary = candidates[0]
+        secondary = candidates[1] if len(candidates) > 1 else primary
+        policy = self.hedging
+        policy.record_request()
+        delay = primary.hedge_delay(policy.percentile, policy.min_samples, policy.fallback_delay)
+
+        tried.append(primary)
+        settled, cancel_primary = threading.Event(), threading.Event()
+        primary_future = self._submit(primary.stream, messages, settled, cancel_primary, **kwargs)
+        # 备选池已满载时对冲只会排队、加重拥塞，直接等待首选池
+        if settled.wait(delay) or secondary.load() >= 1 or not policy.try_acquire():
+            return primary_future.result()
+
+        tried.append(secondary)
+        cancel_hedge = threading.Event()
+        hedge_future = self._submit(secondary.stream, messages, None, cancel_hedge, **kwargs)
+        attempts = {primary_future: (cancel_primary, False), hedge_future: (cancel_hedge, True)}
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        attempts[loser][0].set()
+                    policy.record_win(attempts[future][1])
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def hedge_stats(self) -> Dict:
+        return self.hedging.stats()
+
+
+_default_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    global _default_router
+    with _router_lock:
+        if _default_router is None:
+            _default_router = ModelRouter.from_env()
+        return _default_router
@@ -0,0 +1,20 @@
+"""
+价格解析
+商品表、竞品目录和前端传入的价格可能是数字，也可能是 "¥1,299"、"599元" 这样的字符串，
+统一解析为 float；解析不出数字时返回 None。
+"""
+
+import re
+from typing import Optional
+
+_PRICE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_price(value) -> Optional[float]:
+    """数字原样转 float；字符串取第一个数字（忽略千分位逗号和货币符号）"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if value is None:
+        return None
+    match = _PRICE.search(str(value).strip().replace(",", ""))
+    return float(match.group()) if match else None
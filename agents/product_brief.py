@@ -0,0 +1,306 @@
+"""
+商品简报（两阶段生成的第一阶段）
+同一商品生成 comparison / persona / smzdm_review / smzdm_short 四种文章时，
+原本每次都要让模型从原始的材质、描述、标签重新分析一遍。
+这里先用一次调用产出结构化简报（卖点、材质分析、护理、版型尺码、适用人群、注意事项），
+按商品版本缓存，四个策略的 prompt 用简报代替原始字段。
+
+- 缓存键：商品身份 ID + 参与分析的字段（名称/材质/颜色/描述/品类/标签）+ 简报版本，
+  字段变化即视为新版本；价格不参与分析，改价不会让简报失效
+- 存储：内存 + output/briefs/<键>.json，进程重启后仍可复用
+- 并发：同一商品的多个策略同时请求简报时只调用一次模型，其余等待结果
+- 失败缓存：生成失败后 GEO_BRIEF_FAILURE_TTL 秒（默认 300）内同一商品不再调用模型，
+  四个策略不会各自重试一遍
+- 简报生成失败或关闭（GEO_PRODUCT_BRIEF=0）时，策略 prompt 回退为原始字段
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.fileio import atomic_write
+from agents.product_identity import product_id
+from agents.prompt_layout import PromptLayout, product_block
+from agents.tracing import traced
+
+DEFAULT_BRIEF_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "briefs"
+)
+# 简报 prompt 或结构变化时递增，旧缓存自动失效
+BRIEF_VERSION = 1
+
+# 参与分析的商品字段
+ANALYZED_FIELDS = ("name", "material", "color", "description", "mainCategory", "tags")
+
+# 简报 JSON 字段 → 展示名
+BRIEF_SECTIONS = (
+    ("selling_points", "核心卖点"),
+    ("materials", "材质分析"),
+    ("care", "护理建议"),
+    ("fit", "版型尺码"),
+    ("audience", "适用人群与场景"),
+    ("cautions", "注意事项"),
+)
+
+# 策略 prompt 中与简报并列的基础字段
+BASE_FIELDS = (
+    ("商品名称", "name"),
+    ("价格", "price"),
+    ("颜色", "color"),
+    ("品类", "mainCategory"),
+)
+
+class BriefUnavailable(RuntimeError):
+    """该商品的简报刚生成失败过，失败缓存未过期"""
+
+
+BRIEF_LAYOUT = PromptLayout("brief", """你是一位服装商品分析师，请阅读用户提供的Zara商品信息，提炼一份供文案写作使用的商品简报。
+
+## 输出要求
+只输出一个 JSON 对象，不要输出其他内容，字段如下（均为字符串数组，每条不超过40字）：
+- selling_points：3-5条核心卖点
+- materials：材质成分与工艺分析（保暖性、垂坠感、透气性等）
+- care：护理与洗涤建议
+- fit：版型、尺码与身材适配建议
+- audience：适用人群与穿着场景
+- cautions：需要提醒消费者的缺点或注意事项
+信息不足的字段根据品类常识推断，不要编造具体数据。
+""")
+
+
+def brief_key(product: dict) -> str:
+    """商品版本指纹：分析字段不变时键不变"""
+    fields = {key: product.get(key) for key in ANALYZED_FIELDS}
+    payload = json.dumps([BRIEF_VERSION, product_id(product), fields], ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def parse_brief(text: str) -> Dict:
+    """解析模型输出的 JSON（兼容 ```json 代码块），缺失字段补为空列表"""
+    match = re.search(r"\{.*\}", text or "", re.S)
+    if not match:
+        raise ValueError("简报不是 JSON 对象")
+    data = json.loads(match.group(0))
+    brief = {}
+    for key, _ in BRIEF_SECTIONS:
+        value = data.get(key) or []
+        if isinstance(value, str):
+            value = [value]
+        brief[key] = [str(v).strip() for v in value if str(v).strip()]
+    if not any(brief.values()):
+        raise ValueError("简报内容为空")
+    return brief
+
+
+def render_brief(brief: Dict) -> str:
+    """简报 → Markdown 列表"""
+    blocks = []
+    for key, title in BRIEF_SECTIONS:
+        items = brief.get(key) or []
+        if items:
+            blocks.append(f"**{title}**\n" + "\n".join(f"- {item}" for item in items))
+    return "\n".join(blocks)
+
+
+class BriefCache:
+    """
+    商品简报缓存（内存 + 磁盘）
+
+    用法：
+        brief = get_brief_cache().get_or_create(product, create)
+    """
+
+    def __init__(self, directory: Optional[str] = None, failure_ttl: Optional[float] = None):
+        load_dotenv()
+        self.directory = directory or DEFAULT_BRIEF_DIR
+        if failure_ttl is None:
+            failure_ttl = float(os.environ.get("GEO_BRIEF_FAILURE_TTL") or 300)
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Dict] = {}
+        self._pending: Dict[str, threading.Event] = {}
+        # 键 → (失效时刻, 错误信息)
+        self._failures: Dict[str, Tuple[float, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.failure_hits = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["brief"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, product: dict) -> Optional[Dict]:
+        key = brief_key(product)
+        with self._lock:
+            brief = self._memory.get(key)
+        if brief is None:
+            brief = self._read(key)
+            if brief is not None:
+                with self._lock:
+                    self._memory[key] = brief
+        return brief
+
+    def put(self, product: dict, brief: Dict) -> None:
+        key = brief_key(product)
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(self._path(key), json.dumps({
+            "product_id": product_id(product),
+            "name": product.get("name", ""),
+            "version": BRIEF_VERSION,
+            "generated_at": datetime.now().isoformat(),
+            "brief": brief,
+        }, ensure_ascii=False, indent=2))
+        with self._lock:
+            self._memory[key] = brief
+
+    def _recent_failure(self, key: str) -> Optional[str]:
+        """未过期的失败记录（调用方持有锁）"""
+        failure = self._failures.get(key)
+        if failure is None:
+            return None
+        if failure[0] <= time.monotonic():
+            del self._failures[key]
+            return None
+        return failure[1]
+
+    def get_or_create(self, product: dict, create) -> Dict:
+        """
+        命中缓存直接返回；未命中时调用 create(product) 生成，
+        同一商品并发请求时只有一个调用方执行 create；
+        create 失败后 failure_ttl 秒内直接抛出 BriefUnavailable，不再调用
+        """
+        key = brief_key(product)
+        while True:
+            brief = self.get(product)
+            if brief is not None:
+                with self._lock:
+                    self.hits += 1
+                return brief
+            with self._lock:
+                error = self._recent_failure(key)
+                if error is not None:
+                    self.failure_hits += 1
+                    raise BriefUnavailable(error)
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                # 等待生成者完成后重新查缓存；生成失败时命中失败缓存
+                pending.wait()
+                continue
+            try:
+                with self._lock:
+                    self.misses += 1
+                try:
+                    brief = create(product)
+                except Exception as e:
+                    if self.failure_ttl > 0:
+                        with self._lock:
+                            self._failures[key] = (time.monotonic() + self.failure_ttl, str(e) or type(e).__name__)
+                    raise
+                self.put(product, brief)
+                return brief
+            finally:
+                with self._lock:
+                    del self._pending[key]
+                pending.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "cached": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "failure_hits": self.failure_hits,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+@traced("agent.generate_product_brief")
+def generate_product_brief(product: dict, target: Optional[str] = None) -> Dict:
+    """第一阶段：调用模型分析原始商品字段，返回结构化简报"""
+    from agents.model_router import get_model_router
+
+    messages = BRIEF_LAYOUT.build(
+        ("商品信息", product_block(product, (
+            ("商品名称", "name"),
+            ("材质", "material"),
+            ("颜色", "color"),
+            ("描述", "description"),
+            ("品类", "mainCategory"),
+            ("标签", "tags"),
+        ))),
+        closing="请输出 JSON：",
+    )
+    response = get_model_router().invoke(messages, strategy="brief", target=target)
+    return parse_brief(response.content)
+
+
+_default_cache: Optional[BriefCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_brief_cache() -> BriefCache:
+    global _default_cache
+    with _cache_lock:
+        if _default_cache is None:
+            _default_cache = BriefCache()
+        return _default_cache
+
+
+def brief_enabled() -> bool:
+    load_dotenv()
+    return os.environ.get("GEO_PRODUCT_BRIEF", "1") != "0"
+
+
+def product_brief(product: dict, target: Optional[str] = None) -> Optional[str]:
+    """
+    商品简报的 Markdown 文本；关闭或生成失败时返回 None，调用方回退为原始字段
+    """
+    if not brief_enabled():
+        return None
+    try:
+        brief = get_brief_cache().get_or_create(product, lambda p: generate_product_brief(p, target))
+    except BriefUnavailable:
+        # 刚失败过，已经提示过一次
+        return None
+    except Exception as e:
+        print(f"⚠️ 商品简报生成失败，使用原始字段: {e}")
+        return None
+    return render_brief(brief)
+
+
+def briefed_product_info(product: dict, fallback_fields, target: Optional[str] = None, tag_limit: int = 15) -> str:
+    """
+    第二阶段各策略的商品信息：基础字段 + 简报；没有简报时使用 fallback_fields 的原始字段
+    """
+    brief = product_brief(product, target)
+    if brief is None:
+        return product_block(product, fallback_fields, tag_limit=tag_limit)
+    return product_block(product, BASE_FIELDS) + "\n\n" + brief
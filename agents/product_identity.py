@@ -0,0 +1,98 @@
+"""
+商品身份
+没有 SPU 的商品（如前端手填的商品名）需要一个跨进程、跨重启都稳定的标识，
+用于缓存、去重和文章存储的键。Python 内置 hash() 对字符串加了进程级随机盐，不能用。
+
+- 规范化：NFKC（全角 → 半角）、casefold、去掉空白和标点、去掉品牌前缀
+- 身份内容：商品名 + 材质 + 颜色 + 品类（同名不同色的商品是不同身份）；只有商品名时按名称
+- 哈希：blake2b，64 位（16 位十六进制）作为身份 ID，128 位用于需要更低碰撞率的场景
+- 映射：商品库中已知的商品按身份 ID 反查真实 SPU（内容身份优先，其次名称身份；
+  同一身份对应多个 SPU 时视为无法确定），未知商品使用 "SKU-<身份ID>"
+"""
+
+import hashlib
+import unicodedata
+from typing import Dict, Optional
+
+DEFAULT_BRAND = "zara"
+SYNTHETIC_PREFIX = "SKU-"
+# 参与身份的内容字段：(字段, 备选字段)
+IDENTITY_FIELDS = (("material", None), ("color", None), ("mainCategory", "category"))
+# 前端未填写时的占位值，与空值等价（“服装”是生成接口未填品类时的默认品类）
+PLACEHOLDER_VALUES = {"未知", "服装", "unknown", "none", "null", "-"}
+
+
+def normalize_name(name: str, brand: str = DEFAULT_BRAND) -> str:
+    """
+    商品名规范化
+    “ＺＡＲＡ 纯羊毛 修身外套！” 与 “纯羊毛修身外套” 得到同一个结果
+    """
+    text = unicodedata.normalize("NFKC", str(name or "")).casefold()
+    text = "".join(
+        ch for ch in text
+        if not ch.isspace() and unicodedata.category(ch)[0] not in ("P", "S")
+    )
+    if brand and text.startswith(brand) and len(text) > len(brand):
+        text = text[len(brand):]
+    return text
+
+
+def product_hash(name: str, bits: int = 64) -> str:
+    """规范化商品名的哈希（十六进制），bits 取 64 或 128"""
+    digest = hashlib.blake2b(normalize_name(name).encode("utf-8"), digest_size=bits // 8)
+    return digest.hexdigest()
+
+
+def _field(product: Dict, field: str, fallback: Optional[str]) -> str:
+    value = product.get(field) or (product.get(fallback) if fallback else "") or ""
+    value = normalize_name(value, brand="")
+    return "" if value in PLACEHOLDER_VALUES else value
+
+
+def identity_text(product: Dict) -> str:
+    """身份内容：规范化的 商品名/材质/颜色/品类；内容字段全为空时退化为商品名"""
+    fields = [_field(product, field, fallback) for field, fallback in IDENTITY_FIELDS]
+    name = normalize_name(product.get("name", ""))
+    if not any(fields):
+        return name
+    return "\x1f".join([name] + fields)
+
+
+def product_id(product) -> str:
+    """
+    商品身份 ID（64 位）
+
+    Args:
+        product: 商品 dict（取 name/material/color/mainCategory）或商品名
+    """
+    if not isinstance(product, dict):
+        return product_hash(product)
+    return hashlib.blake2b(identity_text(product).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def name_id(product) -> str:
+    """只按商品名的身份 ID（内容字段对不上时的退路）"""
+    return product_hash(product.get("name", "") if isinstance(product, dict) else product)
+
+
+def synthetic_spu(product) -> str:
+    return f"{SYNTHETIC_PREFIX}{product_id(product)}"
+
+
+def resolve_spu(product, store=None) -> str:
+    """
+    商品的 SPU：自带 SPU 时直接使用，否则在商品库中查找真实 SPU：
+    先按内容身份，再按商品名身份，只在唯一对应一个 SPU 时采用（同名的不同颜色不会被合并）；
+    都没有时返回稳定的合成 SPU
+    """
+    if isinstance(product, dict) and product.get("spu"):
+        return str(product["spu"])
+    if store is None:
+        from agents.product_store import get_product_store
+
+        store = get_product_store()
+    for identity in dict.fromkeys((product_id(product), name_id(product))):
+        known: Optional[str] = store.spu_for_identity(identity)
+        if known:
+            return known
+    return synthetic_spu(product)
@@ -0,0 +1,174 @@
+"""
+商品存储（SQLite）
+保存采集和批量导入的商品，字段与 fetch_zara_products 产出的商品 dict 一致，
+按 SPU 主键去重，品类/名称建索引，批量写入走 executemany。
+同时维护 商品身份 ID → SPU 的映射（内容身份与商品名身份各一条，一个身份可对应多个 SPU，
+如同名的不同颜色），供没有 SPU 的请求反查真实 SPU。
+
+默认路径 output/products.db，可通过 GEO_PRODUCT_DB 覆盖。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.product_identity import name_id, product_id
+
+DEFAULT_PRODUCT_DB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "products.db"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    spu TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL,
+    main_category TEXT,
+    source TEXT,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(main_category);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+CREATE TABLE IF NOT EXISTS product_identities (
+    identity TEXT NOT NULL,
+    spu TEXT NOT NULL,
+    PRIMARY KEY (identity, spu)
+);
+CREATE INDEX IF NOT EXISTS idx_product_identities_spu ON product_identities(spu);
+"""
+
+_INSERT_IDENTITY = "INSERT OR IGNORE INTO product_identities (identity, spu) VALUES (?, ?)"
+
+_UPSERT = """
+INSERT INTO products (spu, name, price, main_category, source, updated_at, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(spu) DO UPDATE SET
+    name = excluded.name,
+    price = excluded.price,
+    main_category = excluded.main_category,
+    source = excluded.source,
+    updated_at = excluded.updated_at,
+    data = excluded.data
+"""
+
+
+def _identities(product: Dict) -> List[tuple]:
+    """商品的 (身份 ID, SPU)：内容身份 + 商品名身份"""
+    if not product.get("name"):
+        return []
+    spu = str(product["spu"])
+    return [(identity, spu) for identity in dict.fromkeys((product_id(product), name_id(product)))]
+
+
+class ProductStore:
+    """SQLite 商品库（每个线程独立连接）"""
+
+    def __init__(self, path: Optional[str] = None):
+        load_dotenv()
+        self.path = path or os.environ.get("GEO_PRODUCT_DB") or DEFAULT_PRODUCT_DB
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert_many(self, products: Iterable[Dict], source: str = "crawl") -> int:
+        """批量写入（同 SPU 覆盖），返回写入条数"""
+        # 商品行和身份映射各遍历一次，生成器需要先展开
+        products = list(products)
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                str(p["spu"]),
+                p.get("name", ""),
+                p.get("price") if isinstance(p.get("price"), (int, float)) else None,
+                p.get("mainCategory", ""),
+                source,
+                now,
+                json.dumps(p, ensure_ascii=False),
+            )
+            for p in products
+        ]
+        if not rows:
+            return 0
+        identities = [pair for p in products for pair in _identities(p)]
+        conn = self._connect()
+        with conn:
+            conn.executemany(_UPSERT, rows)
+            # 商品改名/改色后旧身份不再指向它
+            conn.executemany("DELETE FROM product_identities WHERE spu = ?", [(row[0],) for row in rows])
+            conn.executemany(_INSERT_IDENTITY, identities)
+        return len(rows)
+
+    def spus_for_identity(self, identity: str) -> List[str]:
+        """商品身份 ID → 全部对应的 SPU"""
+        cursor = self._connect().execute("SELECT spu FROM product_identities WHERE identity = ? ORDER BY spu", (identity,))
+        return [row[0] for row in cursor]
+
+    def spu_for_identity(self, identity: str) -> Optional[str]:
+        """商品身份 ID → 真实 SPU；对应多个 SPU（无法确定是哪一个）时返回 None"""
+        spus = self.spus_for_identity(identity)
+        return spus[0] if len(spus) == 1 else None
+
+    def get(self, spu: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT data FROM products WHERE spu = ?", (spu,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, category: Optional[str] = None) -> int:
+        if category:
+            sql, params = "SELECT COUNT(*) FROM products WHERE main_category = ?", (category,)
+        else:
+            sql, params = "SELECT COUNT(*) FROM products", ()
+        return self._connect().execute(sql, params).fetchone()[0]
+
+    def list(self, category: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        if category:
+            sql = "SELECT data FROM products WHERE main_category = ? ORDER BY updated_at DESC LIMIT ? OFFSET ?"
+            params = (category, limit, offset)
+        else:
+            sql = "SELECT data FROM products ORDER BY updated_at DESC LIMIT ? OFFSET ?"
+            params = (limit, offset)
+        return [json.loads(row[0]) for row in self._connect().execute(sql, params)]
+
+    def iter_products(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """流式遍历全部商品"""
+        cursor = self._connect().execute("SELECT data FROM products ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row[0])
+
+
+_default_store: Optional[ProductStore] = None
+
+
+def get_product_store() -> ProductStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = ProductStore()
+    return _default_store
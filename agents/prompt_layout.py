@@ -0,0 +1,108 @@
+"""
+Prompt 布局
+服务商的 prompt 缓存按前缀命中：请求开头与之前某次请求逐字节相同的部分才能复用。
+因此每个策略的 prompt 按“静态 → 动态”排列：
+- system 消息：角色设定、平台风格指南、写作要求、输出格式，整个进程内逐字节不变
+- user 消息：相对稳定的资料（竞品信息、用户画像）在前，商品字段在最后
+
+同时从响应的 usage 元数据中统计缓存命中的输入 token，按策略汇总命中率。
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Message = Tuple[str, str]
+
+
+class PromptLayout:
+    """
+    一个策略的 prompt 结构
+
+    用法：
+        layout = PromptLayout("comparison", system=COMPARISON_SYSTEM)
+        messages = layout.build(("竞品市场信息", competitor_info), ("商品信息", product_block))
+    """
+
+    def __init__(self, strategy: str, system: str):
+        self.strategy = strategy
+        # 去掉首尾空白，保证不同调用方拼出的前缀完全一致
+        self.system = system.strip()
+
+    def build(self, *sections: Tuple[str, str], closing: Optional[str] = None) -> List[Message]:
+        """
+        Args:
+            sections: (小标题, 内容)，按从稳定到易变的顺序传入
+            closing: user 消息结尾的指令（如“请直接输出完整文章内容：”）
+        """
+        parts = [f"## {title}\n{content.strip()}" for title, content in sections if content and content.strip()]
+        if closing:
+            parts.append(closing)
+        return [("system", self.system), ("human", "\n\n".join(parts))]
+
+
+def product_block(product: dict, fields: Sequence[Tuple[str, str]], tag_limit: int = 15) -> str:
+    """商品字段 → “- 字段名：值” 列表"""
+    lines = []
+    for label, key in fields:
+        value = product.get(key)
+        if key == "price":
+            value = f"¥{value}"
+        elif isinstance(value, (list, tuple)):
+            value = ", ".join(str(v) for v in value[:tag_limit])
+        lines.append(f"- {label}：{value}")
+    return "\n".join(lines)
+
+
+def cached_tokens(response) -> Tuple[int, int]:
+    """
+    从响应中读取 (输入 token, 其中命中缓存的 token)
+    兼容 langchain 的 usage_metadata 和 OpenAI 原始的 token_usage
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return int(usage.get("input_tokens") or 0), int(details.get("cache_read") or 0)
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return int(token_usage.get("prompt_tokens") or 0), int(details.get("cached_tokens") or 0)
+
+
+def total_tokens(response) -> int:
+    """响应实际消耗的 token（输入 + 输出），服务商未返回 usage 时为 0"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        return int(usage.get("total_tokens") or 0) or int(usage.get("input_tokens") or 0) + int(usage.get("output_tokens") or 0)
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    return int(token_usage.get("total_tokens") or 0) or \
+        int(token_usage.get("prompt_tokens") or 0) + int(token_usage.get("completion_tokens") or 0)
+
+
+class CacheUsage:
+    """按策略累计输入 token 与缓存命中 token"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+
+    def record(self, strategy: Optional[str], response) -> Tuple[int, int]:
+        input_tokens, cached = cached_tokens(response)
+        with self._lock:
+            totals = self._totals[strategy or "*"]
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["cached_tokens"] += cached
+        return input_tokens, cached
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                strategy: dict(
+                    totals,
+                    uncached_tokens=totals["input_tokens"] - totals["cached_tokens"],
+                    cached_ratio=round(totals["cached_tokens"] / totals["input_tokens"], 3) if totals["input_tokens"] else 0.0,
+                )
+                for strategy, totals in self._totals.items()
+            }
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+静态站发布（GitHub Pages）
+把 output/articles 中生成的文章渲染成静态站：
+- sku/<spu>.html：每个 SKU 一页，汇总各策略最新文章，带 schema.org Product JSON-LD
+- category/<品类>.html：品类索引页
+- index.html：品类目录
+- sitemap.xml：sitemap 索引，按品类拆分子 sitemap
+
+增量构建：源文章取自文章索引（SPU → 策略 → 最新文章及其内容哈希），站点目录下的
+.manifest.json 记录上次发布时各 (SPU, 策略) 的内容哈希和每个页面的输入哈希，
+重新发布时只比较哈希，只重新渲染受影响的 SKU 页、品类页和对应品类的 sitemap。
+
+配置（.env 或环境变量）：
+- GEO_SITE_DIR：站点输出目录，默认 output/site
+- GEO_SITE_URL：站点根地址（用于 sitemap 和 canonical），默认 http://localhost:8000
+
+用法：
+    python agents/publisher.py           # 增量构建
+    python agents/publisher.py --full    # 全量重建
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote, urlparse
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.article_output import ArticleIndex, get_article_index, read_article_text, split_front_matter
+from agents.image_store import image_file
+from agents.tracing import span
+
+OUTPUT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output"
+)
+DEFAULT_SITE_DIR = os.path.join(OUTPUT_DIR, "site")
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 2
+UNCATEGORIZED = "未分类"
+# 参与 SKU 页输入哈希的商品字段（页面和 JSON-LD 用到的），品类和名称另算
+PAGE_PRODUCT_FIELDS = ("price", "image", "image_sha256", "description", "material", "color", "brand")
+
+STRATEGY_TITLES = {
+    "comparison": "评测对比",
+    "persona": "选购指南",
+    "smzdm_review": "深度评测",
+    "smzdm_short": "好物短评",
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="canonical" href="{canonical}">
+{head}
+</head>
+<body>
+<nav><a href="{root}index.html">首页</a>{breadcrumb}</nav>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+
+# ---------------------------------------------------------------------------
+# Markdown 渲染（安装了 markdown 包时优先使用）
+# ---------------------------------------------------------------------------
+
+_INLINE_CODE = re.compile(r"`([^`]+)`")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])")
+_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_ORDERED = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_UNORDERED = re.compile(r"^\s*[-*+]\s+(.*)$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+_URL_ATTR = re.compile(r'\b(href|src)="([^"]*)"')
+# 浏览器解析 URL 前会去掉的控制字符和空白（"java\tscript:" 仍是 javascript:）
+_URL_IGNORED = re.compile(r"[\x00-\x20\x7f]+")
+SAFE_URL_SCHEMES = ("", "http", "https")
+
+
+def safe_url(url: str) -> Optional[str]:
+    """LLM 生成的链接只允许 http(s) 和相对地址，其余（javascript:、data: 等）返回 None"""
+    url = url.strip()
+    if urlparse(_URL_IGNORED.sub("", url)).scheme.lower() not in SAFE_URL_SCHEMES:
+        return None
+    return url
+
+
+def _link(match) -> str:
+    url = safe_url(html.unescape(match.group(2)))
+    if url is None:
+        return match.group(1)
+    return f'<a href="{html.escape(url)}">{match.group(1)}</a>'
+
+
+def _inline(text: str) -> str:
+    text = html.escape(text, quote=False)
+    text = _INLINE_CODE.sub(r"<code>\1</code>", text)
+    text = _BOLD.sub(r"<strong>\1</strong>", text)
+    text = _ITALIC.sub(r"<em>\1</em>", text)
+    return _LINK.sub(_link, text)
+
+
+def _table_cells(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _render_markdown_basic(text: str) -> str:
+    """够用的 Markdown 子集：标题、段落、列表、引用、表格、分隔线、行内强调/代码/链接"""
+    lines = text.splitlines()
+    out: List[str] = []
+    paragraph: List[str] = []
+    list_tag: Optional[str] = None
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"<p>{'<br>'.join(_inline(l) for l in paragraph)}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        heading = _HEADING.match(stripped)
+        ordered = _ORDERED.match(line)
+        unordered = _UNORDERED.match(line)
+
+        if not stripped:
+            flush_paragraph()
+            close_list()
+        elif heading:
+            flush_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif stripped in ("---", "***", "___"):
+            flush_paragraph()
+            close_list()
+            out.append("<hr>")
+        elif stripped.startswith("|") and i + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[i + 1]):
+            flush_paragraph()
+            close_list()
+            header = "".join(f"<th>{_inline(c)}</th>" for c in _table_cells(stripped))
+            rows = []
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                rows.append("<tr>" + "".join(f"<td>{_inline(c)}</td>" for c in _table_cells(lines[i])) + "</tr>")
+                i += 1
+            out.append(f"<table><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+            continue
+        elif stripped.startswith(">"):
+            flush_paragraph()
+            close_list()
+            out.append(f"<blockquote>{_inline(stripped.lstrip('> '))}</blockquote>")
+        elif ordered or unordered:
+            flush_paragraph()
+            tag = "ol" if ordered else "ul"
+            if list_tag != tag:
+                close_list()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{_inline((ordered or unordered).group(1))}</li>")
+        else:
+            close_list()
+            paragraph.append(stripped)
+        i += 1
+
+    flush_paragraph()
+    close_list()
+    return "\n".join(out)
+
+
+def _sanitize_url_attr(match) -> str:
+    url = safe_url(html.unescape(match.group(2)))
+    return f'{match.group(1)}="{html.escape(url) if url is not None else "#"}"'
+
+
+try:  # pragma: no cover - markdown 为可选依赖
+    import markdown as _markdown
+
+    def render_markdown(text: str) -> str:
+        # 关闭原始 HTML（块级与行内），<script> 等按文本转义输出；链接地址同样只允许 http(s) 和相对地址
+        md = _markdown.Markdown(extensions=["tables"])
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        return _URL_ATTR.sub(_sanitize_url_attr, md.convert(text))
+except ImportError:
+    render_markdown = _render_markdown_basic
+
+
+# ---------------------------------------------------------------------------
+# 源文章读取
+# ---------------------------------------------------------------------------
+
+def read_article_body(path: str) -> str:
+    return split_front_matter(read_article_text(path))[1]
+
+
+def load_product_lookup() -> Dict[str, dict]:
+    """采集的商品数据（用于品类、价格、图片等结构化字段）"""
+    path = os.path.join(OUTPUT_DIR, "zara_products_data.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {str(p["spu"]): p for p in json.load(f).get("products", [])}
+
+
+def slugify(value: str) -> str:
+    return re.sub(r"[^\w-]+", "-", value).strip("-") or "item"
+
+
+class SitePublisher:
+    """
+    增量静态站构建器
+
+    用法：
+        publisher = SitePublisher()
+        report = publisher.build()
+    """
+
+    def __init__(
+        self,
+        articles_dir: Optional[str] = None,
+        site_dir: Optional[str] = None,
+        base_url: Optional[str] = None,
+        products: Optional[Dict[str, dict]] = None,
+    ):
+        load_dotenv()
+        self.articles: ArticleIndex = get_article_index(articles_dir)
+        self.site_dir = site_dir or os.environ.get("GEO_SITE_DIR") or DEFAULT_SITE_DIR
+        self.base_url = (base_url or os.environ.get("GEO_SITE_URL") or "http://localhost:8000").rstrip("/")
+        self._products = products
+        self.manifest_path = os.path.join(self.site_dir, MANIFEST_NAME)
+
+    @property
+    def products(self) -> Dict[str, dict]:
+        if self._products is None:
+            self._products = load_product_lookup()
+        return self._products
+
+    # -- manifest -----------------------------------------------------------
+
+    def _load_manifest(self) -> Dict:
+        empty = {"version": MANIFEST_VERSION, "sources": {}, "pages": {}, "categories": {}}
+        if not os.path.exists(self.manifest_path):
+            return empty
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if manifest.get("version") == MANIFEST_VERSION else empty
+
+    def _save_manifest(self, manifest: Dict) -> None:
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.manifest_path)
+
+    def _write(self, relpath: str, content: str) -> None:
+        path = os.path.join(self.site_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def _remove(self, relpath: str) -> None:
+        try:
+            os.remove(os.path.join(self.site_dir, relpath))
+        except FileNotFoundError:
+            pass
+
+    # -- 源文件扫描 ----------------------------------------------------------
+
+    def _scan_sources(self, manifest: Dict) -> Set[str]:
+        """对比文章索引与上次发布的内容哈希，更新 manifest["sources"]，返回受影响的 SPU"""
+        sources = manifest["sources"]
+        affected: Set[str] = set()
+        seen: Set[str] = set()
+        for spu, strategy, entry in self.articles.items():
+            key = f"{spu}/{strategy}"
+            seen.add(key)
+            previous = sources.get(key)
+            if previous and previous["hash"] == entry["hash"] and previous["file"] == entry["file"]:
+                continue
+            sources[key] = {
+                "spu": spu,
+                "strategy": strategy,
+                "file": entry["file"],
+                "hash": entry["hash"],
+                "name": entry.get("name", ""),
+                "generated_at": entry["generated_at"],
+            }
+            affected.add(spu)
+        for key in set(sources) - seen:
+            affected.add(sources.pop(key)["spu"])
+        return affected
+
+    # -- 渲染 ----------------------------------------------------------------
+
+    def _page(self, title: str, relpath: str, body: str, head: str = "", breadcrumb: str = "") -> str:
+        depth = relpath.count("/")
+        return PAGE_TEMPLATE.format(
+            title=html.escape(title),
+            canonical=html.escape(f"{self.base_url}/{quote(relpath)}"),
+            head=head,
+            root="../" * depth,
+            breadcrumb=breadcrumb,
+            body=body,
+        )
+
+    def _site_image(self, product: dict) -> Optional[str]:
+        """图片管线缓存过的商品图复制到站点 images/ 下（按图片内容哈希命名，已存在则不再复制），返回站内路径"""
+        source = image_file(product, "medium")
+        if source is None:
+            return None
+        suffix = "-medium" if "medium" in (product.get("image_variants") or {}) else ""
+        relpath = f"images/{product['image_sha256']}{suffix}{os.path.splitext(source)[1]}"
+        target = os.path.join(self.site_dir, relpath)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target + ".tmp")
+            os.replace(target + ".tmp", target)
+        return relpath
+
+    def _product_jsonld(self, spu: str, name: str, product: dict, relpath: str) -> str:
+        data = {
+            "@context": "https://schema.org",
+            "@type": "Product",
+            "sku": spu,
+            "name": name,
+            "brand": {"@type": "Brand", "name": product.get("brand", "Zara")},
+            "url": f"{self.base_url}/{quote(relpath)}",
+        }
+        if product.get("description"):
+            data["description"] = product["description"]
+        site_image = self._site_image(product)
+        if site_image:
+            data["image"] = f"{self.base_url}/{quote(site_image)}"
+        elif product.get("image"):
+            data["image"] = product["image"]
+        if product.get("material"):
+            data["material"] = product["material"]
+        if product.get("color"):
+            data["color"] = product["color"]
+        if product.get("mainCategory"):
+            data["category"] = product["mainCategory"]
+        if isinstance(product.get("price"), (int, float)):
+            data["offers"] = {
+                "@type": "Offer",
+                "price": f"{product['price']:.2f}",
+                "priceCurrency": "CNY",
+                "availability": "https://schema.org/InStock",
+            }
+        payload = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
+        return f'<script type="application/ld+json">{payload}</script>'
+
+    def _category(self, spu: str) -> str:
+        return self.products.get(spu, {}).get("mainCategory") or UNCATEGORIZED
+
+    def _page_hash(self, spu: str, entries: List[Dict]) -> str:
+        """SKU 页的输入哈希：各策略最新文章的内容哈希 + 页面用到的商品字段（名称、品类、价格、图片等）"""
+        latest = {entry["strategy"]: entry for entry in entries}
+        product = self.products.get(spu, {})
+        name = product.get("name") or next((e["name"] for e in latest.values() if e["name"]), spu)
+        inputs = [sorted((s, e["hash"]) for s, e in latest.items()), name, self._category(spu)]
+        inputs += [product.get(field) for field in PAGE_PRODUCT_FIELDS]
+        return hashlib.blake2b(json.dumps(inputs, ensure_ascii=False, default=str).encode("utf-8"),
+                               digest_size=16).hexdigest()
+
+    def _render_sku(self, spu: str, entries: List[Dict], category: str) -> Dict:
+        """渲染 SKU 页（每个策略取最新一篇），返回页面记录"""
+        latest = {entry["strategy"]: entry for entry in entries}
+        product = self.products.get(spu, {})
+        name = product.get("name") or next((e["name"] for e in latest.values() if e["name"]), spu)
+        page_hash = self._page_hash(spu, entries)
+        relpath = f"sku/{slugify(spu)}.html"
+        record = {"name": name, "category": category, "hash": page_hash, "path": relpath,
+                  "updated": max(e["generated_at"] for e in latest.values())}
+
+        sections = []
+        for strategy in STRATEGY_TITLES:
+            entry = latest.get(strategy)
+            if entry is None:
+                continue
+            body = read_article_body(self.articles.path_of(entry))
+            sections.append(
+                f'<article id="{strategy}"><p class="meta">{STRATEGY_TITLES[strategy]} · {html.escape(entry["generated_at"][:10])}</p>\n'
+                f"{render_markdown(body)}</article>"
+            )
+        category_link = f' / <a href="../category/{quote(slugify(category))}.html">{html.escape(category)}</a>'
+        self._write(relpath, self._page(
+            name, relpath, "\n".join(sections),
+            head=self._product_jsonld(spu, name, product, relpath),
+            breadcrumb=category_link,
+        ))
+        return record
+
+    def _render_category(self, category: str, pages: Dict[str, Dict]) -> str:
+        members = sorted((p["name"], spu, p["path"]) for spu, p in pages.items() if p["category"] == category)
+        relpath = f"category/{slugify(category)}.html"
+        if not members:
+            self._remove(relpath)
+            return ""
+        items = "\n".join(f'<li><a href="../{quote(path)}">{html.escape(name)}</a></li>' for name, _, path in members)
+        body = f"<h1>{html.escape(category)}</h1>\n<p>共 {len(members)} 款</p>\n<ul>\n{items}\n</ul>"
+        self._write(relpath, self._page(category, relpath, body))
+        return relpath
+
+    def _render_sitemap(self, category: str, pages: Dict[str, Dict]) -> None:
+        relpath = f"sitemaps/{slugify(category)}.xml"
+        urls = [
+            f"<url><loc>{html.escape(self.base_url)}/{quote(p['path'])}</loc><lastmod>{p['updated'][:10]}</lastmod></url>"
+            for p in pages.values() if p["category"] == category
+        ]
+        if not urls:
+            self._remove(relpath)
+            return
+        urls.append(f"<url><loc>{html.escape(self.base_url)}/{quote(f'category/{slugify(category)}.html')}</loc></url>")
+        self._write(relpath, '<?xml version="1.0" encoding="UTF-8"?>\n'
+                             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                             + "\n".join(urls) + "\n</urlset>\n")
+
+    def _render_root(self, categories: Dict[str, int]) -> None:
+        items = "\n".join(
+            f'<li><a href="category/{quote(slugify(c))}.html">{html.escape(c)}</a>（{n}）</li>'
+            for c, n in sorted(categories.items())
+        )
+        self._write("index.html", self._page("商品内容索引", "index.html", f"<h1>商品内容索引</h1>\n<ul>\n{items}\n</ul>"))
+        sitemaps = "\n".join(
+            f"<sitemap><loc>{html.escape(self.base_url)}/sitemaps/{quote(slugify(c))}.xml</loc></sitemap>"
+            for c in sorted(categories)
+        )
+        self._write("sitemap.xml", '<?xml version="1.0" encoding="UTF-8"?>\n'
+                                   '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                                   + sitemaps + "\n</sitemapindex>\n")
+
+    # -- 构建 ----------------------------------------------------------------
+
+    def build(self, full: bool = False) -> Dict:
+        """
+        构建站点（默认增量）
+
+        Returns:
+            构建报告：扫描的源文件数、重新渲染的 SKU/品类页数、耗时
+        """
+        started = time.perf_counter()
+        os.makedirs(self.site_dir, exist_ok=True)
+        manifest = {"version": MANIFEST_VERSION, "sources": {}, "pages": {}, "categories": {}} if full \
+            else self._load_manifest()
+
+        with span("publisher.build", full=full) as s:
+            affected = self._scan_sources(manifest)
+            if full:
+                affected |= set(manifest["pages"])
+
+            by_spu: Dict[str, List[Dict]] = defaultdict(list)
+            for source in manifest["sources"].values():
+                by_spu[source["spu"]].append(source)
+
+            pages = manifest["pages"]
+            # 文章没变但商品数据（品类、价格、图片等）变了的页面：输入哈希对不上就重新渲染
+            for spu, page in pages.items():
+                if spu not in affected and spu in by_spu and page.get("hash") != self._page_hash(spu, by_spu[spu]):
+                    affected.add(spu)
+
+            dirty_categories: Set[str] = set()
+            rendered = 0
+            for spu in affected:
+                previous = pages.get(spu)
+                if previous:
+                    dirty_categories.add(previous["category"])
+                entries = by_spu.get(spu)
+                if not entries:
+                    if previous:
+                        self._remove(previous["path"])
+                        del pages[spu]
+                    continue
+                category = self._category(spu)
+                record = self._render_sku(spu, entries, category)
+                rendered += 1
+                pages[spu] = record
+                if previous is None or (previous["name"], previous["category"]) != (record["name"], record["category"]) \
+                        or previous.get("updated") != record["updated"]:
+                    dirty_categories.add(category)
+
+            for category in dirty_categories:
+                self._render_category(category, pages)
+                self._render_sitemap(category, pages)
+
+            counts: Dict[str, int] = defaultdict(int)
+            for page in pages.values():
+                counts[page["category"]] += 1
+            if dirty_categories or counts != manifest["categories"]:
+                self._render_root(counts)
+            manifest["categories"] = dict(counts)
+            self._save_manifest(manifest)
+
+            report = {
+                "sources": len(manifest["sources"]),
+                "pages": len(pages),
+                "rendered_pages": rendered,
+                "rendered_categories": len(dirty_categories),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            s.set_attribute("rendered_pages", rendered)
+        return report
+
+
+def publish(full: bool = False, **kwargs) -> Dict:
+    return SitePublisher(**kwargs).build(full=full)
+
+
+def main():
+    """构建静态站"""
+    load_dotenv()
+    full = "--full" in sys.argv
+    print(f"🌐 {'全量' if full else '增量'}构建静态站...")
+    publisher = SitePublisher()
+    report = publisher.build(full=full)
+    print(f"• 源文章: {report['sources']}")
+    print(f"• SKU 页面: {report['pages']}（本次渲染 {report['rendered_pages']}）")
+    print(f"• 重新渲染品类页: {report['rendered_categories']}")
+    print(f"• 耗时: {report['seconds']}s")
+    print(f"✅ 站点目录: {publisher.site_dir}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
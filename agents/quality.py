@@ -0,0 +1,269 @@
+"""
+生成内容质量关卡
+两级评估：
+1. 本地结构检查（毫秒级）：模板“写作要求”对应的必需段落、对比表格、FAQ 数量、
+   字数范围、违禁/套话短语（Aho-Corasick 一次扫描）
+2. 只有落在中间分数段的文章才交给 LLM 打分，明显合格/不合格的直接判定
+
+不合格的文章在重试预算内自动重新生成，最终返回得分最高的一版。
+
+配置（.env 或环境变量）：
+- GEO_QUALITY_RETRIES：不合格时的重试次数，默认 1
+- GEO_QUALITY_LLM_GRADER：是否对边界文章调用 LLM 打分，默认 1
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.text_match import AhoCorasick
+from agents.tracing import span
+
+PASS_THRESHOLD = 0.85
+FAIL_THRESHOLD = 0.5
+LLM_PASS_SCORE = 7
+
+# 出现即判定不合格的短语（模型自述、拒答）
+HARD_BANNED_PHRASES = (
+    "作为一个AI", "作为AI", "作为一个人工智能", "作为人工智能", "AI语言模型", "我无法提供", "很抱歉，我不能",
+    "As an AI", "I cannot",
+)
+
+# 扣分短语（广告法极限词、空洞套话）
+SOFT_BANNED_PHRASES = (
+    "全网最低", "史上最低", "最便宜", "第一品牌", "国家级", "顶级", "最佳", "绝对", "100%有效", "无敌",
+    "综上所述", "总而言之", "值得注意的是",
+)
+
+# 各策略的默认要求（模板中未写明时使用）
+DEFAULT_REQUIREMENTS = {
+    "comparison": {"title": True, "table": True, "faq_min": 3, "pros_cons": True, "advice": True, "min_chars": 800, "max_chars": 6000},
+    "persona": {"title": True, "advice": True, "min_chars": 800, "max_chars": 6000},
+    "smzdm_review": {"title": True, "pros_cons": True, "advice": True, "min_chars": 1200, "max_chars": 4000},
+    "smzdm_short": {"title": True, "pros_cons": True, "min_chars": 400, "max_chars": 1200},
+}
+
+_RANGE = re.compile(r"(\d+)\s*[-~－—至到]\s*(\d+)\s*字")
+_AT_LEAST_FAQ = re.compile(r"(?:FAQ|常见问题)[^\n]*?至少\s*(\d+)")
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$", re.M)
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)+\|?\s*$", re.M)
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+)$", re.M)
+_FAQ_SECTION = re.compile(r"^\s{0,3}#{1,6}\s*.*(?:FAQ|常见问题|Q&A|问答).*$", re.M | re.I)
+_QUESTION = re.compile(r"^\s*(?:[-*]\s*)?(?:\*\*)?\s*(?:Q\s*\d*\s*[:：.、]|问\s*\d*\s*[:：]|\d+[.、]\s*[^\n]*[?？])", re.M | re.I)
+_PROS_CONS = re.compile(r"优点|缺点|优缺点|红榜|黑榜|红黑榜|不足|槽点")
+_ADVICE = re.compile(r"购买建议|值不值|推荐指数|适合人群|适合谁|入手建议|是否推荐|值得买|建议入手")
+
+_hard_matcher = AhoCorasick(HARD_BANNED_PHRASES, ignore_case=True)
+_soft_matcher = AhoCorasick(SOFT_BANNED_PHRASES, ignore_case=True)
+
+
+def requirements_from_template(prompt: str, strategy: Optional[str] = None) -> Dict:
+    """
+    从模板的写作要求中推导检查项，未提及的项沿用策略默认值
+
+    如“必须包含规格对比表格” → table，“添加常见问题FAQ（至少3个问题）” → faq_min=3，
+    “正文简洁有力：500-800字” → 字数范围
+    """
+    requirements = dict(DEFAULT_REQUIREMENTS.get(strategy or "", {"title": True, "min_chars": 300, "max_chars": 8000}))
+    text = prompt or ""
+    if "表格" in text:
+        requirements["table"] = True
+    faq = _AT_LEAST_FAQ.search(text)
+    if faq:
+        requirements["faq_min"] = int(faq.group(1))
+    elif "FAQ" in text or "常见问题" in text:
+        requirements.setdefault("faq_min", 1)
+    if _PROS_CONS.search(text):
+        requirements["pros_cons"] = True
+    if _ADVICE.search(text):
+        requirements["advice"] = True
+    length = _RANGE.search(text)
+    if length:
+        low, high = int(length.group(1)), int(length.group(2))
+        # 模型字数偏差较大，放宽到 60%~160%
+        requirements["min_chars"] = int(low * 0.6)
+        requirements["max_chars"] = int(high * 1.6)
+    return requirements
+
+
+def without_competitor_checks(requirements: Dict) -> Dict:
+    """没有竞品数据时不要求竞品对比表格（模板写了“与优衣库、H&M同类产品对比”也不强求）"""
+    requirements = dict(requirements)
+    requirements.pop("table", None)
+    return requirements
+
+
+def count_faq(content: str) -> int:
+    """FAQ 段落中的问题数"""
+    match = _FAQ_SECTION.search(content)
+    if not match:
+        return 0
+    section = content[match.end():]
+    next_heading = re.search(r"^\s{0,3}#{1,2}\s+", section, re.M)
+    if next_heading:
+        section = section[:next_heading.start()]
+    questions = len(_QUESTION.findall(section))
+    if questions == 0:
+        # 以小标题形式逐条列出问题
+        questions = sum(1 for h in _HEADING.findall(section) if h.rstrip().endswith(("?", "？")))
+    return questions
+
+
+def evaluate(content: str, requirements: Dict) -> Dict:
+    """
+    本地结构检查
+
+    Returns:
+        {"score": 0-1, "verdict": pass/borderline/fail, "checks": {...}, "issues": [...]}
+    """
+    content = content or ""
+    checks: Dict[str, bool] = {}
+    issues: List[str] = []
+
+    body_chars = len(re.sub(r"\s", "", content))
+    if "min_chars" in requirements:
+        checks["min_length"] = body_chars >= requirements["min_chars"]
+        if not checks["min_length"]:
+            issues.append(f"字数过少: {body_chars} < {requirements['min_chars']}")
+    if "max_chars" in requirements:
+        checks["max_length"] = body_chars <= requirements["max_chars"]
+        if not checks["max_length"]:
+            issues.append(f"字数过多: {body_chars} > {requirements['max_chars']}")
+    if requirements.get("title"):
+        first_line = content.strip().splitlines()[0] if content.strip() else ""
+        checks["title"] = first_line.lstrip().startswith("#") or bool(_HEADING.search(content[:300]))
+        if not checks["title"]:
+            issues.append("缺少标题")
+    if requirements.get("table"):
+        checks["table"] = bool(_TABLE_SEPARATOR.search(content)) and len(_TABLE_ROW.findall(content)) >= 3
+        if not checks["table"]:
+            issues.append("缺少对比表格")
+    if requirements.get("faq_min"):
+        faq_count = count_faq(content)
+        checks["faq"] = faq_count >= requirements["faq_min"]
+        if not checks["faq"]:
+            issues.append(f"FAQ 数量不足: {faq_count} < {requirements['faq_min']}")
+    if requirements.get("pros_cons"):
+        checks["pros_cons"] = bool(_PROS_CONS.search(content))
+        if not checks["pros_cons"]:
+            issues.append("缺少优缺点分析")
+    if requirements.get("advice"):
+        checks["advice"] = bool(_ADVICE.search(content))
+        if not checks["advice"]:
+            issues.append("缺少购买建议")
+
+    hard_hits = sorted(_hard_matcher.count(content))
+    soft_hits = _soft_matcher.count(content)
+    score = sum(checks.values()) / len(checks) if checks else 1.0
+    if soft_hits:
+        score -= min(0.3, 0.05 * sum(soft_hits.values()))
+        issues.append(f"违规/套话短语: {', '.join(sorted(soft_hits))}")
+    if hard_hits:
+        score = 0.0
+        issues.append(f"模型自述/拒答: {', '.join(hard_hits)}")
+    score = max(0.0, round(score, 3))
+
+    if score >= PASS_THRESHOLD:
+        verdict = "pass"
+    elif score < FAIL_THRESHOLD:
+        verdict = "fail"
+    else:
+        verdict = "borderline"
+    return {"score": score, "verdict": verdict, "checks": checks, "issues": issues}
+
+
+GRADER_PROMPT = """你是内容质量审核员，请按以下维度给这篇电商内容打分（0-10分）：
+信息准确且具体、结构完整、符合写作要求、没有空洞套话、适合被AI大模型引用。
+
+## 写作要求
+{requirements}
+
+## 本地检查发现的问题
+{issues}
+
+## 待审核文章
+{content}
+
+只输出 JSON：{{"score": 分数, "reason": "一句话理由"}}"""
+
+
+def make_llm_grader(invoke: Callable[[str], str]) -> Callable[[str, Dict, Dict], Dict]:
+    """
+    构造 LLM 打分器
+
+    Args:
+        invoke: prompt → 模型回答文本
+    """
+
+    def grade(content: str, requirements: Dict, local_report: Dict) -> Dict:
+        prompt = GRADER_PROMPT.format(
+            requirements=json.dumps(requirements, ensure_ascii=False),
+            issues="\n".join(f"- {i}" for i in local_report["issues"]) or "无",
+            content=content[:6000],
+        )
+        with span("quality.llm_grade"):
+            answer = invoke(prompt)
+        match = re.search(r"\{.*\}", answer or "", re.S)
+        try:
+            result = json.loads(match.group()) if match else {}
+            score = float(result.get("score", 0))
+        except (ValueError, TypeError, AttributeError):
+            score, result = 0.0, {}
+        return {"score": score, "reason": result.get("reason", ""), "passed": score >= LLM_PASS_SCORE}
+
+    return grade
+
+
+def generate_with_quality_gate(
+    generate: Callable[[], str],
+    requirements: Dict,
+    grader: Optional[Callable[[str, Dict, Dict], Dict]] = None,
+    retries: Optional[int] = None,
+) -> Tuple[str, Dict]:
+    """
+    生成 → 检查 → 必要时重试
+
+    Args:
+        generate: 无参生成函数，返回 Markdown
+        requirements: evaluate 使用的检查项
+        grader: 边界文章的 LLM 打分器（None 时边界文章视为通过）
+        retries: 不合格时的重试次数，默认读取 GEO_QUALITY_RETRIES
+
+    Returns:
+        (最终文章, 质量报告)
+    """
+    load_dotenv()
+    if retries is None:
+        retries = int(os.environ.get("GEO_QUALITY_RETRIES", "1"))
+    if grader is not None and os.environ.get("GEO_QUALITY_LLM_GRADER", "1") == "0":
+        grader = None
+
+    best: Optional[Tuple[str, Dict]] = None
+    for attempt in range(retries + 1):
+        content = generate()
+        with span("quality.evaluate", attempt=attempt) as s:
+            report = evaluate(content, requirements)
+            s.set_attribute("verdict", report["verdict"])
+        if report["verdict"] == "borderline" and grader is not None:
+            report["llm"] = grader(content, requirements, report)
+            report["verdict"] = "pass" if report["llm"]["passed"] else "fail"
+        report["attempts"] = attempt + 1
+
+        if best is None or report["verdict"] == "pass" or report["score"] > best[1]["score"]:
+            best = (content, report)
+        if report["verdict"] != "fail":
+            break
+
+    content, report = best
+    report["attempts"] = attempt + 1
+    return content, report
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+内容重新生成调度（验证 → 生成 的反馈闭环）
+根据各 SKU 的可见度验证结果和文章新鲜度，估算每个 (SKU, 策略) 重新生成的预期收益，
+按“预期收益 / 预估 token 消耗”放入优先队列（堆），在每日 token 预算内取出队首交给生成 Agent。
+预算按模型实际返回的 usage 扣减；各策略的预估消耗取历史实测均值，没有实测时用 STRATEGY_TOKEN_COST。
+
+预期收益 = 可见度提升空间 × 策略历史增益 × 陈旧度
+- 提升空间：1 - 最近一次验证的可见度分数（未验证过视为 1）
+- 策略历史增益：该策略文章发布前后两次验证的可见度差值均值（带先验平滑），
+  实测带不动指标的策略会自然降权
+- 陈旧度：文章索引中最新文章的生成时间距今 / GEO_REGEN_FRESH_DAYS，封顶 1；刚生成的文章等待验证后再评估
+
+配置（.env 或环境变量）：
+- GEO_REGEN_DAILY_TOKENS：每日 token 预算，默认 200000
+- GEO_REGEN_FRESH_DAYS：文章完全“过期”的天数，默认 14
+- GEO_REGEN_MIN_AGE_HOURS：文章生成后至少间隔多久才可重新生成，默认 24
+
+用法：
+    python agents/regen_scheduler.py          # 按预算执行
+    python agents/regen_scheduler.py --dry-run  # 只打印计划
+"""
+
+import heapq
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.article_output import get_article_index
+from agents.model_router import metered_tokens
+from agents.tracing import span
+from agents.verify_visibility import VisibilityStore, visibility_score
+
+OUTPUT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output"
+)
+DEFAULT_BUDGET_FILE = os.path.join(OUTPUT_DIR, "regen_budget.json")
+
+STRATEGIES = ("comparison", "persona", "smzdm_review", "smzdm_short")
+
+# 每篇文章的预估 token 消耗（prompt + 输出），没有实测数据时使用
+STRATEGY_TOKEN_COST = {
+    "comparison": 4500,
+    "persona": 4000,
+    "smzdm_review": 5000,
+    "smzdm_short": 2000,
+}
+
+# 策略增益的先验：没有历史数据时的假设值及其等效样本数
+LIFT_PRIOR = 0.1
+LIFT_PRIOR_WEIGHT = 3
+MIN_LIFT = 0.01
+
+
+def scan_article_freshness(articles_dir: Optional[str] = None) -> Dict[str, Dict[str, datetime]]:
+    """
+    从文章索引读取各 SKU 各策略最新文章的生成时间
+
+    Returns:
+        {spu: {策略: 最近生成时间}}
+    """
+    freshness: Dict[str, Dict[str, datetime]] = defaultdict(dict)
+    for spu, strategy, entry in get_article_index(articles_dir).items():
+        try:
+            freshness[spu][strategy] = datetime.fromisoformat(entry["generated_at"])
+        except ValueError:
+            continue
+    return freshness
+
+
+def measure_strategy_lift(
+    spus: Iterable[str],
+    freshness: Dict[str, Dict[str, datetime]],
+    visibility: VisibilityStore,
+) -> Dict[str, float]:
+    """
+    各策略的实测增益：文章生成前最后一次验证与生成后第一次验证的可见度差值，
+    按先验平滑后取均值
+    """
+    deltas: Dict[str, List[float]] = defaultdict(list)
+    for spu in spus:
+        generated = freshness.get(spu)
+        if not generated:
+            continue
+        runs = [(datetime.fromisoformat(r["timestamp"]), visibility_score(r)) for r in visibility.runs(spu) if r.get("timestamp")]
+        if len(runs) < 2:
+            continue
+        for strategy, generated_at in generated.items():
+            before = [score for ts, score in runs if ts <= generated_at]
+            after = [score for ts, score in runs if ts > generated_at]
+            if before and after:
+                deltas[strategy].append(after[0] - before[-1])
+
+    lift = {}
+    for strategy in STRATEGIES:
+        values = deltas.get(strategy, [])
+        smoothed = (sum(values) + LIFT_PRIOR * LIFT_PRIOR_WEIGHT) / (len(values) + LIFT_PRIOR_WEIGHT)
+        lift[strategy] = max(MIN_LIFT, round(smoothed, 4))
+    return lift
+
+
+class DailyBudget:
+    """
+    按自然日累计的 token 预算（记录在 output/regen_budget.json）
+    同时跨日累计各策略的实测消耗（usage: {策略: {"runs", "tokens"}}），用于预估下一次的消耗
+    """
+
+    def __init__(self, limit: Optional[int] = None, path: Optional[str] = None):
+        load_dotenv()
+        self.limit = limit if limit is not None else int(os.environ.get("GEO_REGEN_DAILY_TOKENS", "200000"))
+        self.path = path or DEFAULT_BUDGET_FILE
+        self.today = date.today().isoformat()
+        self.spent = 0
+        self.usage: Dict[str, Dict[str, int]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                ledger = json.load(f)
+            if ledger.get("date") == self.today:
+                self.spent = ledger.get("spent", 0)
+            self.usage = ledger.get("usage", {})
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.spent)
+
+    def charge(self, tokens: int, strategy: Optional[str] = None, measured: bool = False) -> None:
+        """扣减预算；measured 表示 tokens 是模型返回的实际消耗，计入该策略的实测均值"""
+        self.spent += tokens
+        if strategy and measured:
+            usage = self.usage.setdefault(strategy, {"runs": 0, "tokens": 0})
+            usage["runs"] += 1
+            usage["tokens"] += tokens
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"date": self.today, "spent": self.spent, "usage": self.usage}, f)
+
+    def token_costs(self) -> Dict[str, int]:
+        """各策略每篇的预估消耗：有实测时取实测均值，否则用 STRATEGY_TOKEN_COST"""
+        costs = dict(STRATEGY_TOKEN_COST)
+        for strategy, usage in self.usage.items():
+            if usage.get("runs"):
+                costs[strategy] = max(1, round(usage["tokens"] / usage["runs"]))
+        return costs
+
+
+class RegenScheduler:
+    """
+    重新生成优先队列
+
+    用法：
+        scheduler = RegenScheduler(products, token_costs=budget.token_costs())
+        plan = scheduler.plan(budget.remaining)
+    """
+
+    def __init__(
+        self,
+        products: List[dict],
+        freshness: Optional[Dict[str, Dict[str, datetime]]] = None,
+        visibility: Optional[VisibilityStore] = None,
+        strategies: Iterable[str] = STRATEGIES,
+        now: Optional[datetime] = None,
+        token_costs: Optional[Dict[str, int]] = None,
+    ):
+        load_dotenv()
+        self.products = {str(p["spu"]): p for p in products}
+        self.token_costs = dict(STRATEGY_TOKEN_COST, **(token_costs or {}))
+        self.freshness = freshness if freshness is not None else scan_article_freshness()
+        self.visibility = visibility or VisibilityStore()
+        self.strategies = list(strategies)
+        self.now = now or datetime.now()
+        self.fresh_days = float(os.environ.get("GEO_REGEN_FRESH_DAYS", "14"))
+        self.min_age_hours = float(os.environ.get("GEO_REGEN_MIN_AGE_HOURS", "24"))
+        self.lift = measure_strategy_lift(self.products, self.freshness, self.visibility)
+        self._heap: List[Tuple[float, str, str, Dict]] = []
+        self._build()
+
+    def _staleness(self, generated_at: Optional[datetime]) -> float:
+        if generated_at is None:
+            return 1.0
+        age_hours = (self.now - generated_at).total_seconds() / 3600
+        if age_hours < self.min_age_hours:
+            return 0.0
+        return min(1.0, age_hours / 24 / self.fresh_days)
+
+    def _build(self) -> None:
+        with span("regen.build_queue", products=len(self.products)):
+            for spu in self.products:
+                latest = self.visibility.latest_summary(spu)
+                score = visibility_score(latest) if latest else 0.0
+                headroom = 1.0 - score
+                generated = self.freshness.get(spu, {})
+                for strategy in self.strategies:
+                    staleness = self._staleness(generated.get(strategy))
+                    gain = headroom * self.lift[strategy] * staleness
+                    if gain <= 0:
+                        continue
+                    cost = self.token_costs[strategy]
+                    detail = {
+                        "spu": spu,
+                        "strategy": strategy,
+                        "visibility": score,
+                        "staleness": round(staleness, 3),
+                        "lift": self.lift[strategy],
+                        "expected_gain": round(gain, 5),
+                        "tokens": cost,
+                    }
+                    # heapq 是最小堆，优先级取负
+                    self._heap.append((-gain / cost, spu, strategy, detail))
+            heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def plan(self, budget_tokens: int) -> List[Dict]:
+        """按优先级取出预算内的任务（预算装不下的任务跳过，继续尝试更便宜的）"""
+        plan, remaining, skipped = [], budget_tokens, []
+        while self._heap and remaining > 0:
+            item = heapq.heappop(self._heap)
+            detail = item[3]
+            if detail["tokens"] > remaining:
+                skipped.append(item)
+                continue
+            remaining -= detail["tokens"]
+            plan.append(detail)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return plan
+
+
+def default_persona(product: dict) -> str:
+    price = float(product.get("price") or 0)
+    return f"""
+**目标用户画像：都市通勤人群**
+- 年龄：25-35岁
+- 生活场景：日常通勤、周末约会、轻商务场合
+- 穿搭偏好：追求品质感但不愿过度消费
+- 预算区间：{int(price * 0.8)}-{int(price * 1.5)}元
+"""
+
+
+def run_plan(
+    plan: List[Dict],
+    products: Dict[str, dict],
+    budget: Optional[DailyBudget] = None,
+    on_article: Optional[Callable[[Dict], None]] = None,
+) -> List[Dict]:
+    """
+    按策略分组执行计划，生成后保存到 output/articles
+    每篇按模型实际返回的 usage 扣减预算（写入文章的 tokens 字段）；服务商未返回 usage 时按计划中的预估扣减
+
+    Returns:
+        生成的文章列表
+    """
+    from agents.competitors import build_competitor_info
+    from agents.generate_content import generate_comparison_article, generate_persona_article, save_articles
+    from agents.generate_smzdm_content import generate_smzdm_article, generate_smzdm_short_review, save_smzdm_articles
+
+    generators = {
+        "comparison": lambda p: generate_comparison_article(p, build_competitor_info(p)),
+        "persona": lambda p: generate_persona_article(p, default_persona(p)),
+        "smzdm_review": lambda p: generate_smzdm_article(p, build_competitor_info(p)),
+        "smzdm_short": generate_smzdm_short_review,
+    }
+    article_types = {"comparison": "comparison", "persona": "persona", "smzdm_review": "review", "smzdm_short": "short_review"}
+
+    by_strategy: Dict[str, List[Dict]] = defaultdict(list)
+    for task in plan:
+        by_strategy[task["strategy"]].append(task)
+
+    articles = []
+    for strategy, tasks in by_strategy.items():
+        batch = []
+        for task in tasks:
+            product = products[task["spu"]]
+            with metered_tokens() as meter:
+                try:
+                    content = generators[strategy](product)
+                except Exception as e:
+                    print(f"   ❌ {task['spu']} {strategy} 生成失败: {e}")
+                    content = None
+            # 失败的生成按已知消耗扣减（没有时按预估），不计入策略的实测均值
+            measured = content is not None and meter.tokens > 0
+            used = meter.tokens or task["tokens"]
+            if budget is not None:
+                budget.charge(used, strategy, measured)
+            if content is None:
+                continue
+            article = {
+                "type": article_types[strategy],
+                "product_spu": task["spu"],
+                "product_name": product.get("name", ""),
+                "content": content,
+                "tokens": used,
+            }
+            batch.append(article)
+            if on_article:
+                on_article(article)
+        if batch:
+            if strategy.startswith("smzdm_"):
+                save_smzdm_articles(batch)
+            else:
+                save_articles(batch)
+            articles.extend(batch)
+    return articles
+
+
+def main():
+    """按每日预算调度重新生成"""
+    load_dotenv()
+    dry_run = "--dry-run" in sys.argv
+
+    with open(os.path.join(OUTPUT_DIR, "zara_products_data.json"), "r", encoding="utf-8") as f:
+        products = json.load(f)["products"]
+
+    budget = DailyBudget()
+    scheduler = RegenScheduler(products, token_costs=budget.token_costs())
+    plan = scheduler.plan(budget.remaining)
+
+    print(f"💰 今日剩余预算: {budget.remaining} tokens（已用 {budget.spent}）")
+    print(f"📈 策略实测增益: {scheduler.lift}")
+    print(f"🗂️ 待调度 {len(plan)} 篇：")
+    for task in plan[:20]:
+        print(f"   • {task['spu']} {task['strategy']}  可见度 {task['visibility']:.2f}  预期收益 {task['expected_gain']:.4f}")
+
+    if dry_run or not plan:
+        return plan
+    articles = run_plan(plan, scheduler.products, budget)
+    print(f"\n✅ 已重新生成 {len(articles)} 篇，今日已用 {budget.spent} tokens")
+    return articles
+
+
+if __name__ == "__main__":
+    main()
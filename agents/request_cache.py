@@ -0,0 +1,342 @@
+"""
+上游请求缓存（stale-while-revalidate）
+Zara 搜索排序和商品详情一天最多变化几次，重复采集和交互式查询没必要每次都请求远端。
+
+- 键：接口名 + 规范化的请求体（字符串做 NFKC、去首尾空白、合并连续空白；字段顺序无关）
+- 新鲜期：按接口配置 TTL，期内直接返回缓存
+- 过期但在宽限期内：立即返回旧值，同时在后台刷新（同一个键只刷新一次）
+- 超过宽限期：同步请求上游
+- 负缓存：空结果（无商品）同样缓存，但使用较短的 TTL；HTTP 200 但返回体 code 表示出错的结果不缓存
+- 异步刷新任务挂在调用方的事件循环上，关闭客户端/退出事件循环前用 drain() 等待完成
+- 后端：内存 LRU（默认）或磁盘（每个键一个 JSON 文件），可通过 GEO_ZARA_CACHE 选择
+
+配置（.env 或环境变量）：
+- GEO_ZARA_CACHE：memory / disk / off，默认 memory
+- GEO_ZARA_CACHE_DIR：磁盘后端目录，默认 output/cache/zara
+- GEO_ZARA_CACHE_TTLS：按接口覆盖 TTL（秒），如 "search=21600,product=43200"
+- GEO_ZARA_CACHE_STALE：过期后仍可返回旧值的宽限期（秒），默认 86400
+- GEO_ZARA_CACHE_NEGATIVE_TTL：空结果的 TTL（秒），默认 600
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.fileio import atomic_write
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "cache",
+    "zara"
+)
+
+# 接口 → 新鲜期（秒）
+DEFAULT_TTLS = {
+    "search": 6 * 3600,
+    "product": 12 * 3600,
+    "tag": 12 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(endpoint: str, body: Dict) -> str:
+    payload = json.dumps([endpoint, _normalize(body)], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return f"{endpoint}:" + hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def is_empty_result(result: Any) -> bool:
+    """Zara 接口返回体中没有任何商品行（search 的 rows / product 的 list）"""
+    if not isinstance(result, dict):
+        return not result
+    data = result.get("data")
+    if isinstance(data, dict):
+        for key in ("rows", "list"):
+            if key in data:
+                return not data[key]
+        return not data
+    return not data
+
+
+def is_error_result(result: Any) -> bool:
+    """HTTP 200 但返回体的 code 表示出错（Zara 接口成功时 code 为 200 或 0）"""
+    return isinstance(result, dict) and "code" in result and result["code"] not in (0, 200, "0", "200")
+
+
+class MemoryBackend:
+    """进程内 LRU"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskBackend:
+    """每个键一个 JSON 文件，进程重启后仍然有效"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace(":", "_") + ".json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, entry: Dict) -> None:
+        atomic_write(self._path(key), json.dumps(entry, ensure_ascii=False))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+class RequestCache:
+    """
+    用法：
+        result = cache.fetch("search", body, lambda: post(search_api, body))
+        result = await cache.afetch("search", body, load_search)  # load_search 为协程函数
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_ttl: float = 86400,
+        negative_ttl: float = 600,
+        is_empty: Callable[[Any], bool] = is_empty_result,
+        is_error: Callable[[Any], bool] = is_error_result,
+    ):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.is_empty = is_empty
+        self.is_error = is_error
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "negative_hits": 0, "refreshes": 0, "refresh_errors": 0,
+                         "uncached_errors": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestCache"]:
+        """按环境变量构造；GEO_ZARA_CACHE=off 时返回 None"""
+        load_dotenv()
+        kind = os.environ.get("GEO_ZARA_CACHE", "memory").lower()
+        if kind == "off":
+            return None
+        backend = DiskBackend(os.environ.get("GEO_ZARA_CACHE_DIR") or None) if kind == "disk" else MemoryBackend()
+        ttls = {}
+        for item in os.environ.get("GEO_ZARA_CACHE_TTLS", "").split(","):
+            name, _, seconds = item.partition("=")
+            if name.strip() and seconds.strip():
+                ttls[name.strip()] = float(seconds)
+        return cls(
+            backend,
+            ttls=ttls,
+            stale_ttl=float(os.environ.get("GEO_ZARA_CACHE_STALE", "86400")),
+            negative_ttl=float(os.environ.get("GEO_ZARA_CACHE_NEGATIVE_TTL", "600")),
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _ttl(self, endpoint: str, entry: Dict) -> float:
+        return self.negative_ttl if entry.get("negative") else self.ttls.get(endpoint, DEFAULT_TTL)
+
+    def lookup(self, endpoint: str, body: Dict):
+        """
+        Returns:
+            (键, 状态, 值)，状态为 "fresh" / "stale" / "miss"
+        """
+        key = cache_key(endpoint, body)
+        entry = self.backend.get(key)
+        if entry is None:
+            self._count("misses")
+            return key, "miss", None
+        age = time.time() - entry["stored_at"]
+        ttl = self._ttl(endpoint, entry)
+        if age < ttl:
+            self._count("negative_hits" if entry.get("negative") else "hits")
+            return key, "fresh", entry["value"]
+        if age < ttl + self.stale_ttl:
+            self._count("stale_hits")
+            return key, "stale", entry["value"]
+        self._count("misses")
+        return key, "miss", None
+
+    def store(self, key: str, value: Any) -> bool:
+        """写入缓存；出错的返回体不写入（也不覆盖已有的旧值），返回是否写入"""
+        if self.is_error(value):
+            self._count("uncached_errors")
+            return False
+        self.backend.set(key, {"stored_at": time.time(), "negative": self.is_empty(value), "value": value})
+        return True
+
+    def claim_refresh(self, key: str) -> bool:
+        """同一个键同时只允许一个后台刷新"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.counters["refreshes"] += 1
+            return True
+
+    def release_refresh(self, key: str, failed: bool = False) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+            if failed:
+                self.counters["refresh_errors"] += 1
+
+    def fetch(self, endpoint: str, body: Dict, loader: Callable[[], Any]) -> Any:
+        """
+        读缓存；未命中时同步调用 loader()，过期时返回旧值并在后台线程刷新。
+        loader 抛出的异常不会被缓存。
+        """
+        key, state, value = self.lookup(endpoint, body)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if self.claim_refresh(key):
+                threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+            return value
+        value = loader()
+        self.store(key, value)
+        return value
+
+    def _refresh(self, key: str, loader: Callable[[], Any]) -> None:
+        failed = False
+        try:
+            # 刷新失败或返回出错时保留旧值，下次读取再试
+            failed = not self.store(key, loader())
+        except Exception:
+            failed = True
+        finally:
+            self.release_refresh(key, failed)
+
+    async def afetch(self, endpoint: str, body: Dict, loader: Callable[[], Any]) -> Any:
+        """fetch 的异步版本：loader 为协程函数，后台刷新在当前事件循环中以任务运行"""
+        key, state, value = self.lookup(endpoint, body)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if self.claim_refresh(key):
+                task = asyncio.get_running_loop().create_task(self._arefresh(key, loader))
+                with self._lock:
+                    self._tasks.add(task)
+                task.add_done_callback(self._forget_task)
+            return value
+        value = await loader()
+        self.store(key, value)
+        return value
+
+    async def _arefresh(self, key: str, loader: Callable[[], Any]) -> None:
+        failed = False
+        try:
+            failed = not self.store(key, await loader())
+        except asyncio.CancelledError:
+            failed = True
+            raise
+        except Exception:
+            failed = True
+        finally:
+            self.release_refresh(key, failed)
+
+    def _forget_task(self, task: "asyncio.Task") -> None:
+        with self._lock:
+            self._tasks.discard(task)
+
+    async def drain(self) -> None:
+        """等待当前事件循环上的后台刷新全部完成（关闭 HTTP 客户端或退出事件循环前调用）"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                pending = [t for t in self._tasks if t.get_loop() is loop and not t.done()]
+            if not pending:
+                return
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def invalidate(self, endpoint: str, body: Dict) -> None:
+        self.backend.delete(cache_key(endpoint, body))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["stale_hits"] + counters["negative_hits"] + counters["misses"]
+        counters["entries"] = len(self.backend)
+        counters["hit_rate"] = round((lookups - counters["misses"]) / lookups, 3) if lookups else 0.0
+        return counters
+
+
+_default_cache: Optional[RequestCache] = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def get_request_cache() -> Optional[RequestCache]:
+    """进程内共享的 Zara 请求缓存；GEO_ZARA_CACHE=off 时为 None"""
+    global _default_cache, _cache_loaded
+    with _cache_lock:
+        if not _cache_loaded:
+            _default_cache = RequestCache.from_env()
+            _cache_loaded = True
+        return _default_cache
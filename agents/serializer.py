@@ -0,0 +1,82 @@
+"""
+JSON 序列化层
+文章库、模板、采集结果和 API 响应统一经过这里：
+- 已安装 orjson 时使用 orjson（C 实现，直接产出 UTF-8 bytes），否则回退到标准库 json
+- 落盘默认紧凑格式（无缩进、无多余空格），GEO_JSON_PRETTY=1 或 pretty=True 时两空格缩进，便于人工查看
+- 两种后端输出都是合法 JSON、中文不转义，读写可以互换
+
+用法：
+    from agents.serializer import dump_file, load_file
+    dump_file(path, articles)
+    articles = load_file(path)
+"""
+
+import json
+import os
+from typing import Any, Optional
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+load_dotenv()
+# 落盘默认是否缩进
+PRETTY_DEFAULT = os.environ.get("GEO_JSON_PRETTY", "0") == "1"
+
+
+def _default(obj: Any) -> str:
+    # datetime/date 两种后端都输出 ISO 8601，其余按 str 处理
+    isoformat = getattr(obj, "isoformat", None)
+    return isoformat() if isoformat is not None else str(obj)
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """序列化为 UTF-8 bytes"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=_default).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps_str(obj: Any, pretty: bool = False) -> str:
+    return dumps(obj, pretty).decode("utf-8")
+
+
+def loads(data) -> Any:
+    """接受 bytes 或 str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(path: str, obj: Any, pretty: Optional[bool] = None) -> None:
+    """
+    写 JSON 文件
+
+    Args:
+        pretty: 是否缩进，默认按 GEO_JSON_PRETTY
+    """
+    data = dumps(obj, PRETTY_DEFAULT if pretty is None else pretty)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def load_file(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
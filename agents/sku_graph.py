@@ -0,0 +1,335 @@
+"""
+SKU 知识图谱（内存紧凑版）
+由采集结果（output/zara_products_data.json）构建 SKU ↔ 标签/品类/材质/性别 的二部图：
+- 所有字符串驻留为整数 ID（StringPool）
+- SKU → 属性的邻接用 CSR 数组（array）存储
+- 属性 → SKU 的倒排表为有序整数数组，查询时从最短表开始求交；
+  大表按需转成位图，用整数按位与完成多条件过滤
+- 风格/季节/场景标签在构建时预先分类，生成函数无需再线性扫描标签
+
+用法：
+    graph = SkuGraph.load()
+    graph.query(gender="WOMAN", category="外套", material="羊毛", tags=["通勤"])
+"""
+
+import json
+import os
+import re
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# 风格 / 季节 / 场景标签词表（生成用户画像文章时使用）
+STYLE_TAGS = ("温柔风", "小香风", "清冷风", "盐系", "优雅", "休闲", "通勤", "约会穿搭", "松弛感")
+SEASON_TAGS = ("春季", "秋冬", "春秋", "早春", "早秋")
+SCENARIO_TAGS = ("通勤", "约会穿搭", "度假", "运动", "居家", "派对", "商务", "旅行", "校园", "婚礼")
+
+# 常见面料成分，用于把材质描述拆成可检索的材质节点
+FIBERS = (
+    "羊毛", "羊绒", "美利奴", "马海毛", "羊驼毛", "棉", "亚麻", "真丝", "桑蚕丝", "聚酯纤维", "涤纶",
+    "粘胶纤维", "莫代尔", "莱赛尔", "天丝", "锦纶", "尼龙", "腈纶", "氨纶", "醋酸纤维", "皮革", "羽绒",
+)
+
+# 品类分组：查询“外套”时同时命中大衣、夹克等
+CATEGORY_GROUPS = {
+    "外套": ("外套", "大衣", "夹克", "风衣", "西装外套", "羽绒服", "棉服", "马甲", "开衫"),
+    "上衣": ("上衣", "T恤", "衬衫", "针织衫", "毛衣", "卫衣", "开衫", "背心"),
+    "裙装": ("连衣裙", "半身裙", "裙"),
+    "裤装": ("裤", "长裤", "短裤", "牛仔裤", "阔腿裤"),
+}
+
+GENDERS = ("WOMAN", "MAN", "KID", "HOME")
+GENDER_MAP = {"女士": "WOMAN", "男士": "MAN", "儿童": "KID", "家居": "HOME"}
+
+DEFAULT_PRODUCTS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "zara_products_data.json"
+)
+
+# 属性种类
+KINDS = ("tag", "category", "material", "gender", "style", "season", "scenario")
+
+_SPLIT_LIST = re.compile(r"[,，;；、/|]+")
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+class StringPool:
+    """字符串驻留：字符串 ↔ 连续整数 ID"""
+
+    __slots__ = ("_ids", "_strings")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        existing = self._ids.get(value)
+        if existing is not None:
+            return existing
+        new_id = len(self._strings)
+        self._ids[value] = new_id
+        self._strings.append(value)
+        return new_id
+
+    def get(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+def split_materials(material: str) -> List[str]:
+    """把“外层 70% 羊毛 30% 聚酯纤维”这类描述拆成成分列表"""
+    text = material or ""
+    return [fiber for fiber in FIBERS if fiber in text]
+
+
+def split_list(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in _SPLIT_LIST.split(str(value)) if v.strip()]
+
+
+def classify_tags(tags: Iterable[str]) -> Dict[str, List[str]]:
+    """按风格/季节/场景词表对标签分类"""
+    tags = list(tags)
+    return {
+        "style": [t for t in tags if t in STYLE_TAGS],
+        "season": [t for t in tags if t in SEASON_TAGS],
+        "scenario": [t for t in tags if t in SCENARIO_TAGS],
+    }
+
+
+def _product_attributes(product: dict) -> Dict[str, List[str]]:
+    """从采集商品中抽取各类属性值"""
+    tags = split_list(product.get("tags"))
+    ai_tags = product.get("ai_tags") or {}
+    tags += split_list(ai_tags.get("whiteList")) + split_list(ai_tags.get("whiteListAi"))
+    tags = list(dict.fromkeys(tags))
+
+    categories = split_list(product.get("categories"))
+    categories += split_list(product.get("mainCategory")) + split_list(ai_tags.get("mainCategory"))
+    groups = [group for group, members in CATEGORY_GROUPS.items() if any(c in members for c in categories)]
+    categories = list(dict.fromkeys(categories + groups))
+
+    genders = [t for t in tags if t in GENDERS]
+    gender = product.get("gender")
+    if gender:
+        genders.append(GENDER_MAP.get(gender, gender))
+
+    classified = classify_tags(tags)
+    return {
+        "tag": tags,
+        "category": categories,
+        "material": split_materials(product.get("material", "")),
+        "gender": list(dict.fromkeys(genders)),
+        "style": classified["style"],
+        "season": classified["season"],
+        "scenario": classified["scenario"],
+    }
+
+
+class SkuGraph:
+    """数组存储的 SKU 属性图"""
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.spus: List[str] = []
+        self._spu_index: Dict[str, int] = {}
+        self.products: List[dict] = []
+        # SKU → 属性（CSR）：offsets[kind][i]..offsets[kind][i+1] 为第 i 个 SKU 的属性 ID
+        self._offsets: Dict[str, array] = {}
+        self._targets: Dict[str, array] = {}
+        # 属性 → SKU（有序数组）
+        self._postings: Dict[str, Dict[int, array]] = {}
+        self._bitmaps: Dict[tuple, int] = {}
+
+    # ------------------------------------------------------------------ 构建
+
+    @classmethod
+    def from_products(cls, products: Sequence[dict]) -> "SkuGraph":
+        graph = cls()
+        offsets = {kind: array("I", [0]) for kind in KINDS}
+        targets = {kind: array("I") for kind in KINDS}
+        postings: Dict[str, Dict[int, List[int]]] = {kind: defaultdict(list) for kind in KINDS}
+
+        for product in products:
+            spu = str(product.get("spu") or "")
+            if not spu or spu in graph._spu_index:
+                continue
+            sku_id = len(graph.spus)
+            graph._spu_index[spu] = sku_id
+            graph.spus.append(spu)
+            graph.products.append(product)
+
+            for kind, values in _product_attributes(product).items():
+                for value in values:
+                    attr_id = graph.strings.intern(value)
+                    targets[kind].append(attr_id)
+                    postings[kind][attr_id].append(sku_id)
+                offsets[kind].append(len(targets[kind]))
+
+        graph._offsets = offsets
+        graph._targets = targets
+        # SKU ID 按插入顺序递增，倒排表天然有序
+        graph._postings = {
+            kind: {attr_id: array("I", ids) for attr_id, ids in by_attr.items()}
+            for kind, by_attr in postings.items()
+        }
+        return graph
+
+    @classmethod
+    def load(cls, file_path: Optional[str] = None) -> "SkuGraph":
+        """从采集输出文件构建图谱"""
+        with open(file_path or DEFAULT_PRODUCTS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        products = data["products"] if isinstance(data, dict) else data
+        return cls.from_products(products)
+
+    def __len__(self) -> int:
+        return len(self.spus)
+
+    def __contains__(self, spu: str) -> bool:
+        return spu in self._spu_index
+
+    # ------------------------------------------------------------------ 邻接
+
+    def attributes(self, spu: str, kind: str) -> List[str]:
+        """某 SKU 的某类属性"""
+        sku_id = self._spu_index.get(spu)
+        if sku_id is None:
+            return []
+        offsets, targets = self._offsets[kind], self._targets[kind]
+        return [self.strings[a] for a in targets[offsets[sku_id]:offsets[sku_id + 1]]]
+
+    def posting(self, kind: str, value: str) -> array:
+        """某属性值下的全部 SKU ID（有序）"""
+        attr_id = self.strings.get(value)
+        if attr_id is None:
+            return array("I")
+        return self._postings[kind].get(attr_id, array("I"))
+
+    def values(self, kind: str) -> List[str]:
+        """某类属性的全部取值"""
+        return [self.strings[a] for a in self._postings[kind]]
+
+    def _bitmap(self, kind: str, value: str) -> int:
+        """属性值的位图（以整数存储，第 i 位表示第 i 个 SKU），按需构建并缓存"""
+        key = (kind, value)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            raw = bytearray((len(self.spus) + 7) // 8)
+            for sku_id in self.posting(kind, value):
+                raw[sku_id >> 3] |= 1 << (sku_id & 7)
+            bitmap = int.from_bytes(raw, "little")
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    # ------------------------------------------------------------------ 查询
+
+    def query_ids(self, limit: Optional[int] = None, **filters) -> List[int]:
+        """
+        多条件求交，返回 SKU ID 列表
+
+        filters 的键为属性种类（gender/category/material/tag/style/season/scenario，
+        复数形式 tags 也可），值为单个字符串或字符串列表（列表表示全部满足）。
+        limit 给定时解码到足够数量即停止。
+        """
+        conditions = []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            kind = "tag" if key == "tags" else key
+            if kind not in KINDS:
+                raise ValueError(f"未知的属性种类: {key}")
+            for v in ([value] if isinstance(value, str) else value):
+                conditions.append((kind, v))
+
+        if not conditions:
+            return list(range(len(self.spus) if limit is None else min(limit, len(self.spus))))
+
+        lists = [(self.posting(kind, v), kind, v) for kind, v in conditions]
+        lists.sort(key=lambda item: len(item[0]))
+        smallest = lists[0][0]
+        if not smallest:
+            return []
+        if len(lists) == 1:
+            return list(smallest[:limit])
+
+        # 最短表很短：逐个二分查找其它表
+        if len(smallest) <= 256:
+            result = []
+            others = [item[0] for item in lists[1:]]
+            for sku_id in smallest:
+                for other in others:
+                    pos = bisect_left(other, sku_id)
+                    if pos == len(other) or other[pos] != sku_id:
+                        break
+                else:
+                    result.append(sku_id)
+                    if limit is not None and len(result) >= limit:
+                        break
+            return result
+
+        # 否则用位图按位与，再解码置位
+        combined = -1
+        for _, kind, v in lists:
+            combined &= self._bitmap(kind, v)
+            if not combined:
+                return []
+        raw = combined.to_bytes((len(self.spus) + 7) // 8, "little")
+        result = []
+        for match in _NONZERO_BYTE.finditer(raw):
+            base = match.start() * 8
+            result.extend([base + bit for bit in _BYTE_BITS[raw[match.start()]]])
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+        return result
+
+    def query(self, limit: Optional[int] = None, **filters) -> List[str]:
+        """多条件查询，返回 SPU 列表"""
+        return [self.spus[i] for i in self.query_ids(limit=limit, **filters)]
+
+    def get_product(self, spu: str) -> Optional[dict]:
+        sku_id = self._spu_index.get(spu)
+        return self.products[sku_id] if sku_id is not None else None
+
+    def related(self, spu: str, limit: int = 5) -> List[str]:
+        """同品类同材质的其它 SKU"""
+        categories = self.attributes(spu, "category")
+        materials = self.attributes(spu, "material")
+        if not categories:
+            return []
+        ids = self.query_ids(limit=limit + 1, category=categories[0], material=materials[:1] or None)
+        sku_id = self._spu_index[spu]
+        return [self.spus[i] for i in ids if i != sku_id][:limit]
+
+    def context_for(self, spu: str) -> Dict[str, List[str]]:
+        """供生成函数使用的 SKU 上下文"""
+        return {
+            "style_tags": self.attributes(spu, "style"),
+            "season_tags": self.attributes(spu, "season"),
+            "scenario_tags": self.attributes(spu, "scenario"),
+            "materials": self.attributes(spu, "material"),
+            "categories": self.attributes(spu, "category"),
+            "related_spus": self.related(spu),
+        }
+
+
+_default_graph: Optional[SkuGraph] = None
+
+
+def get_default_graph() -> Optional[SkuGraph]:
+    """按需加载默认采集结果构建的图谱；采集文件不存在时返回 None"""
+    global _default_graph
+    if _default_graph is None and os.path.exists(DEFAULT_PRODUCTS_FILE):
+        _default_graph = SkuGraph.load(DEFAULT_PRODUCTS_FILE)
+    return _default_graph
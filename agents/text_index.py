@@ -0,0 +1,195 @@
+"""
+文章全文检索倒排索引
+- 分词：中日韩连续字符切二元组（单字成词时保留单字），拉丁字母/数字按词切分并转小写
+- 排序：BM25，字段加权（商品名命中权重高于正文）
+- 增量维护：add/remove 只改动该文档涉及的 posting
+- 存储字段：可选地随文档保存少量字段（标题、策略等），检索结果和过滤不必回读原始数据
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_CJK_RANGES = (
+    ("㐀", "䶿"),
+    ("一", "鿿"),
+    ("豈", "﫿"),
+    ("぀", "ヿ"),
+    ("가", "힯"),
+)
+_TOKEN_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿぀-ヿ가-힯]+|[0-9a-zA-Z]+(?:[.%][0-9a-zA-Z]+)*")
+
+
+def _is_cjk(ch: str) -> bool:
+    return any(lo <= ch <= hi for lo, hi in _CJK_RANGES)
+
+
+def tokenize(text: str) -> List[str]:
+    """CJK 二元组 + 拉丁词分词"""
+    tokens = []
+    for run in _TOKEN_RUN.findall(text or ""):
+        if _is_cjk(run[0]):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+class InvertedIndex:
+    """支持增量增删的 BM25 倒排索引（线程安全）"""
+
+    def __init__(
+        self,
+        field_weights: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        stored_fields: Iterable[str] = (),
+    ):
+        self.field_weights = field_weights or {"product_name": 3.0, "content": 1.0}
+        self.stored_fields = tuple(stored_fields)
+        self._stored: Dict[str, Dict[str, Any]] = {}
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: str, fields: Dict[str, str], stored: Optional[Dict[str, Any]] = None) -> None:
+        """
+        索引文档，同 id 已存在时先删除旧版本
+
+        Args:
+            stored: 存储字段的取值来源，默认取自 fields
+        """
+        weighted: Counter = Counter()
+        for field, weight in self.field_weights.items():
+            for token in tokenize(fields.get(field, "")):
+                weighted[token] += weight
+
+        with self._lock:
+            if doc_id in self._doc_terms:
+                self._remove_locked(doc_id)
+            for token, tf in weighted.items():
+                self._postings[token][doc_id] = tf
+            length = float(sum(weighted.values()))
+            self._doc_terms[doc_id] = tuple(weighted)
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            if self.stored_fields:
+                source = fields if stored is None else stored
+                self._stored[doc_id] = {f: source[f] for f in self.stored_fields if f in source}
+
+    def stored(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """文档的存储字段（构造时 stored_fields 指定）"""
+        with self._lock:
+            return self._stored.get(doc_id)
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for token in terms:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[token]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        self._stored.pop(doc_id, None)
+        return True
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        match_all: bool = True,
+        allowed: Optional[Iterable[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        检索并按 BM25 排序
+
+        Args:
+            query: 查询文本（与文档使用同一分词）
+            limit: 返回条数
+            match_all: True 时要求命中全部查询词（中文短语更精确）
+            allowed: 可选的文档 id 白名单
+            where: 可选的存储字段等值过滤（如 {"strategy": "comparison"}），只检查命中的候选文档
+
+        Returns:
+            [(doc_id, score)]，分数降序
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(t, {}) for t in terms]
+            if match_all:
+                if any(not p for p in postings):
+                    return []
+                # 从最短 posting 开始求交集
+                ordered = sorted(postings, key=len)
+                candidates = set(ordered[0])
+                for p in ordered[1:]:
+                    candidates.intersection_update(p)
+                    if not candidates:
+                        return []
+            else:
+                candidates = set().union(*postings)
+            if allowed is not None:
+                candidates.intersection_update(allowed)
+            if where:
+                candidates = {
+                    doc_id for doc_id in candidates
+                    if all(self._stored.get(doc_id, {}).get(k) == v for k, v in where.items())
+                }
+
+            n_docs = len(self._doc_terms)
+            avg_length = self._total_length / n_docs if n_docs else 1.0
+            idfs = [math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+
+            def score(doc_id: str) -> float:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                total = 0.0
+                for idf, posting in zip(idfs, postings):
+                    tf = posting.get(doc_id)
+                    if tf:
+                        total += idf * tf * (self.k1 + 1) / (tf + norm)
+                return total
+
+            return heapq.nlargest(limit, ((doc_id, score(doc_id)) for doc_id in candidates), key=lambda item: item[1])
+
+
+def make_snippet(text: str, query: str, width: int = 60) -> str:
+    """截取查询词附近的正文片段"""
+    text = text or ""
+    position = -1
+    for needle in [query.strip()] + tokenize(query):
+        if needle:
+            position = text.lower().find(needle.lower())
+            if position >= 0:
+                break
+    if position < 0:
+        return text[:width].replace("\n", " ")
+    start = max(0, position - width // 3)
+    snippet = text[start:start + width].replace("\n", " ")
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
@@ -0,0 +1,117 @@
+"""
+多模式串匹配（Aho-Corasick 自动机）
+一次扫描文本即可找出所有词表命中，耗时与词表大小无关，
+用于违禁词过滤、品牌/SKU 提及识别等场景。
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 自动机
+
+    用法：
+        matcher = AhoCorasick(["优衣库", "UNIQLO", "Zara"], ignore_case=True)
+        matcher.find_all("zara 和优衣库")  # [(0, 4, 2), (6, 9, 0)]
+    """
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = False):
+        self.ignore_case = ignore_case
+        self.patterns: List[str] = []
+        # 每个状态：goto 表、失败指针、输出（命中的模式序号）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            self._insert(pattern.lower() if ignore_case else pattern, len(self.patterns))
+            self.patterns.append(pattern)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _insert(self, pattern: str, index: int) -> None:
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + (index,)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str):
+        """逐个产出 (起始位置, 结束位置, 模式序号)"""
+        if self.ignore_case:
+            text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in output[state]:
+                yield i + 1 - len(self.patterns[index]), i + 1, index
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        return list(self.iter_matches(text))
+
+    def contains_any(self, text: str) -> bool:
+        return next(self.iter_matches(text), None) is not None
+
+    def count(self, text: str) -> Dict[str, int]:
+        """每个命中模式的出现次数"""
+        counts: Dict[str, int] = {}
+        for _, _, index in self.iter_matches(text):
+            pattern = self.patterns[index]
+            counts[pattern] = counts.get(pattern, 0) + 1
+        return counts
+
+
+class KeywordMatcher:
+    """
+    带别名分组的匹配器：多个别名归到同一个标签
+    如 {"zara": ["Zara", "飒拉"], "uniqlo": ["优衣库", "UNIQLO"]}
+    """
+
+    def __init__(self, groups: Dict[str, Sequence[str]], ignore_case: bool = True):
+        patterns, self._labels = [], []
+        for label, aliases in groups.items():
+            for alias in aliases:
+                if not alias:
+                    continue
+                patterns.append(alias)
+                self._labels.append(label)
+        self._matcher = AhoCorasick(patterns, ignore_case=ignore_case)
+
+    def labels(self, text: str) -> Dict[str, List[int]]:
+        """命中的标签 → 出现位置列表"""
+        hits: Dict[str, List[int]] = {}
+        for start, _, index in self._matcher.iter_matches(text):
+            hits.setdefault(self._labels[index], []).append(start)
+        return hits
+
+    def first_position(self, text: str, label: str) -> Optional[int]:
+        positions = self.labels(text).get(label)
+        return min(positions) if positions else None
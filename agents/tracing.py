@@ -0,0 +1,231 @@
+"""
+轻量级请求链路追踪
+基于 contextvars 传播 span：路由 → Agent 生成函数 → 上游 HTTP / 数据库，
+span 结束后以 JSON Lines 形式写入本地文件，便于排查 /api/generate 的耗时分布。
+
+配置（.env 或环境变量）：
+- GEO_TRACE_SAMPLE_RATE：根 span 采样率（0~1），默认 0 即关闭追踪
+- GEO_TRACE_FILE：导出文件路径，默认 output/traces/spans.jsonl
+
+关闭时 span() 直接返回共享的空 span，不读写 contextvars，开销可忽略。
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+
+DEFAULT_TRACE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "traces",
+    "spans.jsonl"
+)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("geo_current_span", default=None)
+
+
+class _NoopSpan:
+    """未启用或未采样时使用的空 span"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _UnsampledSpan(_NoopSpan):
+    """未被采样的根 span：进入上下文后让子 span 也跳过采样"""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+class Span:
+    """一次被追踪的操作"""
+
+    __slots__ = (
+        "tracer", "name", "trace_id", "span_id", "parent_id",
+        "attributes", "status", "error", "start_time", "_start", "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = None
+        self.start_time = 0.0
+        self._start = 0.0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.record_exception(exc)
+        self.tracer.exporter.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        })
+        return False
+
+
+class JsonLinesExporter:
+    """把结束的 span 逐行追加到本地 JSON Lines 文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """span 工厂，持有采样率与导出器"""
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[JsonLinesExporter] = None):
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.exporter = exporter or JsonLinesExporter(DEFAULT_TRACE_FILE)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start_span(self, name: str, **attributes):
+        """创建 span；只有根 span 参与采样，子 span 跟随父 span 的采样结果"""
+        if not self.enabled:
+            return NOOP_SPAN
+
+        parent = _current_span.get()
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _UnsampledSpan()
+            return Span(self, name, uuid.uuid4().hex, None, attributes)
+
+        if not isinstance(parent, Span):
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+
+def _tracer_from_env() -> Tracer:
+    load_dotenv()
+    try:
+        sample_rate = float(os.environ.get("GEO_TRACE_SAMPLE_RATE", "0") or 0)
+    except ValueError:
+        sample_rate = 0.0
+    path = os.environ.get("GEO_TRACE_FILE") or DEFAULT_TRACE_FILE
+    return Tracer(sample_rate, JsonLinesExporter(path))
+
+
+_tracer = _tracer_from_env()
+
+
+def get_tracer() -> Tracer:
+    """获取全局 Tracer"""
+    return _tracer
+
+
+def configure(sample_rate: float, path: Optional[str] = None) -> Tracer:
+    """运行时调整采样率和导出路径（如基准测试、单次排查）"""
+    global _tracer
+    _tracer = Tracer(sample_rate, JsonLinesExporter(path or DEFAULT_TRACE_FILE))
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """
+    创建一个 span 上下文
+
+    用法：
+        with span("llm.invoke", model=_model_name) as s:
+            ...
+            s.set_attribute("output_chars", len(text))
+    """
+    return _tracer.start_span(name, **attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    """当前上下文的 trace_id（未追踪时为 None）"""
+    current = _current_span.get()
+    return current.trace_id if isinstance(current, Span) else None
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """函数装饰器：整个调用包在一个 span 中"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with _tracer.start_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
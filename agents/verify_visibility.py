@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+效果验证 Agent（模块 B）
+用预设的目标问题（target_prompts）向大模型提问，检查回答中是否出现我方品牌/商品，
+记录提及情况、推荐位置和竞品提及，按 SKU 追加到时间序列文件。
+
+- 调度：(问题 × 模型 × 重复次数) 的探测矩阵用 asyncio 并发执行，
+  全局并发上限 + 每个模型独立的令牌桶限速，失败按指数退避重试
+- 匹配：品牌/商品/竞品别名构建一个 Aho-Corasick 自动机，每条回答只扫描一遍
+- 存储：output/visibility/<spu>.jsonl，每行一次探测结果
+
+模型沿用 OPENAI_API_KEY / OPENAI_BASE_URL 配置；把 OPENAI_BASE_URL 指向
+benchmarks/fake_llm.py 启动的伪服务即可离线验证。
+
+配置（.env 或环境变量）：
+- GEO_VERIFY_MODELS：逗号分隔的模型列表，默认 OPENAI_MODEL
+- GEO_VERIFY_REPETITIONS：每个问题每个模型的重复次数，默认 3
+- GEO_VERIFY_CONCURRENCY：同时进行的探测数，默认 4
+- GEO_VERIFY_RATE：每个模型每秒请求数，默认 2
+- GEO_VISIBILITY_DIR：时间序列目录，默认 output/visibility
+
+用法：
+    python agents/verify_visibility.py [商品数量]
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.competitors import DEFAULT_CATALOG
+from agents.sku_graph import classify_tags, split_list
+from agents.text_match import KeywordMatcher
+from agents.tracing import span
+
+OUTPUT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output"
+)
+DEFAULT_VISIBILITY_DIR = os.path.join(OUTPUT_DIR, "visibility")
+
+DEFAULT_BRAND = "Zara"
+BRAND_ALIASES = {"Zara": ("Zara", "飒拉")}
+
+# ask(模型名, 问题) → 回答文本
+AskFn = Callable[[str, str], Awaitable[str]]
+
+_BRAND_SPLIT = re.compile(r"[()（）/]+")
+
+
+def brand_aliases(brand: str) -> List[str]:
+    """“优衣库 (UNIQLO)” → ["优衣库 (UNIQLO)", "优衣库", "UNIQLO"]"""
+    aliases = [brand] + [part.strip() for part in _BRAND_SPLIT.split(brand) if part.strip()]
+    aliases.extend(BRAND_ALIASES.get(brand, ()))
+    return list(dict.fromkeys(aliases))
+
+
+def short_brand_name(brand: str) -> str:
+    """提问用的品牌简称：“优衣库 (UNIQLO)” → “优衣库”；没有别名的品牌（H&M、COS）原样返回"""
+    aliases = brand_aliases(brand)
+    return aliases[1] if len(aliases) > 1 else aliases[0]
+
+
+def _price_range(price) -> str:
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        return ""
+    upper = max(100, int(price / 100 + 1) * 100)
+    return f"{upper}元"
+
+
+def build_target_prompts(product: dict, brand: str = DEFAULT_BRAND) -> List[Dict]:
+    """
+    生成目标问题
+    商品数据中有 ai_optimization.target_prompts 时直接使用，
+    否则按品类泛搜、场景、品牌对比、预算、直接询问五类意图生成
+
+    Returns:
+        [{"intent": 意图, "prompt": 问题}]
+    """
+    preset = (product.get("ai_optimization") or {}).get("target_prompts")
+    if preset:
+        return [{"intent": "preset", "prompt": p} for p in preset]
+
+    name = product.get("name", "")
+    category = product.get("mainCategory") or (split_list(product.get("categories")) or ["衣服"])[0]
+    scenarios = classify_tags(split_list(product.get("tags")))["scenario"] or ["日常通勤"]
+    competitors = [row["brand"] for row in DEFAULT_CATALOG if row.get("category") == category] or ["优衣库"]
+    competitor = short_brand_name(competitors[0])
+    budget = _price_range(product.get("price"))
+
+    prompts = [
+        ("category_search", f"有什么好的{category}推荐？"),
+        ("category_search", f"{datetime.now().year}年{category}买什么好？"),
+        ("scenario_search", f"{scenarios[0]}穿什么{category}合适？"),
+        ("brand_comparison", f"{brand}和{competitor}的{category}哪个好？"),
+        ("direct_inquiry", f"{brand}{name}值得买吗？"),
+    ]
+    if budget:
+        prompts.append(("budget_oriented", f"{budget}以内的{category}推荐"))
+    return [{"intent": intent, "prompt": prompt} for intent, prompt in prompts]
+
+
+class VisibilityAnalyzer:
+    """
+    回答中的品牌/商品曝光分析
+    我方品牌、我方商品和各竞品品牌的别名放进同一个自动机，一次扫描得到全部提及位置
+    """
+
+    def __init__(self, product: dict, brand: str = DEFAULT_BRAND, competitor_brands: Optional[Sequence[str]] = None):
+        if competitor_brands is None:
+            competitor_brands = list(dict.fromkeys(row["brand"] for row in DEFAULT_CATALOG))
+        self.brand = brand
+        groups = {f"brand:{brand}": brand_aliases(brand)}
+        product_aliases = [product.get("name", ""), str(product.get("spu", ""))]
+        groups["product"] = [alias for alias in product_aliases if len(alias) >= 2]
+        for competitor in competitor_brands:
+            if competitor != brand:
+                groups[f"brand:{competitor}"] = brand_aliases(competitor)
+        self._matcher = KeywordMatcher(groups)
+
+    def analyze(self, answer: str) -> Dict:
+        hits = self._matcher.labels(answer or "")
+        ours = f"brand:{self.brand}"
+        # 按首次出现的先后给品牌排名
+        brand_order = sorted(
+            (min(positions), label[len("brand:"):])
+            for label, positions in hits.items()
+            if label.startswith("brand:")
+        )
+        ranking = [name for _, name in brand_order]
+        return {
+            "brand_mentioned": ours in hits,
+            "product_mentioned": "product" in hits,
+            "mentions": len(hits.get(ours, ())) + len(hits.get("product", ())),
+            "recommendation_position": ranking.index(self.brand) + 1 if self.brand in ranking else None,
+            "competitor_mentions": {
+                name: len(hits[f"brand:{name}"]) for name in ranking if name != self.brand
+            },
+        }
+
+
+class TokenBucket:
+    """异步令牌桶：rate 个/秒，最多攒 burst 个"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def make_chat_ask(models: Sequence[str], temperature: float = 0.7) -> AskFn:
+    """按模型名构造 ChatOpenAI 客户端，复用生成 Agent 的接口配置"""
+    from langchain_openai import ChatOpenAI
+
+    load_dotenv()
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("缺少 OPENAI_API_KEY：请在 .env 或环境变量中配置")
+    clients = {
+        name: ChatOpenAI(
+            model=name,
+            api_key=api_key,
+            base_url=os.environ.get("OPENAI_BASE_URL"),
+            temperature=temperature
+        )
+        for name in models
+    }
+
+    async def ask(model_name: str, prompt: str) -> str:
+        response = await clients[model_name].ainvoke(prompt)
+        return response.content
+
+    return ask
+
+
+async def run_probes(
+    prompts: Sequence[Dict],
+    models: Sequence[str],
+    ask: AskFn,
+    repetitions: int = 3,
+    concurrency: int = 4,
+    rate: float = 2.0,
+    retries: int = 2,
+    on_result: Optional[Callable[[Dict], None]] = None,
+) -> List[Dict]:
+    """
+    并发执行 (问题 × 模型 × 重复) 探测矩阵
+
+    Returns:
+        [{"prompt", "intent", "model", "repetition", "answer", "latency_ms", "error"}]
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    buckets = {model_name: TokenBucket(rate) for model_name in models}
+
+    async def probe(item: Dict, model_name: str, repetition: int) -> Dict:
+        result = {
+            "prompt": item["prompt"],
+            "intent": item.get("intent", ""),
+            "model": model_name,
+            "repetition": repetition,
+            "answer": "",
+            "latency_ms": None,
+            "error": None,
+        }
+        async with semaphore:
+            for attempt in range(retries + 1):
+                await buckets[model_name].acquire()
+                started = time.perf_counter()
+                try:
+                    with span("verify.probe", model=model_name, intent=result["intent"]):
+                        result["answer"] = await ask(model_name, item["prompt"])
+                    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    result["error"] = None
+                    break
+                except Exception as e:
+                    result["error"] = str(e) or type(e).__name__
+                    if attempt < retries:
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+        if on_result:
+            on_result(result)
+        return result
+
+    tasks = [
+        probe(item, model_name, repetition)
+        for repetition in range(repetitions)
+        for item in prompts
+        for model_name in models
+    ]
+    return list(await asyncio.gather(*tasks))
+
+
+class VisibilityStore:
+    """按 SKU 保存验证时间序列（JSON Lines，追加写入）"""
+
+    def __init__(self, directory: Optional[str] = None):
+        load_dotenv()
+        self.directory = directory or os.environ.get("GEO_VISIBILITY_DIR") or DEFAULT_VISIBILITY_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, spu: str) -> str:
+        safe = re.sub(r"[^\w.-]", "_", str(spu))
+        return os.path.join(self.directory, f"{safe}.jsonl")
+
+    def append(self, spu: str, records: Sequence[Dict]) -> None:
+        with open(self._path(spu), "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def history(self, spu: str) -> List[Dict]:
+        path = self._path(spu)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def runs(self, spu: str) -> List[Dict]:
+        """每次验证的汇总，按时间先后排列"""
+        grouped: Dict[str, List[Dict]] = {}
+        for record in self.history(spu):
+            grouped.setdefault(record["run_id"], []).append(record)
+        return sorted((summarize(rows) for rows in grouped.values()), key=lambda s: s["timestamp"] or "")
+
+    def latest_summary(self, spu: str) -> Optional[Dict]:
+        """最近一次验证的汇总"""
+        runs = self.runs(spu)
+        return runs[-1] if runs else None
+
+
+def summarize(records: Sequence[Dict]) -> Dict:
+    """汇总一次验证：品牌提及率、商品提及率、平均推荐位置（按模型细分）"""
+
+    def aggregate(rows: Sequence[Dict]) -> Dict:
+        answered = [r for r in rows if not r.get("error")]
+        positions = [r["recommendation_position"] for r in answered if r.get("recommendation_position")]
+        total = len(answered)
+        return {
+            "probes": len(rows),
+            "answered": total,
+            "brand_mention_rate": round(sum(r["brand_mentioned"] for r in answered) / total, 3) if total else 0.0,
+            "product_mention_rate": round(sum(r["product_mentioned"] for r in answered) / total, 3) if total else 0.0,
+            "first_position_count": sum(1 for p in positions if p == 1),
+            "avg_position": round(sum(positions) / len(positions), 2) if positions else None,
+        }
+
+    by_model: Dict[str, List[Dict]] = {}
+    for record in records:
+        by_model.setdefault(record["model"], []).append(record)
+    summary = aggregate(records)
+    summary["by_model"] = {name: aggregate(rows) for name, rows in by_model.items()}
+    if records:
+        summary["run_id"] = records[0].get("run_id")
+        summary["timestamp"] = records[0].get("timestamp")
+    return summary
+
+
+def visibility_score(summary: Dict) -> float:
+    """单一可见度分数（0-1）：品牌提及与商品提及加权"""
+    return round(0.4 * summary["brand_mention_rate"] + 0.6 * summary["product_mention_rate"], 4)
+
+
+def get_verify_models() -> List[str]:
+    load_dotenv()
+    configured = os.environ.get("GEO_VERIFY_MODELS", "")
+    models = [m.strip() for m in configured.split(",") if m.strip()]
+    return models or [os.environ.get("OPENAI_MODEL", "gemini-3-flash-preview")]
+
+
+async def verify_product(
+    product: dict,
+    ask: Optional[AskFn] = None,
+    models: Optional[Sequence[str]] = None,
+    prompts: Optional[Sequence[Dict]] = None,
+    repetitions: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    rate: Optional[float] = None,
+    store: Optional[VisibilityStore] = None,
+    brand: str = DEFAULT_BRAND,
+) -> Dict:
+    """
+    对单个商品执行一次验证并写入时间序列
+
+    Returns:
+        本次验证的汇总
+    """
+    load_dotenv()
+    models = list(models or get_verify_models())
+    ask = ask or make_chat_ask(models)
+    prompts = list(prompts or build_target_prompts(product, brand))
+    if repetitions is None:
+        repetitions = int(os.environ.get("GEO_VERIFY_REPETITIONS", "3"))
+    if concurrency is None:
+        concurrency = int(os.environ.get("GEO_VERIFY_CONCURRENCY", "4"))
+    if rate is None:
+        rate = float(os.environ.get("GEO_VERIFY_RATE", "2"))
+    store = store or VisibilityStore()
+
+    analyzer = VisibilityAnalyzer(product, brand)
+    run_id = uuid.uuid4().hex[:12]
+    timestamp = datetime.now().isoformat()
+
+    with span("verify.product", spu=product.get("spu"), probes=len(prompts) * len(models) * repetitions):
+        results = await run_probes(prompts, models, ask, repetitions, concurrency, rate)
+
+    records = []
+    for result in results:
+        record = {"run_id": run_id, "timestamp": timestamp, "spu": product.get("spu"), **result}
+        record.update(analyzer.analyze(result["answer"]))
+        records.append(record)
+    store.append(product.get("spu", "unknown"), records)
+    return summarize(records)
+
+
+def main():
+    """对采集的前 N 个商品执行验证"""
+    load_dotenv()
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    with open(os.path.join(OUTPUT_DIR, "zara_products_data.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # save_products_data 写出的是 {"fetch_time", "total_count", "products"}
+    products = (data["products"] if isinstance(data, dict) else data)[:limit]
+
+    models = get_verify_models()
+    print(f"🔍 验证 {len(products)} 个商品，模型: {', '.join(models)}")
+
+    async def verify_all():
+        # 同一个事件循环内复用模型客户端的连接池
+        ask = make_chat_ask(models)
+        return [await verify_product(product, ask=ask, models=models) for product in products]
+
+    for product, summary in zip(products, asyncio.run(verify_all())):
+        print(f"\n📦 {product.get('name')} ({product.get('spu')})")
+        print(f"• 品牌提及率: {summary['brand_mention_rate']:.0%}")
+        print(f"• 商品提及率: {summary['product_mention_rate']:.0%}")
+        print(f"• 首位推荐次数: {summary['first_position_count']}")
+        print(f"• 平均推荐位置: {summary['avg_position'] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Zara 接口统一客户端
+search/mixed、product/list、product/showTag、tag/update 四个接口只在这里实现一次：
+- AsyncZaraClient：基于 httpx.AsyncClient 的异步实现，连接池在同一个客户端内复用，
+  供并发采集等 asyncio 代码直接使用
+- ZaraClient：同步外壳，在一个私有事件循环线程上运行 AsyncZaraClient，
+  所有同步调用方（ZaraShopAPI、ZaraAPI、脚本）共享同一个连接池
+- 搜索和商品详情经过 agents/request_cache.py 的 stale-while-revalidate 缓存
+- 错误统一为 ZaraError（RuntimeError 子类），携带接口名、状态码和响应文本
+
+配置（.env 或环境变量）：
+- ZARA_SEARCH_BASE_URL / ZARA_ADMIN_BASE_URL：接口域名（本地基准测试指向桩服务）
+- ZARA_RECALL_TOKEN / ZARA_ADMIN_TOKEN：召回 token / 后台 token
+- ZARA_HTTP_TIMEOUT：单次请求超时（秒），默认 30
+- ZARA_HTTP_MAX_CONNECTIONS：连接池上限，默认 20
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    from agents._env import load_dotenv
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from agents._env import load_dotenv
+
+from agents.request_cache import RequestCache, get_request_cache
+from agents.tracing import span
+
+CATEGORY_MAP = {
+    "男士": "MAN",
+    "女士": "WOMAN",
+    "儿童": "KID",
+    "家居": "HOME"
+}
+PRODUCT_ID_PREFIX = "zara-new_"
+
+# 使用进程共享缓存的哨兵值（传 None 表示不缓存）
+_SHARED_CACHE = object()
+
+
+class ZaraError(RuntimeError):
+    """Zara 接口调用失败"""
+
+    def __init__(self, message: str, endpoint: str, status_code: int = 500, response_text: str = ""):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.response_text = response_text
+
+
+class ZaraConfigError(ZaraError):
+    """缺少 token 等配置"""
+
+
+class ZaraSettings:
+    """接口地址与凭证"""
+
+    def __init__(self):
+        load_dotenv()
+        search_base = (os.environ.get("ZARA_SEARCH_BASE_URL") or "https://search.moechat.cn").rstrip("/")
+        admin_base = (os.environ.get("ZARA_ADMIN_BASE_URL") or "https://admin.moechat.cn").rstrip("/")
+        self.search_api = f"{search_base}/api/search/mixed"
+        self.product_list_api = f"{admin_base}/admin-api/search/product/list"
+        self.tag_api = f"{admin_base}/admin-api/search/product/showTag"
+        self.update_message_api = f"{admin_base}/admin-api/search/tag/update"
+        self.recall_token = os.environ.get("ZARA_RECALL_TOKEN", "")
+        self.token = os.environ.get("ZARA_ADMIN_TOKEN", "")
+        self.timeout = float(os.environ.get("ZARA_HTTP_TIMEOUT", "30"))
+        self.max_connections = int(os.environ.get("ZARA_HTTP_MAX_CONNECTIONS", "20"))
+
+
+def search_body(keyword: str, category: Optional[str] = "女士", page_size: int = 10) -> Dict[str, Any]:
+    """search/mixed 请求体；category 为空时不加性别过滤"""
+    data = {
+        "keyword": keyword,
+        "pageSize": page_size,
+        "pageNum": 1,
+        "handletype": "200",
+    }
+    if category:
+        data["filters"] = [{
+            "dimensionName": "gender",
+            "tagNames": [CATEGORY_MAP.get(category, "WOMAN")]
+        }]
+    return data
+
+
+def strip_product_prefix(spu: str) -> str:
+    value = str(spu or "").strip()
+    if value.startswith(PRODUCT_ID_PREFIX):
+        value = value[len(PRODUCT_ID_PREFIX):]
+    return value
+
+
+class AsyncZaraClient:
+    """
+    异步客户端
+
+    用法：
+        async with AsyncZaraClient() as client:
+            result = await client.search("外套", category="女士", page_size=10)
+    """
+
+    def __init__(self, settings: Optional[ZaraSettings] = None, cache: Any = _SHARED_CACHE, http: Any = None):
+        self.settings = settings or ZaraSettings()
+        self.cache: Optional[RequestCache] = get_request_cache() if cache is _SHARED_CACHE else cache
+        self._http = http
+
+    @property
+    def http(self):
+        """httpx.AsyncClient，首次使用时创建（绑定到当前事件循环）"""
+        if self._http is None:
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.settings.max_connections,
+                max_keepalive_connections=self.settings.max_connections,
+            )
+            self._http = httpx.AsyncClient(timeout=self.settings.timeout, limits=limits)
+        return self._http
+
+    async def aclose(self) -> None:
+        # 先等当前事件循环上的缓存后台刷新完成，否则刷新会在关闭后重新创建 httpx 客户端或随事件循环退出被取消
+        if self.cache is not None:
+            await self.cache.drain()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self) -> "AsyncZaraClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        return False
+
+    @staticmethod
+    def _require(token: str, name: str, endpoint: str) -> None:
+        if not token:
+            raise ZaraConfigError(f"缺少 {name}：请在 .env 或环境变量中配置", endpoint)
+
+    async def _request(self, method: str, url: str, endpoint: str, token: str, failure: str,
+                       json: Any = None, params: Optional[Dict] = None,
+                       headers: Optional[Dict[str, str]] = None, trace: Optional[Dict] = None) -> Dict[str, Any]:
+        with span("http.client", endpoint=endpoint, method=method, **(trace or {})) as s:
+            response = await self.http.request(
+                method, url, json=json, params=params, headers={"Authorization": token, **(headers or {})}
+            )
+            s.set_attribute("http.status_code", response.status_code)
+        if response.status_code == 200:
+            return response.json()
+        raise ZaraError(f"{failure}: {response.status_code} - {response.text}", endpoint,
+                        response.status_code, response.text)
+
+    async def _cached(self, name: str, body: Dict, load):
+        if self.cache is None:
+            return await load()
+        return await self.cache.afetch(name, body, load)
+
+    async def search(self, keyword: str, category: Optional[str] = "女士", page_size: int = 10) -> Dict[str, Any]:
+        """搜索商品（search/mixed）"""
+        self._require(self.settings.recall_token, "ZARA_RECALL_TOKEN", "search/mixed")
+        data = search_body(keyword, category, page_size)
+
+        async def load():
+            return await self._request("POST", self.settings.search_api, "search/mixed",
+                                       self.settings.recall_token, "搜索失败", json=data, trace={"keyword": keyword})
+
+        return await self._cached("search", data, load)
+
+    async def product_details(self, spu: str) -> Dict[str, Any]:
+        """商品详情（product/list）"""
+        self._require(self.settings.token, "ZARA_ADMIN_TOKEN", "product/list")
+        data = {
+            "spu": spu,
+            "pageNo": 1,
+            "pageSize": 10
+        }
+
+        async def load():
+            return await self._request("POST", self.settings.product_list_api, "product/list",
+                                       self.settings.token, "获取详情失败", json=data, trace={"spu": spu})
+
+        return await self._cached("product", data, load)
+
+    async def tag_info(self, product_id: str) -> Dict[str, Any]:
+        """商品标签（product/showTag），product_id 不含 zara-new_ 前缀"""
+        self._require(self.settings.token, "ZARA_ADMIN_TOKEN", "product/showTag")
+        return await self._request(
+            "GET", self.settings.tag_api, "product/showTag", self.settings.token, "获取标签失败",
+            params={"productId": PRODUCT_ID_PREFIX + product_id}, trace={"product_id": product_id},
+        )
+
+    async def update_tag(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """更新商品标签（tag/update）"""
+        self._require(self.settings.token, "ZARA_ADMIN_TOKEN", "tag/update")
+        return await self._request(
+            "PUT", self.settings.update_message_api, "tag/update", self.settings.token, "更新标签失败",
+            headers={"Content-Type": "application/json", "tenant-id": "169"},
+            json=payload, trace={"product_id": payload.get("productId", "")},
+        )
+
+
+class ZaraClient:
+    """
+    同步客户端：在私有事件循环线程上运行 AsyncZaraClient
+
+    用法：
+        result = get_zara_client().search("外套", category="女士")
+    """
+
+    def __init__(self, settings: Optional[ZaraSettings] = None, cache: Any = _SHARED_CACHE):
+        self._async = AsyncZaraClient(settings, cache)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="zara-client", daemon=True)
+        self._thread.start()
+
+    @property
+    def settings(self) -> ZaraSettings:
+        return self._async.settings
+
+    @property
+    def cache(self) -> Optional[RequestCache]:
+        return self._async.cache
+
+    @staticmethod
+    async def _in_context(ctx: contextvars.Context, coro):
+        # 在事件循环线程中延续调用方的追踪上下文
+        for var, value in ctx.items():
+            var.set(value)
+        return await coro
+
+    def _run(self, coro):
+        future = asyncio.run_coroutine_threadsafe(self._in_context(contextvars.copy_context(), coro), self._loop)
+        return future.result()
+
+    def search(self, keyword: str, category: Optional[str] = "女士", page_size: int = 10) -> Dict[str, Any]:
+        return self._run(self._async.search(keyword, category, page_size))
+
+    def product_details(self, spu: str) -> Dict[str, Any]:
+        return self._run(self._async.product_details(spu))
+
+    def tag_info(self, product_id: str) -> Dict[str, Any]:
+        return self._run(self._async.tag_info(product_id))
+
+    def update_tag(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self._run(self._async.update_tag(payload))
+
+    def close(self) -> None:
+        self._run(self._async.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_default_client: Optional[ZaraClient] = None
+_client_lock = threading.Lock()
+
+
+def get_zara_client() -> ZaraClient:
+    """进程内共享的同步客户端"""
+    global _default_client
+    with _client_lock:
+        if _default_client is None:
+            _default_client = ZaraClient()
+        return _default_client
@@ -0,0 +1,175 @@
+"""
+HTTP 响应压缩与 ETag 缓存
+- CompressionMiddleware：按 Accept-Encoding 选择 br（已安装 brotli 时）或 gzip，小于阈值的响应不压缩
+- ETag：由存储文件版本（mtime/size/inode）+ 查询参数派生的强 ETag，命中 If-None-Match 时返回 304，
+  无需读取和序列化文章/模板数据
+"""
+
+import gzip
+import hashlib
+import os
+from typing import Iterable, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    响应压缩中间件（纯 ASGI）
+
+    只压缩单块响应体；流式响应（more_body=True）原样透传。
+    压缩后的表示使用不同的强 ETag（追加 -gzip / -br 后缀）；
+    304 响应回送客户端 If-None-Match 中缓存的那个表示的 ETag。
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = _choose_encoding(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match", "")
+        if encoding is None and not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if start_message["status"] == 304:
+                etag = headers.get("etag")
+                if etag:
+                    headers["ETag"] = cached_variant(if_none_match, etag)
+            if (
+                encoding is None
+                or message.get("more_body", False)
+                or start_message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def file_version(path: str) -> str:
+    """存储文件版本：任何写入都会改变 mtime_ns 或大小"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "missing"
+    return f"{st.st_ino}-{st.st_mtime_ns}-{st.st_size}"
+
+
+def make_etag(*parts) -> str:
+    """由若干片段派生强 ETag"""
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse_if_none_match(value: str) -> List[str]:
+    tags = []
+    for item in value.split(","):
+        tag = item.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        # 去掉压缩表示的后缀，和未压缩 ETag 比较
+        for suffix in ('-gzip"', '-br"'):
+            if tag.endswith(suffix):
+                tag = tag[: -len(suffix)] + '"'
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def cached_variant(if_none_match: Optional[str], etag: str) -> str:
+    """If-None-Match 中与 etag 对应的表示（可能带 -gzip / -br 后缀），没有时原样返回 etag"""
+    if etag.endswith('"'):
+        for item in (if_none_match or "").split(","):
+            tag = item.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in (etag, f'{etag[:-1]}-gzip"', f'{etag[:-1]}-br"'):
+                return tag
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags: Iterable[str] = _parse_if_none_match(if_none_match)
+    return any(tag == "*" or tag == etag for tag in tags)
+
+
+def cache_headers(etag: str) -> dict:
+    """需要每次校验、但可复用缓存的响应头"""
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
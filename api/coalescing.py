@@ -0,0 +1,52 @@
+"""
+在途请求合并（single-flight）
+多个编辑同时对同一商品点“生成”、或前端在代理超时后重试时，/api/generate 会发起完全相同的 LLM 调用。
+按请求内容的规范化哈希合并：第一个请求真正执行，其余相同请求等待同一个 future，拿到同一份结果。
+
+与结果缓存不同，这里只覆盖“第一个结果出来之前”的窗口：执行结束后键即移除，之后的请求重新执行。
+执行放在独立任务中，发起者断开连接不会取消其他等待者。
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+
+def flight_key(*parts: Any) -> str:
+    """任意可 JSON 序列化的部分 → 规范化哈希"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """
+    用法：
+        result = await single_flight.run(key, lambda: run_in_threadpool(work))
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield：某个等待者被取消时不影响共享的执行
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        total = self.executed + self.coalesced
+        return {
+            "inflight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 3) if total else 0.0,
+        }
@@ -3,10 +3,19 @@ FastAPI 后端服务入口
 封装现有GEO内容生成Agent，提供RESTful API
 """
 
-from fastapi import FastAPI
+import os
+import sys
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import generate, templates, articles
+# 项目根目录加入路径，以包形式导入 agents 下的公共模块
+SKUGEO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SKUGEO_ROOT)
+
+from routers import generate, templates, articles, products
+from caching import CompressionMiddleware
+from agents.tracing import get_tracer, span
 
 app = FastAPI(
     title="GEO Content Agent API",
@@ -21,12 +30,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# 响应压缩（br/gzip），小于阈值的响应不压缩
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("GEO_COMPRESS_MIN_SIZE", "1024")),
 )
 
+
+# 请求级链路追踪（GEO_TRACE_SAMPLE_RATE=0 时直接放行）
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not get_tracer().enabled:
+        return await call_next(request)
+    with span("http.server", method=request.method, path=request.url.path) as s:
+        response = await call_next(request)
+        s.set_attribute("http.status_code", response.status_code)
+        return response
+
+
 # 注册路由
 app.include_router(generate.router, prefix="/api", tags=["内容生成"])
 app.include_router(templates.router, prefix="/api", tags=["模板管理"])
 app.include_router(articles.router, prefix="/api", tags=["历史记录"])
+app.include_router(products.router, prefix="/api", tags=["商品管理"])
+
+
+@app.on_event("startup")
+def sync_templates():
+    # 启动时为新增或手工改过的模板补记修订，之后只在写接口中记录
+    templates.sync_template_revisions()
 
 
 @app.get("/")
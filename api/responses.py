@@ -0,0 +1,18 @@
+"""
+快速 JSON 响应
+文章列表等大响应体绕过 starlette 默认的 json.dumps，经 agents/serializer.py 序列化
+（安装 orjson 时走 orjson），输出紧凑 UTF-8。
+"""
+
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from agents.serializer import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """用法与 JSONResponse 相同；也可作为路由的 response_class"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
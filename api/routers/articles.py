@@ -3,14 +3,27 @@
 管理生成的文章历史
 """
 
-import json
 import os
+import sys
+import threading
 import uuid
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
+# 项目根目录加入路径，以包形式导入 agents 下的公共模块
+SKUGEO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, SKUGEO_ROOT)
+
+from agents.article_codec import compression_mode, get_article_codec
+from agents.dedupe import DEFAULT_MAX_DISTANCE, SimHashIndex, similarity, simhash
+from agents.product_identity import product_id
+from agents.serializer import dump_file, load_file
+from agents.text_index import InvertedIndex, make_snippet
+from caching import cache_headers, etag_matches, file_version, make_etag, not_modified
+from responses import FastJSONResponse
+
 router = APIRouter()
 
 # 历史记录存储路径
@@ -28,11 +41,19 @@ class ArticleCreate(BaseModel):
     strategy: str
     strategy_name: str
     content: str
+    product_spu: Optional[str] = None
+    # /api/generate 返回的商品身份 ID；未提供时按下列商品字段计算，与生成接口一致
+    product_id: Optional[str] = None
+    product_material: Optional[str] = None
+    product_color: Optional[str] = None
+    product_category: Optional[str] = None
 
 
 class Article(BaseModel):
     """文章记录"""
     id: str
+    product_id: Optional[str] = None
+    product_spu: Optional[str] = None
     product_name: str
     product_price: float
     strategy: str
@@ -41,35 +62,121 @@ class Article(BaseModel):
     created_at: str
 
 
+# 近重复检测：flag（默认，标记后保存）/ reject（返回409）/ off
+DEDUPE_MODE = os.environ.get("GEO_DEDUPE_MODE", "flag").lower()
+DEDUPE_MAX_DISTANCE = int(os.environ.get("GEO_DEDUPE_MAX_DISTANCE", DEFAULT_MAX_DISTANCE))
+
+_dedupe_index: Optional[SimHashIndex] = None
+_dedupe_lock = threading.Lock()
+
+# 全文检索索引（商品名 + 正文），首次检索时构建；
+# 同时保存结果展示与过滤所需的字段和（压缩的）正文，检索时不再读取 articles.json
+SEARCH_STORED_FIELDS = ("product_name", "strategy", "strategy_name", "created_at", "content", "content_z")
+_search_index: Optional[InvertedIndex] = None
+_search_lock = threading.Lock()
+
+
 def ensure_articles_file():
     """确保文章文件存在"""
     os.makedirs(os.path.dirname(ARTICLES_FILE), exist_ok=True)
     if not os.path.exists(ARTICLES_FILE):
-        with open(ARTICLES_FILE, "w", encoding="utf-8") as f:
-            json.dump([], f)
+        dump_file(ARTICLES_FILE, [])
     return ARTICLES_FILE
 
 
 def load_articles():
-    """加载所有文章"""
+    """
+    加载所有文章
+    压缩存储的记录只有 content_z，需要正文时用 article_content / get_article_codec().decode_record
+    """
     ensure_articles_file()
-    with open(ARTICLES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_file(ARTICLES_FILE)
 
 
 def save_articles(articles):
-    """保存文章"""
+    """保存文章（默认紧凑格式，GEO_JSON_PRETTY=1 时缩进；正文按 GEO_ARTICLE_COMPRESS 字典压缩）"""
     ensure_articles_file()
-    with open(ARTICLES_FILE, "w", encoding="utf-8") as f:
-        json.dump(articles, f, ensure_ascii=False, indent=2)
+    if compression_mode() != "off":
+        codec = get_article_codec()
+        articles = [codec.encode_record(a) for a in articles]
+    dump_file(ARTICLES_FILE, articles)
+
+
+def article_content(article) -> str:
+    """文章正文（压缩记录此时才解压）"""
+    return get_article_codec().content_of(article)
+
+
+def without_content(article):
+    """列表摘要：去掉正文，不解压"""
+    return {k: v for k, v in article.items() if k not in ("content", "content_z")}
+
+
+def article_product_id(article: ArticleCreate) -> str:
+    """新文章的商品身份 ID：与 /api/generate 对同一商品返回的 product_id 相同"""
+    if article.product_id:
+        return article.product_id
+    return product_id({
+        "name": article.product_name,
+        "material": article.product_material,
+        "color": article.product_color,
+        "mainCategory": article.product_category,
+    })
+
+
+def dedupe_group(article) -> str:
+    """近重复比较的分组键：同一商品（按商品身份 ID）的文章互相比较"""
+    return article.get("product_id") or product_id(article.get("product_name", ""))
+
+
+def article_fingerprint(article) -> int:
+    """读取文章指纹，旧记录没有时现算"""
+    stored = article.get("simhash")
+    if stored:
+        return int(stored, 16)
+    return simhash(article_content(article))
+
+
+def get_dedupe_index(articles) -> SimHashIndex:
+    """首次使用时从存量文章构建索引，之后随增删增量维护"""
+    global _dedupe_index
+    with _dedupe_lock:
+        if _dedupe_index is None:
+            index = SimHashIndex(DEDUPE_MAX_DISTANCE)
+            for a in articles:
+                index.add(a["id"], dedupe_group(a), article_fingerprint(a))
+            _dedupe_index = index
+        return _dedupe_index
+
+
+def get_search_index() -> InvertedIndex:
+    """首次使用时从存量文章构建全文索引，之后随增删增量维护"""
+    global _search_index
+    with _search_lock:
+        if _search_index is None:
+            index = InvertedIndex(stored_fields=SEARCH_STORED_FIELDS)
+            for a in load_articles():
+                # 对解压后的正文分词，存储字段保留原始记录（压缩记录只存 content_z）
+                index.add(a["id"], {**a, "content": article_content(a)}, stored=a)
+            _search_index = index
+        return _search_index
 
 
 @router.get("/articles")
 async def get_articles(
+    request: Request,
     strategy: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    include_content: bool = True
 ):
-    """获取文章列表"""
+    """
+    获取文章列表
+    只解压返回的这一页；include_content=false 时不返回正文，完全不解压
+    """
+    etag = make_etag("articles", file_version(ARTICLES_FILE), strategy, limit, include_content)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
     articles = load_articles()
     
     # 按策略过滤
@@ -79,16 +186,53 @@ async def get_articles(
     # 按时间倒序
     articles.sort(key=lambda x: x.get("created_at", ""), reverse=True)
     
-    return {"articles": articles[:limit], "total": len(articles)}
+    page = articles[:limit]
+    if include_content:
+        codec = get_article_codec()
+        page = [codec.decode_record(a) for a in page]
+    else:
+        page = [without_content(a) for a in page]
+    return FastJSONResponse({"articles": page, "total": len(articles)}, headers=cache_headers(etag))
+
+
+@router.get("/articles/search")
+async def search_articles(
+    q: str,
+    strategy: Optional[str] = None,
+    limit: int = 20
+):
+    """全文检索文章（商品名、正文），按相关度排序；只解压命中文章的正文生成摘要"""
+    index = get_search_index()
+    hits = index.search(q, limit=limit, where={"strategy": strategy} if strategy else None)
+    results = []
+    for doc_id, score in hits:
+        article = index.stored(doc_id)
+        if article is None:
+            continue
+        results.append({
+            "id": doc_id,
+            "product_name": article.get("product_name"),
+            "strategy": article.get("strategy"),
+            "strategy_name": article.get("strategy_name"),
+            "created_at": article.get("created_at"),
+            "score": round(score, 4),
+            "snippet": make_snippet(article_content(article), q),
+        })
+    
+    return {"query": q, "results": results, "total": len(results)}
 
 
 @router.get("/articles/{article_id}")
-async def get_article(article_id: str):
+async def get_article(request: Request, article_id: str):
     """获取单篇文章"""
+    etag = make_etag("article", file_version(ARTICLES_FILE), article_id)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
     articles = load_articles()
     for article in articles:
         if article.get("id") == article_id:
-            return article
+            return FastJSONResponse(get_article_codec().decode_record(article), headers=cache_headers(etag))
     raise HTTPException(status_code=404, detail="文章不存在")
 
 
@@ -99,6 +243,8 @@ async def create_article(article: ArticleCreate):
     
     new_article = {
         "id": str(uuid.uuid4()),
+        "product_id": article_product_id(article),
+        "product_spu": article.product_spu,
         "product_name": article.product_name,
         "product_price": article.product_price,
         "strategy": article.strategy,
@@ -107,10 +253,27 @@ async def create_article(article: ArticleCreate):
         "created_at": datetime.now().isoformat()
     }
     
+    duplicate = None
+    if DEDUPE_MODE != "off":
+        index = get_dedupe_index(articles)
+        fingerprint = simhash(article.content)
+        group = dedupe_group(new_article)
+        nearest = index.nearest(group, fingerprint)
+        if nearest:
+            duplicate = {"article_id": nearest[0], "distance": nearest[1], "similarity": similarity(nearest[1])}
+            if DEDUPE_MODE == "reject":
+                raise HTTPException(status_code=409, detail={"message": "与已有文章高度相似", "duplicate": duplicate})
+            new_article["near_duplicate_of"] = nearest[0]
+        new_article["simhash"] = f"{fingerprint:016x}"
+        index.add(new_article["id"], group, fingerprint)
+    
     articles.append(new_article)
     save_articles(articles)
+    if _search_index is not None:
+        stored = get_article_codec().encode_record(new_article) if compression_mode() != "off" else new_article
+        _search_index.add(new_article["id"], new_article, stored=stored)
     
-    return {"success": True, "article": new_article}
+    return {"success": True, "article": new_article, "duplicate": duplicate}
 
 
 @router.delete("/articles/{article_id}")
@@ -122,6 +285,10 @@ async def delete_article(article_id: str):
         if article.get("id") == article_id:
             deleted = articles.pop(i)
             save_articles(articles)
-            return {"success": True, "deleted": deleted}
+            if _dedupe_index is not None:
+                _dedupe_index.remove(article_id)
+            if _search_index is not None:
+                _search_index.remove(article_id)
+            return {"success": True, "deleted": get_article_codec().decode_record(deleted)}
     
     raise HTTPException(status_code=404, detail="文章不存在")
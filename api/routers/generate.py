@@ -5,19 +5,36 @@
 
 import sys
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 # 添加agents目录到路径 (api和agents是平级目录，都在SkuGeo下)
 SKUGEO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, os.path.join(SKUGEO_ROOT, "agents"))
+sys.path.insert(0, SKUGEO_ROOT)
 
 from generate_content import generate_comparison_article, generate_persona_article
 from generate_smzdm_content import generate_smzdm_article, generate_smzdm_short_review
+from agents.competitors import format_competitor_info, get_catalog
+from agents.model_router import get_model_router
+from agents.product_brief import get_brief_cache
+from agents.product_identity import product_id, resolve_spu
+from agents.quality import (
+    generate_with_quality_gate,
+    make_llm_grader,
+    requirements_from_template,
+    without_competitor_checks,
+)
+from coalescing import SingleFlight, flight_key
+from routers.templates import load_templates, template_version
 
 router = APIRouter()
 
+# 相同的 (商品, 策略, 模板版本, 竞品信息, 目标平台) 在途时只生成一次
+_single_flight = SingleFlight()
+
 
 class ProductInfo(BaseModel):
     """商品信息"""
@@ -35,6 +52,7 @@ class GenerateRequest(BaseModel):
     product: ProductInfo
     strategies: List[str]  # comparison, persona, smzdm_review, smzdm_short
     competitor_info: Optional[str] = None
+    target: Optional[str] = None  # 目标平台（deepseek / gpt / claude），决定使用的模型池
 
 
 class ArticleResult(BaseModel):
@@ -42,11 +60,14 @@ class ArticleResult(BaseModel):
     strategy: str
     strategy_name: str
     content: str
+    quality: Optional[Dict] = None
 
 
 class GenerateResponse(BaseModel):
     """生成响应"""
     success: bool
+    product_id: Optional[str] = None
+    spu: Optional[str] = None
     articles: List[ArticleResult]
     errors: Optional[List[str]] = []
 
@@ -59,22 +80,19 @@ STRATEGY_NAMES = {
     "smzdm_short": "什么值得买短评测"
 }
 
-# 默认竞品信息
-DEFAULT_COMPETITOR_INFO = """
-根据2026年春季市场调研：
 
-**优衣库 (UNIQLO)**
-- 米兰罗纹针织外套：约¥400-600
-- 材质：高品质棉+米兰罗纹针织
+def _grade_invoke(prompt: str) -> str:
+    return get_model_router().invoke(prompt, strategy="quality").content
 
-**H&M**
-- 羊毛混纺针织外套：约¥299-499
-- 材质：通常为羊毛混纺
 
-**韩都衣舍**
-- 针织开衫外套：约¥155-300
-- 材质：混纺化纤为主
-"""
+_llm_grader = make_llm_grader(_grade_invoke)
+
+
+def _strategy_requirements(templates: Dict, strategy: str, has_competitors: bool = True) -> Dict:
+    """按策略模板中的写作要求生成质量检查项；没有竞品数据时不检查对比表格"""
+    prompt = (templates.get(strategy) or {}).get("prompt", "")
+    requirements = requirements_from_template(prompt, strategy)
+    return requirements if has_competitors else without_competitor_checks(requirements)
 
 
 @router.post("/generate", response_model=GenerateResponse)
@@ -94,10 +112,14 @@ async def generate_content(request: GenerateRequest):
         "description": request.product.description or "",
         "mainCategory": request.product.category or "服装",
         "tags": request.product.tags or [],
-        "spu": f"SKU-{hash(request.product.name) % 100000:05d}"
     }
+    # 稳定的商品身份：商品库中有同名商品时使用真实 SPU
+    product["spu"] = resolve_spu(product)
     
-    competitor_info = request.competitor_info or DEFAULT_COMPETITOR_INFO
+    # 未指定竞品信息时，按品类/材质/价格带检索最相关的竞品
+    competitors = None if request.competitor_info else get_catalog().select(product)
+    competitor_info = request.competitor_info or format_competitor_info(competitors)
+    has_competitors = competitors is None or bool(competitors)
     
     # 默认用户画像
     persona_analysis = f"""
@@ -108,36 +130,55 @@ async def generate_content(request: GenerateRequest):
 - 预算区间：{int(request.product.price * 0.8)}-{int(request.product.price * 1.5)}元
 """
     
+    generators = {
+        "comparison": lambda: generate_comparison_article(product, competitor_info, target=request.target),
+        "persona": lambda: generate_persona_article(product, persona_analysis, target=request.target),
+        "smzdm_review": lambda: generate_smzdm_article(product, competitor_info, target=request.target),
+        "smzdm_short": lambda: generate_smzdm_short_review(product, target=request.target),
+    }
+    templates = load_templates()
+    
     for strategy in request.strategies:
         try:
-            content = ""
-            if strategy == "comparison":
-                content = generate_comparison_article(product, competitor_info)
-            elif strategy == "persona":
-                content = generate_persona_article(product, persona_analysis)
-            elif strategy == "smzdm_review":
-                content = generate_smzdm_article(product, competitor_info)
-            elif strategy == "smzdm_short":
-                content = generate_smzdm_short_review(product)
-            else:
+            generate = generators.get(strategy)
+            if generate is None:
                 errors.append(f"未知策略: {strategy}")
                 continue
             
+            # 本地结构检查不合格时自动重试，边界情况再交给 LLM 打分；
+            # 生成在线程池中执行，相同请求合并到同一次执行
+            key = flight_key(product, strategy, template_version(templates.get(strategy)), competitor_info, request.target)
+            content, quality = await _single_flight.run(key, lambda: run_in_threadpool(
+                generate_with_quality_gate,
+                generate,
+                _strategy_requirements(templates, strategy, has_competitors),
+                grader=_llm_grader
+            ))
+            
             articles.append(ArticleResult(
                 strategy=strategy,
                 strategy_name=STRATEGY_NAMES.get(strategy, strategy),
-                content=content
+                content=content,
+                quality=quality
             ))
         except Exception as e:
             errors.append(f"{strategy}: {str(e)}")
     
     return GenerateResponse(
         success=len(articles) > 0,
+        product_id=product_id(product),
+        spu=product["spu"],
         articles=articles,
         errors=errors if errors else None
     )
 
 
+@router.get("/generate/stats")
+async def get_generate_stats():
+    """在途生成请求合并统计"""
+    return {"coalescing": _single_flight.stats()}
+
+
 @router.get("/strategies")
 async def get_strategies():
     """获取可用策略列表"""
@@ -149,3 +190,15 @@ async def get_strategies():
             {"id": "smzdm_short", "name": "什么值得买短评测", "description": "简洁的好物分享风格"},
         ]
     }
+
+
+@router.get("/models/stats")
+async def get_model_stats():
+    """各模型池的健康状态、在途请求和延迟统计，各策略的 prompt 缓存命中率，对冲请求比例与胜率，以及商品简报缓存命中率"""
+    model_router = get_model_router()
+    return {
+        "pools": model_router.stats(),
+        "prompt_cache": model_router.cache_usage.stats(),
+        "hedging": model_router.hedge_stats(),
+        "product_brief": get_brief_cache().stats(),
+    }
@@ -0,0 +1,59 @@
+"""
+商品管理路由
+批量导入品牌方商品表（CSV/XLSX），查询商品库
+"""
+
+import os
+import sys
+from typing import Optional
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+# 项目根目录加入路径，以包形式导入 agents 下的公共模块
+SKUGEO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, SKUGEO_ROOT)
+
+from agents.ingest import import_products
+from agents.product_store import get_product_store
+
+router = APIRouter()
+
+
+@router.post("/products/import")
+async def import_product_file(file: UploadFile = File(...)):
+    """
+    导入商品表
+    流式解析上传文件，按批校验后写入商品库，返回导入报告（含吞吐）
+    """
+    try:
+        # 解析与写库都是阻塞操作，放到线程池执行
+        report = await run_in_threadpool(import_products, file.file, file.filename or "")
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+
+    return {"success": report["imported"] > 0, "report": report}
+
+
+@router.get("/products")
+async def get_products(
+    category: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """获取商品列表"""
+    store = get_product_store()
+    return {
+        "products": store.list(category=category, limit=limit, offset=offset),
+        "total": store.count(category=category),
+    }
+
+
+@router.get("/products/{spu}")
+async def get_product(spu: str):
+    """获取单个商品"""
+    product = get_product_store().get(spu)
+    if product is None:
+        raise HTTPException(status_code=404, detail="商品不存在")
+    return product
@@ -1,14 +1,18 @@
 """
 模板管理路由
-管理各策略的Prompt模板
+管理各策略的Prompt模板；每次修改/回滚都记录一条修订（见 api/template_revisions.py）
 """
 
-import json
 import os
 from typing import Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
+from agents.serializer import dump_file, load_file
+from caching import cache_headers, etag_matches, file_version, make_etag, not_modified
+from responses import FastJSONResponse
+from template_revisions import RevisionNotFound, TemplateRevisionStore, prompt_digest
+
 router = APIRouter()
 
 # 模板存储路径
@@ -17,6 +21,9 @@ TEMPLATES_FILE = os.path.join(
     "data",
     "templates.json"
 )
+REVISIONS_DIR = os.path.join(os.path.dirname(TEMPLATES_FILE), "template_revisions")
+
+_revisions = TemplateRevisionStore(REVISIONS_DIR)
 
 
 class Template(BaseModel):
@@ -31,6 +38,11 @@ class TemplateUpdate(BaseModel):
     prompt: str
 
 
+class TemplateRollback(BaseModel):
+    """模板回滚请求"""
+    revision_id: str
+
+
 def ensure_templates_file():
     """确保模板文件存在"""
     os.makedirs(os.path.dirname(TEMPLATES_FILE), exist_ok=True)
@@ -95,49 +107,128 @@ def ensure_templates_file():
 - 语气：真诚、不做作、像朋友推荐"""
             }
         }
-        with open(TEMPLATES_FILE, "w", encoding="utf-8") as f:
-            json.dump(default_templates, f, ensure_ascii=False, indent=2)
+        dump_file(TEMPLATES_FILE, default_templates)
     return TEMPLATES_FILE
 
 
 def load_templates():
-    """加载所有模板"""
+    """加载所有模板（只读，不记录修订）"""
     ensure_templates_file()
-    with open(TEMPLATES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_file(TEMPLATES_FILE)
+
+
+def sync_template_revisions():
+    """
+    没有修订记录或被手工改过的模板补记一条修订，并把 revision_id 写回 templates.json
+    只在服务启动和写操作（修改、回滚）前调用，读接口不改动存储，ETag 与返回内容一致
+    """
+    templates = load_templates()
+    changed = False
+    for strategy, template in templates.items():
+        revision = _revisions.commit(strategy, template.get("name", strategy), template.get("prompt", ""), action="sync")
+        if template.get("revision_id") != revision["id"]:
+            template["revision_id"] = revision["id"]
+            changed = True
+    if changed:
+        dump_file(TEMPLATES_FILE, templates)
+    return templates
+
+
+def template_version(template: Optional[dict]) -> str:
+    """模板当前修订 ID，模板修改或回滚后生成请求的合并键随之变化；尚未同步修订时退回内容指纹"""
+    template = template or {}
+    return template.get("revision_id") or prompt_digest(template.get("prompt", ""))
 
 
 def save_templates(templates):
     """保存模板"""
     ensure_templates_file()
-    with open(TEMPLATES_FILE, "w", encoding="utf-8") as f:
-        json.dump(templates, f, ensure_ascii=False, indent=2)
+    dump_file(TEMPLATES_FILE, templates)
 
 
 @router.get("/templates")
-async def get_templates():
+async def get_templates(request: Request):
     """获取所有模板"""
+    ensure_templates_file()
+    etag = make_etag("templates", file_version(TEMPLATES_FILE))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
     templates = load_templates()
-    return {"templates": list(templates.values())}
+    return FastJSONResponse({"templates": list(templates.values())}, headers=cache_headers(etag))
 
 
 @router.get("/templates/{strategy}")
-async def get_template(strategy: str):
+async def get_template(request: Request, strategy: str):
     """获取指定策略的模板"""
+    ensure_templates_file()
+    etag = make_etag("template", file_version(TEMPLATES_FILE), strategy)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
     templates = load_templates()
     if strategy not in templates:
         raise HTTPException(status_code=404, detail=f"模板不存在: {strategy}")
-    return templates[strategy]
+    return FastJSONResponse(templates[strategy], headers=cache_headers(etag))
 
 
 @router.put("/templates/{strategy}")
 async def update_template(strategy: str, update: TemplateUpdate):
     """更新模板"""
-    templates = load_templates()
+    templates = sync_template_revisions()
     if strategy not in templates:
         raise HTTPException(status_code=404, detail=f"模板不存在: {strategy}")
     
-    templates[strategy]["prompt"] = update.prompt
+    template = templates[strategy]
+    revision = _revisions.commit(strategy, template.get("name", strategy), update.prompt)
+    template["prompt"] = update.prompt
+    template["revision_id"] = revision["id"]
     save_templates(templates)
     
-    return {"success": True, "template": templates[strategy]}
+    return {"success": True, "template": template}
+
+
+@router.get("/templates/{strategy}/revisions")
+async def get_template_revisions(request: Request, strategy: str, limit: int = 50, include_prompt: bool = False):
+    """
+    模板修订列表（最新的在前）
+    默认只返回元数据；include_prompt=true 时展开每条修订的 prompt
+    """
+    templates = load_templates()
+    if strategy not in templates:
+        raise HTTPException(status_code=404, detail=f"模板不存在: {strategy}")
+    etag = make_etag("template_revisions", file_version(_revisions.log_path(strategy)), strategy, limit, include_prompt)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    revisions = _revisions.list(strategy, limit=limit, include_prompt=include_prompt)
+    return FastJSONResponse({"revisions": revisions}, headers=cache_headers(etag))
+
+
+@router.get("/templates/{strategy}/revisions/{revision_id}")
+async def get_template_revision(strategy: str, revision_id: str):
+    """获取任一修订的完整 prompt"""
+    try:
+        return _revisions.get(strategy, revision_id)
+    except RevisionNotFound:
+        raise HTTPException(status_code=404, detail=f"修订不存在: {revision_id}")
+
+
+@router.post("/templates/{strategy}/rollback")
+async def rollback_template(strategy: str, body: TemplateRollback):
+    """回滚到指定修订：以该修订的内容追加一条新修订，之前的历史保留"""
+    templates = sync_template_revisions()
+    if strategy not in templates:
+        raise HTTPException(status_code=404, detail=f"模板不存在: {strategy}")
+    try:
+        revision = _revisions.rollback(strategy, body.revision_id)
+    except RevisionNotFound:
+        raise HTTPException(status_code=404, detail=f"修订不存在: {body.revision_id}")
+
+    template = templates[strategy]
+    template["name"] = revision["name"]
+    template["prompt"] = revision["prompt"]
+    template["revision_id"] = revision["id"]
+    save_templates(templates)
+
+    return {"success": True, "template": template, "revision": revision}
@@ -0,0 +1,226 @@
+"""
+模板修订历史
+每次修改模板都追加一条修订，按策略存于 data/template_revisions/<strategy>.log（每行一条 JSON，只追加）：
+- 增量：修订默认只存相对上一修订的差异（复制上一版的 [起, 止) 区间 / 插入新文本）
+- 快照：每 SNAPSHOT_INTERVAL 条修订、或增量不比全文小时存完整 prompt；
+  读取任一修订最多回放 SNAPSHOT_INTERVAL - 1 个增量，不必从第一条修订开始回放
+- 回滚：以目标修订的内容追加一条新修订（存为快照，历史不改写），回滚本身也可以再回滚
+- 修订 ID：r<序号>-<内容指纹>，写入 templates.json 的 revision_id，
+  生成请求的合并键按它区分模板版本；手工改动 templates.json 后，服务启动或下一次修改/回滚时补记一条修订
+"""
+
+import hashlib
+import os
+import threading
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Union
+
+from agents.serializer import dumps, loads
+
+# 两次完整快照之间最多的增量修订数
+SNAPSHOT_INTERVAL = 8
+# 增量中每个复制区间的大致存储开销（字符），用于判断增量是否比全文小
+COPY_OP_COST = 12
+
+DeltaOp = Union[str, List[int]]
+
+
+def prompt_digest(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def make_delta(base: str, target: str) -> List[DeltaOp]:
+    """base → target 的增量：[起, 止] 表示复制 base 的区间，字符串表示插入"""
+    ops: List[DeltaOp] = []
+    matcher = SequenceMatcher(None, base, target, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(target[j1:j2])
+    return ops
+
+
+def apply_delta(base: str, ops: List[DeltaOp]) -> str:
+    return "".join(op if isinstance(op, str) else base[op[0]:op[1]] for op in ops)
+
+
+def _delta_cost(ops: List[DeltaOp]) -> int:
+    return sum(len(op) if isinstance(op, str) else COPY_OP_COST for op in ops)
+
+
+class RevisionNotFound(KeyError):
+    pass
+
+
+class TemplateRevisionStore:
+    """
+    用法：
+        store = TemplateRevisionStore(directory)
+        revision = store.commit("comparison", name, prompt)
+        prompt = store.get("comparison", revision["id"])["prompt"]
+        revision = store.rollback("comparison", revision_id)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # strategy → 按序号排列的修订记录（不含展开后的 prompt）
+        self._logs: Dict[str, List[Dict]] = {}
+        # strategy → 最新修订的 prompt，判断是否有改动、计算下一条增量都不用回放
+        self._heads: Dict[str, str] = {}
+
+    def log_path(self, strategy: str) -> str:
+        return os.path.join(self.directory, f"{strategy}.log")
+
+    def _records(self, strategy: str) -> List[Dict]:
+        records = self._logs.get(strategy)
+        if records is None:
+            records = []
+            path = self.log_path(strategy)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            records.append(loads(line))
+                        except ValueError:
+                            # 写到一半中断的末行
+                            continue
+            self._logs[strategy] = records
+        return records
+
+    def _append(self, strategy: str, record: Dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.log_path(strategy), "ab") as f:
+            f.write(dumps(record) + b"\n")
+        self._records(strategy).append(record)
+
+    def _materialize(self, records: List[Dict], position: int) -> str:
+        """从最近的快照开始回放增量，得到第 position 条修订的 prompt"""
+        start = position
+        while "prompt" not in records[start]:
+            start -= 1
+        prompt = records[start]["prompt"]
+        for record in records[start + 1:position + 1]:
+            prompt = apply_delta(prompt, record["delta"])
+        return prompt
+
+    def _head(self, strategy: str) -> Optional[str]:
+        records = self._records(strategy)
+        if not records:
+            return None
+        if strategy not in self._heads:
+            self._heads[strategy] = self._materialize(records, len(records) - 1)
+        return self._heads[strategy]
+
+    def _position(self, records: List[Dict], revision_id: str) -> int:
+        for position in range(len(records) - 1, -1, -1):
+            if records[position]["id"] == revision_id:
+                return position
+        raise RevisionNotFound(revision_id)
+
+    def _new_record(
+        self,
+        strategy: str,
+        name: str,
+        prompt: str,
+        action: str,
+        snapshot: bool = False,
+        **extra,
+    ) -> Dict:
+        records = self._records(strategy)
+        head = self._head(strategy)
+        seq = records[-1]["seq"] + 1 if records else 1
+        digest = prompt_digest(prompt)
+        record = {
+            "id": f"r{seq}-{digest}",
+            "seq": seq,
+            "strategy": strategy,
+            "name": name,
+            "action": action,
+            "digest": digest,
+            "size": len(prompt),
+            "changed_at": datetime.now().isoformat(),
+            "changed_by": None,
+        }
+        record.update(extra)
+
+        since_snapshot = 0
+        for previous in reversed(records):
+            if "prompt" in previous:
+                break
+            since_snapshot += 1
+        delta = None
+        if head is not None and not snapshot and since_snapshot + 1 < SNAPSHOT_INTERVAL:
+            delta = make_delta(head, prompt)
+            if _delta_cost(delta) >= len(prompt):
+                delta = None
+        if delta is None:
+            record["prompt"] = prompt
+        else:
+            record["delta"] = delta
+
+        self._append(strategy, record)
+        self._heads[strategy] = prompt
+        return record
+
+    @staticmethod
+    def _public(record: Dict, prompt: Optional[str] = None) -> Dict:
+        info = {k: record[k] for k in ("id", "seq", "strategy", "name", "action", "size", "changed_at", "changed_by")}
+        info["kind"] = "snapshot" if "prompt" in record else "delta"
+        if "rollback_of" in record:
+            info["rollback_of"] = record["rollback_of"]
+        if prompt is not None:
+            info["prompt"] = prompt
+        return info
+
+    def commit(self, strategy: str, name: str, prompt: str, action: str = "update") -> Dict:
+        """记录一次修改；prompt 与最新修订相同时不产生新修订，直接返回最新修订"""
+        with self._lock:
+            records = self._records(strategy)
+            if records and self._head(strategy) == prompt and records[-1]["name"] == name:
+                return self._public(records[-1])
+            if not records:
+                action = "create"
+            return self._public(self._new_record(strategy, name, prompt, action))
+
+    def list(self, strategy: str, limit: int = 50, include_prompt: bool = False) -> List[Dict]:
+        """最新的在前；include_prompt 时从区间内最早的快照顺序回放一次，展开每条修订的 prompt"""
+        with self._lock:
+            records = self._records(strategy)
+            start = max(0, len(records) - limit)
+            if not include_prompt:
+                return [self._public(r) for r in reversed(records[start:])]
+            prompts = []
+            prompt = self._materialize(records, start) if records else ""
+            for position in range(start, len(records)):
+                record = records[position]
+                if "prompt" in record:
+                    prompt = record["prompt"]
+                elif position > start:
+                    prompt = apply_delta(prompt, record["delta"])
+                prompts.append(self._public(record, prompt))
+            return list(reversed(prompts))
+
+    def get(self, strategy: str, revision_id: str) -> Dict:
+        """任一修订（含 prompt），最多回放 SNAPSHOT_INTERVAL - 1 个增量"""
+        with self._lock:
+            records = self._records(strategy)
+            position = self._position(records, revision_id)
+            return self._public(records[position], self._materialize(records, position))
+
+    def rollback(self, strategy: str, revision_id: str) -> Dict:
+        """以目标修订的内容追加一条快照修订并返回它（含 prompt）"""
+        with self._lock:
+            records = self._records(strategy)
+            position = self._position(records, revision_id)
+            target = records[position]
+            prompt = self._materialize(records, position)
+            record = self._new_record(
+                strategy, target["name"], prompt, "rollback", snapshot=True, rollback_of=revision_id
+            )
+            return self._public(record, prompt)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+本地伪 OpenAI 兼容服务
+供基准测试和离线验证使用，支持 /v1/chat/completions（含 stream）。
+
+可调参数：
+- latency_ms：首 token 前的固定延迟
+- tokens_per_sec：输出 token 速率（0 表示不限速）
+- output_tokens：每次回答的 token 数
+- error_rate：按概率返回 500，用于故障注入
+- reply：自定义回答文本（默认生成一段 Markdown 文章）
+- prefix_cache：模拟服务商的 prompt 前缀缓存，system 消息与之前某次请求相同时计为缓存命中，
+  在 usage.prompt_tokens_details.cached_tokens 中返回
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+DEFAULT_REPLY_LINES = [
+    "# 实测评测：这件外套值不值得买",
+    "",
+    "| 参数 | 本品 | 竞品A |",
+    "|-----|------|-------|",
+    "| 材质 | 100% 羊毛 | 羊毛混纺 |",
+    "",
+    "## 优缺点",
+    "- 优点：版型利落，面料挺括",
+    "- 缺点：需要干洗",
+    "",
+    "## 常见问题FAQ",
+    "**Q1：会起球吗？** 轻微。",
+    "**Q2：尺码偏大吗？** 正常。",
+    "**Q3：适合通勤吗？** 适合。",
+]
+
+
+class FakeLLMConfig:
+    """伪服务的运行参数，可在运行中修改"""
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        tokens_per_sec: float = 0.0,
+        output_tokens: int = 400,
+        error_rate: float = 0.0,
+        reply: Optional[str] = None,
+        responder: Optional[Callable[[List[Dict]], str]] = None,
+        prefix_cache: bool = True,
+    ):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.reply = reply
+        # responder(messages) -> 回答文本，优先级高于 reply
+        self.responder = responder
+        self.prefix_cache = prefix_cache
+        self._seen_prefixes = set()
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def cached_prefix_tokens(self, messages: List[Dict]) -> int:
+        """首条 system 消息见过则整段计为缓存命中"""
+        if not self.prefix_cache or not messages or messages[0].get("role") != "system":
+            return 0
+        prefix = str(messages[0].get("content", ""))
+        with self._lock:
+            hit = prefix in self._seen_prefixes
+            self._seen_prefixes.add(prefix)
+        return _count_tokens(prefix) if hit else 0
+
+    def render_reply(self, messages: List[Dict]) -> str:
+        if self.responder is not None:
+            return self.responder(messages)
+        if self.reply is not None:
+            return self.reply
+        body = "\n".join(DEFAULT_REPLY_LINES)
+        filler_tokens = max(0, self.output_tokens - len(body) // 2)
+        return body + "\n\n" + "面料细节实测" * (filler_tokens // 6)
+
+
+def _count_tokens(text: str) -> int:
+    # 粗略估算：中文约 1 字 1 token，其余约 4 字符 1 token
+    cjk = sum(1 for ch in text if "一" <= ch <= "鿿")
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def _make_handler(config: FakeLLMConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - 覆盖基类签名
+            pass
+
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            with config._lock:
+                config.requests += 1
+                inject_error = random.random() < config.error_rate
+                if inject_error:
+                    config.errors += 1
+
+            time.sleep(config.latency_ms / 1000.0)
+            if inject_error:
+                self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                return
+
+            messages = payload.get("messages", [])
+            reply = config.render_reply(messages)
+            prompt_tokens = sum(_count_tokens(str(m.get("content", ""))) for m in messages)
+            completion_tokens = _count_tokens(reply)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": config.cached_prefix_tokens(messages)},
+            }
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            model = payload.get("model", "fake-model")
+
+            if payload.get("stream"):
+                self._stream(completion_id, model, reply, usage)
+                return
+
+            if config.tokens_per_sec > 0:
+                time.sleep(completion_tokens / config.tokens_per_sec)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def _stream(self, completion_id: str, model: str, reply: str, usage: Dict) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            chunk_size = 16
+            delay = chunk_size / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+
+            def emit(delta: Dict, finish_reason: Optional[str] = None, extra: Optional[Dict] = None) -> None:
+                event = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                if extra:
+                    event.update(extra)
+                self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            try:
+                emit({"role": "assistant", "content": ""})
+                for i in range(0, len(reply), chunk_size):
+                    emit({"content": reply[i:i + chunk_size]})
+                    if delay:
+                        time.sleep(delay)
+                emit({}, "stop", {"usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端取消（如对冲请求的落败方）
+                pass
+            self.close_connection = True
+
+    return Handler
+
+
+class FakeLLMServer:
+    """在后台线程运行的伪 LLM 服务"""
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeLLMConfig()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self.config))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地伪 OpenAI 兼容服务")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=400)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+    )
+    server = FakeLLMServer(config, port=args.port)
+    print(f"🤖 Fake LLM 已启动: {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+离线基准测试
+使用本地伪 LLM 服务和 Zara 桩服务，不访问任何外部网络：
+1. generate：/api/generate 的 p50/p99 延迟与吞吐
+2. crawl：fetch_zara_products 的采集吞吐
+3. articles：文章存储在 1k/10k/100k 条记录下的读写耗时
+4. serialize：10k 篇文章负载的 JSON 序列化/反序列化耗时（标准库缩进 / 标准库紧凑 / 当前后端）
+
+结果写成 JSON（默认 benchmarks/results/<commit>.json），可用 --compare 与历史结果对比。
+
+用法：
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --suites crawl articles --sizes 1000 10000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<旧commit>.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SKUGEO_ROOT = os.path.dirname(BENCH_DIR)
+API_DIR = os.path.join(SKUGEO_ROOT, "api")
+
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SKUGEO_ROOT)
+
+from fake_llm import FakeLLMConfig, FakeLLMServer
+from stub_zara import StubZaraConfig, StubZaraServer
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: List[float], wall_s: float) -> Dict:
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies_ms), 3) if latencies_ms else 0.0,
+        "throughput_per_s": round(len(latencies_ms) / wall_s, 3) if wall_s > 0 else 0.0,
+    }
+
+
+def timed(func: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SKUGEO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_generate(args) -> Dict:
+    """/api/generate 端到端延迟（伪 LLM）"""
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        return {"skipped": f"缺少依赖: {e}"}
+
+    sys.path.insert(0, API_DIR)
+    import main as api_main
+
+    client = TestClient(api_main.app)
+    payload = {
+        "product": {
+            "name": "纯羊毛修身外套",
+            "price": 549,
+            "material": "100% 羊毛",
+            "color": "黑色",
+            "description": "修身版型，翻领设计",
+            "category": "外套",
+            "tags": ["通勤", "秋冬", "优雅"],
+        },
+        "strategies": args.strategies,
+    }
+
+    def one_request(i: int) -> float:
+        body = dict(payload, product=dict(payload["product"], name=f"{payload['product']['name']}-{i % args.distinct_products}"))
+        start = time.perf_counter()
+        response = client.post("/api/generate", json=body)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200 or not response.json().get("success"):
+            raise RuntimeError(f"generate failed: {response.status_code}")
+        return elapsed
+
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(one_request, i) for i in range(args.requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    wall = time.perf_counter() - start
+
+    result = summarize(latencies, wall)
+    result.update({"errors": errors, "concurrency": args.concurrency, "strategies": args.strategies})
+    return result
+
+
+def bench_crawl(args) -> Dict:
+    """fetch_zara_products 采集吞吐（Zara 桩服务）"""
+    try:
+        import httpx  # noqa: F401 - 统一客户端的依赖
+        from agents.fetch_zara_data import fetch_zara_products
+    except ImportError as e:
+        return {"skipped": f"缺少依赖: {e}"}
+
+    keywords = [f"关键词{i}" for i in range(args.crawl_keywords)]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        products = fetch_zara_products(category="女士", keywords=keywords, limit_per_keyword=args.crawl_page_size,
+                                       store=False)
+    wall = time.perf_counter() - start
+    return {
+        "keywords": len(keywords),
+        "products": len(products),
+        "wall_s": round(wall, 3),
+        "products_per_s": round(len(products) / wall, 3) if wall > 0 else 0.0,
+    }
+
+
+def _synthetic_article(i: int, content_chars: int) -> Dict:
+    strategies = ["comparison", "persona", "smzdm_review", "smzdm_short"]
+    strategy = strategies[i % len(strategies)]
+    body = f"# 商品{i % 997} 评测\n\n| 参数 | 本品 |\n|---|---|\n| 材质 | 羊毛 |\n\n"
+    body += ("实测面料手感细腻，版型利落。" * (content_chars // 14 + 1))[:content_chars]
+    return {
+        "id": str(uuid.UUID(int=i)),
+        "product_name": f"商品{i % 997}",
+        "product_price": 199.0 + i % 800,
+        "strategy": strategy,
+        "strategy_name": strategy,
+        "content": body,
+        "created_at": datetime.fromtimestamp(1_760_000_000 + i).isoformat(),
+    }
+
+
+def bench_articles(args) -> Dict:
+    """文章存储在不同规模下的读写耗时"""
+    try:
+        sys.path.insert(0, API_DIR)
+        from starlette.requests import Request
+        from routers import articles
+    except ImportError as e:
+        return {"skipped": f"缺少依赖: {e}"}
+
+    # 不带 If-None-Match 的空请求，测量完整读取路径
+    request = Request({"type": "http", "method": "GET", "path": "/api/articles", "headers": []})
+
+    results = {}
+    original_file = articles.ARTICLES_FILE
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for size in args.sizes:
+                articles.ARTICLES_FILE = os.path.join(tmp, f"articles_{size}.json")
+                articles.save_articles([_synthetic_article(i, args.content_chars) for i in range(size)])
+                target_id = str(uuid.UUID(int=size // 2))
+                repeat = max(1, args.store_repeat if size <= 10_000 else args.store_repeat // 5)
+
+                def create_and_delete():
+                    created = asyncio.run(articles.create_article(articles.ArticleCreate(
+                        product_name="基准商品", product_price=299.0, strategy="comparison",
+                        strategy_name="评测对比型", content="# 基准\n\n正文",
+                    )))
+                    asyncio.run(articles.delete_article(created["article"]["id"]))
+
+                results[str(size)] = {
+                    "file_bytes": os.path.getsize(articles.ARTICLES_FILE),
+                    "list": summarize(timed(lambda: asyncio.run(articles.get_articles(request, limit=50)), repeat), 1.0),
+                    "list_by_strategy": summarize(
+                        timed(lambda: asyncio.run(articles.get_articles(request, strategy="persona", limit=50)), repeat), 1.0
+                    ),
+                    "get_by_id": summarize(timed(lambda: asyncio.run(articles.get_article(request, target_id)), repeat), 1.0),
+                    "create_delete": summarize(timed(create_and_delete, repeat), 1.0),
+                }
+                for metric in results[str(size)].values():
+                    if isinstance(metric, dict):
+                        metric.pop("throughput_per_s", None)
+        finally:
+            articles.ARTICLES_FILE = original_file
+    return results
+
+
+def bench_serialize(args) -> Dict:
+    """文章列表 JSON 编解码：旧的标准库缩进写法、标准库紧凑写法与 agents/serializer.py 当前后端对比"""
+    from agents import serializer
+
+    payload = [_synthetic_article(i, args.content_chars) for i in range(args.serialize_size)]
+    variants = {
+        "stdlib_indent": lambda: json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"),
+        "stdlib_compact": lambda: json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        serializer.BACKEND: lambda: serializer.dumps(payload),
+    }
+    results = {"articles": len(payload), "backend": serializer.BACKEND}
+    for name, encode in variants.items():
+        data = encode()
+        decode = (lambda: serializer.loads(data)) if name == serializer.BACKEND else (lambda: json.loads(data))
+        results[name] = {
+            "bytes": len(data),
+            "dumps_ms": round(statistics.median(timed(encode, args.serialize_repeat)), 3),
+            "loads_ms": round(statistics.median(timed(decode, args.serialize_repeat)), 3),
+        }
+    return results
+
+
+def compare(current: Dict, baseline: Dict, prefix: str = "") -> List[str]:
+    """逐项列出 *_ms / *_per_s 指标的变化"""
+    lines = []
+    for key, value in current.items():
+        base = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            lines.extend(compare(value, base or {}, name))
+        elif isinstance(value, (int, float)) and isinstance(base, (int, float)) and base:
+            if key.endswith("_ms") or key.endswith("_per_s") or key.endswith("_s"):
+                lines.append(f"{name}: {base} → {value} ({(value - base) / base * 100:+.1f}%)")
+    return lines
+
+
+SUITES = {
+    "generate": bench_generate,
+    "crawl": bench_crawl,
+    "articles": bench_articles,
+    "serialize": bench_serialize,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GEO Content Agent 离线基准测试")
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--output", default=None, help="结果 JSON 路径")
+    parser.add_argument("--compare", default=None, help="对比的历史结果 JSON")
+    # 伪 LLM
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--llm-output-tokens", type=int, default=400)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    # generate
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct-products", type=int, default=40)
+    parser.add_argument("--strategies", nargs="+", default=["comparison", "smzdm_short"])
+    # crawl
+    parser.add_argument("--zara-latency-ms", type=float, default=20.0)
+    parser.add_argument("--crawl-keywords", type=int, default=10)
+    parser.add_argument("--crawl-page-size", type=int, default=10)
+    # articles
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--content-chars", type=int, default=1500)
+    parser.add_argument("--store-repeat", type=int, default=20)
+    # serialize
+    parser.add_argument("--serialize-size", type=int, default=10_000)
+    parser.add_argument("--serialize-repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    llm = FakeLLMServer(FakeLLMConfig(
+        latency_ms=args.llm_latency_ms,
+        tokens_per_sec=args.llm_tokens_per_sec,
+        output_tokens=args.llm_output_tokens,
+        error_rate=args.llm_error_rate,
+    )).start()
+    zara = StubZaraServer(StubZaraConfig(latency_ms=args.zara_latency_ms)).start()
+
+    # 必须在导入 Agent 模块前设置
+    os.environ.update({
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": llm.base_url,
+        "OPENAI_MODEL": "fake-model",
+        "ZARA_SEARCH_BASE_URL": zara.base_url,
+        "ZARA_ADMIN_BASE_URL": zara.base_url,
+        "ZARA_RECALL_TOKEN": "fake-recall-token",
+        "ZARA_ADMIN_TOKEN": "fake-admin-token",
+    })
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "suites": {},
+    }
+    try:
+        for name in args.suites:
+            print(f"⏱️  运行 {name} ...")
+            started = time.perf_counter()
+            report["suites"][name] = SUITES[name](args)
+            print(f"   完成，用时 {time.perf_counter() - started:.1f}s")
+        report["fake_llm"] = {"requests": llm.config.requests, "injected_errors": llm.config.errors}
+        report["stub_zara"] = dict(zara.config.counts)
+    finally:
+        llm.stop()
+        zara.stop()
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report["suites"], ensure_ascii=False, indent=2))
+    print(f"📄 结果已保存: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n📊 对比 {baseline.get('commit')} → {report['commit']}")
+        for line in compare(report["suites"], baseline.get("suites", {})):
+            print(f"   {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Zara 后端桩服务
+模拟 search/mixed、product/list、product/showTag 三个接口，返回确定性的合成商品，
+通过 ZARA_SEARCH_BASE_URL / ZARA_ADMIN_BASE_URL 指向本服务即可离线运行采集流程。
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+STYLE_TAGS = ["温柔风", "小香风", "清冷风", "盐系", "优雅", "休闲", "通勤", "约会穿搭", "松弛感"]
+SEASON_TAGS = ["春季", "秋冬", "春秋", "早春", "早秋"]
+MATERIALS = ["100% 羊毛", "70% 棉 30% 聚酯纤维", "100% 亚麻", "羊毛混纺", "100% 粘胶纤维"]
+CATEGORIES = [["外套", "大衣"], ["针织衫", "开衫"], ["连衣裙"], ["衬衫"], ["半身裙"]]
+COLORS = ["黑色", "米色", "灰色", "藏青色", "卡其色"]
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def make_product(keyword: str, index: int, gender: str = "WOMAN") -> Dict:
+    """按关键词和序号生成一个确定性的搜索结果行"""
+    seed = _seed(f"{keyword}:{index}")
+    categories = CATEGORIES[seed % len(CATEGORIES)]
+    spu = f"C{seed % 10**11:011d}"
+    return {
+        "spuId": spu,
+        "productId": spu,
+        "productName": f"{categories[0]}{keyword}款{index}",
+        "price": 199 + seed % 800,
+        "discountPrice": "",
+        "mainImage": f"https://static.example.com/zara/{spu}.jpg",
+        "description": f"{keyword}系列{categories[0]}，适合日常穿着。",
+        "material": MATERIALS[seed % len(MATERIALS)],
+        "color": COLORS[seed % len(COLORS)],
+        "categories": categories,
+        "tags": [STYLE_TAGS[seed % len(STYLE_TAGS)], SEASON_TAGS[seed % len(SEASON_TAGS)], keyword, gender],
+        "isNew": seed % 2,
+        "releaseDate": "2026-03-01",
+        "mainCategory": categories[0],
+    }
+
+
+class StubZaraConfig:
+    """桩服务参数"""
+
+    def __init__(self, latency_ms: float = 20.0, rows_per_page: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.rows_per_page = rows_per_page
+        self.counts: Dict[str, int] = {"search": 0, "product_list": 0, "show_tag": 0}
+        self._lock = threading.Lock()
+
+    def hit(self, endpoint: str) -> None:
+        with self._lock:
+            self.counts[endpoint] += 1
+
+
+def _make_handler(config: StubZaraConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - 覆盖基类签名
+            pass
+
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> Dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            time.sleep(config.latency_ms / 1000.0)
+            if path == "/api/search/mixed":
+                config.hit("search")
+                data = self._read_json()
+                size = config.rows_per_page or int(data.get("pageSize", 10))
+                gender = "WOMAN"
+                for f in data.get("filters") or []:
+                    if f.get("dimensionName") == "gender" and f.get("tagNames"):
+                        gender = f["tagNames"][0]
+                rows: List[Dict] = [make_product(data.get("keyword", ""), i, gender) for i in range(size)]
+                self._send_json(200, {"code": 200, "data": {"rows": rows, "total": len(rows)}})
+            elif path == "/admin-api/search/product/list":
+                config.hit("product_list")
+                data = self._read_json()
+                spu = data.get("spu", "")
+                self._send_json(200, {"code": 0, "data": {"list": [{"spu": spu, "sizes": ["S", "M", "L"]}], "total": 1}})
+            else:
+                self._send_json(404, {"code": 404, "msg": "not found"})
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            time.sleep(config.latency_ms / 1000.0)
+            if parsed.path == "/admin-api/search/product/showTag":
+                config.hit("show_tag")
+                product_id = parse_qs(parsed.query).get("productId", [""])[0]
+                seed = _seed(product_id)
+                self._send_json(200, {"code": 0, "data": {
+                    "productId": product_id,
+                    "mainCategory": CATEGORIES[seed % len(CATEGORIES)][0],
+                    "mainCategoryAi": CATEGORIES[seed % len(CATEGORIES)][0],
+                    "whiteList": f"{STYLE_TAGS[seed % len(STYLE_TAGS)]},{SEASON_TAGS[seed % len(SEASON_TAGS)]}",
+                    "whiteListAi": STYLE_TAGS[(seed >> 4) % len(STYLE_TAGS)],
+                    "blackList": "",
+                }})
+            else:
+                self._send_json(404, {"code": 404, "msg": "not found"})
+
+    return Handler
+
+
+class StubZaraServer:
+    """在后台线程运行的 Zara 桩服务"""
+
+    def __init__(self, config: Optional[StubZaraConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubZaraConfig()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self.config))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubZaraServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zara 后端桩服务")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    server = StubZaraServer(StubZaraConfig(latency_ms=args.latency_ms), port=args.port)
+    print(f"🧪 Zara 桩服务已启动: {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
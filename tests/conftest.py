@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 测试按 agents.xxx / api.xxx / benchmarks.xxx 导入，与各脚本的约定一致
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
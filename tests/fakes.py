@@ -0,0 +1,55 @@
+"""测试用的模型客户端替身（接口与 langchain ChatOpenAI 的 invoke/stream 一致）"""
+
+import time
+from typing import Dict, List, Optional
+
+
+class FakeMessage:
+    """AIMessage 的最小替身：content + usage_metadata，流式分块可以相加"""
+
+    def __init__(self, content: str, usage: Optional[Dict] = None):
+        self.content = content
+        self.usage_metadata = usage
+        self.response_metadata: Dict = {}
+
+    def __add__(self, other: "FakeMessage") -> "FakeMessage":
+        return FakeMessage(self.content + other.content, other.usage_metadata or self.usage_metadata)
+
+
+def usage(input_tokens: int, output_tokens: int, cached: int = 0) -> Dict:
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "input_token_details": {"cache_read": cached},
+    }
+
+
+class FakeChatClient:
+    """
+    按顺序返回 replies 中的结果（Exception 实例会被抛出），用完后重复最后一个
+    stream() 只有在 stream_usage=True 时才在最后一个分块带上 usage，与 ChatOpenAI 一致
+    """
+
+    def __init__(self, replies: List, delay: float = 0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.calls: List[Dict] = []
+
+    def _next(self, kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def invoke(self, messages, **kwargs):
+        return self._next(kwargs)
+
+    def stream(self, messages, stream_usage: bool = False, **kwargs):
+        reply = self._next(dict(kwargs, stream_usage=stream_usage))
+        middle = len(reply.content) // 2
+        yield FakeMessage(reply.content[:middle])
+        yield FakeMessage(reply.content[middle:], reply.usage_metadata if stream_usage else None)
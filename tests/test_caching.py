@@ -0,0 +1,63 @@
+"""响应压缩与 ETag：压缩表示的 ETag 在 304 时原样回送"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("starlette")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from caching import CompressionMiddleware, cached_variant, etag_matches, make_etag  # noqa: E402
+
+ETAG = make_etag("article", "v1")
+BODY = b'{"content": "' + b"x" * 4096 + b'"}'
+
+
+async def app(scope, receive, send):
+    headers = dict(scope["headers"])
+    if etag_matches(headers.get(b"if-none-match", b"").decode(), ETAG):
+        await send({"type": "http.response.start", "status": 304,
+                    "headers": [(b"etag", ETAG.encode()), (b"cache-control", b"no-cache")]})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"etag", ETAG.encode())]})
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def request(headers):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    start = messages[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}
+
+
+def test_304_returns_the_compressed_variant_etag():
+    status, headers = request({"accept-encoding": "gzip"})
+    assert status == 200 and headers["content-encoding"] == "gzip"
+    cached = headers["etag"]
+    assert cached == ETAG[:-1] + '-gzip"'
+
+    status, headers = request({"accept-encoding": "gzip", "if-none-match": cached})
+    assert status == 304
+    assert headers["etag"] == cached
+
+
+def test_304_without_accept_encoding_keeps_identity_etag():
+    status, headers = request({"if-none-match": ETAG})
+    assert status == 304 and headers["etag"] == ETAG
+
+
+def test_cached_variant():
+    assert cached_variant('W/"a-br", "b"', '"a"') == '"a-br"'
+    assert cached_variant('"other"', '"a"') == '"a"'
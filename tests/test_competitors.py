@@ -0,0 +1,49 @@
+"""竞品检索：品类/材质命中、默认品类“服装”、字符串价格、无竞品时的检查项"""
+
+from agents.competitors import CompetitorCatalog, DEFAULT_CATALOG, format_competitor_info
+from agents.quality import requirements_from_template, without_competitor_checks
+
+
+def api_product(**fields) -> dict:
+    """与生成接口未填材质/品类时构造的商品一致"""
+    product = {"name": "针织外套", "price": 399, "material": "未知", "color": "未知", "mainCategory": "服装"}
+    product.update(fields)
+    return product
+
+
+def test_default_category_falls_back_to_whole_catalog():
+    picked = CompetitorCatalog(DEFAULT_CATALOG).select(api_product())
+    assert len(picked) == 4
+    # 价格带最近的排在前面
+    assert picked[0]["price"] == 399
+
+
+def test_same_category_wins():
+    product = api_product(name="亚麻衬衫", mainCategory="衬衫", material="100%亚麻", price=199)
+    picked = CompetitorCatalog(DEFAULT_CATALOG).select(product, k=3)
+    assert {row["category"] for row in picked} == {"衬衫"}
+    assert picked[0]["product"] == "高级亚麻衬衫"
+
+
+def test_uncovered_category_returns_nothing():
+    catalog = CompetitorCatalog(DEFAULT_CATALOG)
+    assert catalog.select(api_product(name="乐福鞋", mainCategory="鞋履")) == []
+    assert "不做竞品对比" in format_competitor_info([])
+
+
+def test_string_prices_are_parsed():
+    catalog = CompetitorCatalog([
+        {"brand": "H&M", "product": "基础T恤", "category": "T恤", "price": "¥59", "material": "100%棉"},
+        {"brand": "COS", "product": "T恤", "category": "T恤", "price": "价格待定", "material": "100%棉"},
+    ])
+    picked = catalog.select(api_product(mainCategory="T恤", price=79))
+    assert [row["price"] for row in picked] == [59.0, None]
+    assert "价格未知" in format_competitor_info(picked)
+
+
+def test_no_competitors_drops_table_check():
+    requirements = requirements_from_template("必须包含规格对比表格（与优衣库、H&M同类产品对比）", "comparison")
+    assert requirements["table"] is True
+    relaxed = without_competitor_checks(requirements)
+    assert "table" not in relaxed
+    assert relaxed["faq_min"] == requirements["faq_min"]
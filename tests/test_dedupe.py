@@ -0,0 +1,51 @@
+"""SimHash + 分段 LSH 近重复检测"""
+
+from agents.dedupe import SimHashIndex, hamming_distance, similarity, simhash
+
+ARTICLE = "\n".join(
+    f"## 第{i}段\n这件纯羊毛外套版型利落，面料挺括，适合秋冬通勤穿着，搭配针织衫和西裤都很合适。" for i in range(12)
+)
+
+
+def test_near_duplicate_is_found_within_group():
+    index = SimHashIndex(max_distance=6)
+    index.add("a", "product-1", simhash(ARTICLE))
+    edited = ARTICLE.replace("第11段", "第十一段")
+    match = index.nearest("product-1", simhash(edited))
+    assert match is not None and match[0] == "a"
+    assert similarity(match[1]) > 0.9
+    # 不同商品的文章互不比较
+    assert index.nearest("product-2", simhash(edited)) is None
+
+
+def test_unrelated_text_is_not_a_duplicate():
+    index = SimHashIndex(max_distance=6)
+    index.add("a", "g", simhash(ARTICLE))
+    other = "\n".join(f"第{i}条：亚麻衬衫透气凉快，夏天度假首选，机洗容易起皱需要熨烫。" for i in range(12))
+    assert index.nearest("g", simhash(other)) is None
+
+
+def test_remove_and_readd():
+    index = SimHashIndex(max_distance=3)
+    fingerprint = simhash(ARTICLE)
+    index.add("a", "g", fingerprint)
+    assert index.remove("a") and "a" not in index and len(index) == 0
+    assert index.query("g", fingerprint) == []
+    assert not index.remove("a")
+
+
+def test_lsh_recall_matches_brute_force():
+    import random
+
+    rng = random.Random(7)
+    base = rng.getrandbits(64)
+    index = SimHashIndex(max_distance=5)
+    fingerprints = {}
+    for i in range(200):
+        fp = base
+        for bit in rng.sample(range(64), rng.randint(0, 12)):
+            fp ^= 1 << bit
+        fingerprints[str(i)] = fp
+        index.add(str(i), "g", fp)
+    expected = sorted(d for d, fp in fingerprints.items() if hamming_distance(fp, base) <= 5)
+    assert sorted(d for d, _ in index.query("g", base)) == expected
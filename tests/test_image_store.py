@@ -0,0 +1,81 @@
+"""图片管线：内容寻址缓存与 pHash 分组（不依赖网络，Pillow 可选）"""
+
+import asyncio
+import os
+
+import pytest
+
+from agents import image_store
+from agents.image_store import ImageStore, image_file, phash_from_pixels
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.headers = {"content-type": "image/jpeg"}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self, images):
+        self.images = images
+        self.requests = []
+
+    async def get(self, url):
+        self.requests.append(url)
+        return FakeResponse(self.images[url])
+
+
+@pytest.fixture
+def no_pillow(monkeypatch):
+    # 不生成变体，只测缓存与图片字段
+    monkeypatch.setattr(image_store, "Image", None)
+
+
+def test_repeat_attach_makes_no_requests(tmp_path, no_pillow):
+    client = FakeClient({"https://img/a.jpg": b"a" * 64, "https://img/b.jpg": b"b" * 64})
+    products = [{"spu": "1", "image": "https://img/a.jpg"}, {"spu": "2", "image": "https://img/b.jpg"}]
+    asyncio.run(ImageStore(str(tmp_path), workers=1).attach(products, client=client))
+    assert len(client.requests) == 2
+
+    again = [{"spu": "1", "image": "https://img/a.jpg"}, {"spu": "2", "image": "https://img/b.jpg"}]
+    report = asyncio.run(ImageStore(str(tmp_path), workers=1).attach(again, client=client))
+    assert len(client.requests) == 2
+    assert report["cached"] == 2
+    assert image_file(again[0], directory=str(tmp_path)).endswith(again[0]["image_sha256"] + ".jpg")
+
+
+def test_phash_group_does_not_replace_product_image(tmp_path, no_pillow):
+    client = FakeClient({"https://img/black.jpg": b"black" * 16, "https://img/beige.jpg": b"beige" * 16})
+    store = ImageStore(str(tmp_path), workers=1)
+    black = {"spu": "1", "image": "https://img/black.jpg"}
+    asyncio.run(store.attach([black], client=client))
+    # 模拟灰度 pHash 把另一颜色的图片并入同一组
+    beige_sha = asyncio.run(store.fetch(["https://img/beige.jpg"], client=client))["https://img/beige.jpg"]
+    store._objects[beige_sha]["group"] = black["image_sha256"]
+
+    beige = {"spu": "2", "image": "https://img/beige.jpg"}
+    asyncio.run(store.attach([beige], client=client))
+    assert beige["image_group"] == black["image_sha256"]
+    assert beige["image_sha256"] == beige_sha
+    assert beige_sha in beige["image_file"]
+    with open(image_file(beige, directory=str(tmp_path)), "rb") as f:
+        assert f.read() == b"beige" * 16
+
+
+def test_phash_stable_under_brightness_change():
+    pixels = bytes((x * 7 + y * 3) % 256 for y in range(32) for x in range(32))
+    brighter = bytes(min(255, p + 10) for p in pixels)
+    other = bytes((x * y) % 256 for y in range(32) for x in range(32))
+    assert bin(phash_from_pixels(pixels) ^ phash_from_pixels(brighter)).count("1") <= 6
+    assert bin(phash_from_pixels(pixels) ^ phash_from_pixels(other)).count("1") > 6
+
+
+def test_empty_env_settings_use_defaults(tmp_path, monkeypatch):
+    for name in ("GEO_IMAGE_CONCURRENCY", "GEO_IMAGE_WORKERS", "GEO_IMAGE_DEDUPE_DISTANCE"):
+        monkeypatch.setenv(name, "")
+    store = ImageStore(str(tmp_path))
+    assert store.concurrency == 8
+    assert store.workers == (os.cpu_count() or 1)
@@ -0,0 +1,70 @@
+"""商品表导入：CSV 列映射、按列校验、跨批次查重、写入 SQLite 商品库"""
+
+import io
+
+import pytest
+
+from agents.ingest import import_products, map_columns, validate_batch
+from agents.product_identity import product_id
+from agents.product_store import ProductStore
+
+CSV = """商品编号,商品名称,售价,材质,颜色,品类,标签,备注
+A1,纯羊毛大衣,"¥1,299",100%羊毛,黑色,大衣,通勤/秋冬,x
+A2,亚麻衬衫,299元,100%亚麻,白色,衬衫,夏季,
+A1,重复的大衣,999,,,,,
+A3,,199,,,,,
+A4,价格缺失,待定,,,,,
+""".encode("utf-8")
+
+
+def test_map_columns():
+    mapping = map_columns(["SPU", "商品名称", "Price", "未知列"])
+    assert mapping == {0: "spu", 1: "name", 2: "price"}
+
+
+def test_import_csv_across_batches(tmp_path):
+    store = ProductStore(str(tmp_path / "products.db"))
+    report = import_products(io.BytesIO(CSV), "products.csv", store=store, batch_size=1)
+    assert report["rows"] == 5
+    assert report["imported"] == 2
+    assert report["rejected"] == 3
+    assert report["unmapped_columns"] == ["备注"]
+    coat = store.get("A1")
+    assert coat["name"] == "纯羊毛大衣" and coat["price"] == 1299.0
+    assert coat["tags"] == ["通勤", "秋冬"]
+    assert store.count() == 2 and store.count("衬衫") == 1
+
+
+def test_validate_batch_shares_seen_set():
+    seen = set()
+    valid, errors = validate_batch([(2, {"spu": "X", "name": "a", "price": "1"})], seen)
+    assert len(valid) == 1 and not errors
+    valid, errors = validate_batch([(3, {"spu": "X", "name": "b", "price": "2"})], seen)
+    assert not valid and errors[0]["row"] == 3
+
+
+def test_upsert_overwrites_and_lists(tmp_path):
+    store = ProductStore(str(tmp_path / "products.db"))
+    store.upsert_many([{"spu": "1", "name": "旧名", "price": 1, "mainCategory": "外套"}])
+    store.upsert_many(p for p in [{"spu": "1", "name": "新名", "price": 2, "mainCategory": "外套"}])
+    assert store.get("1")["name"] == "新名"
+    assert [p["spu"] for p in store.iter_products(batch_size=1)] == ["1"]
+    assert store.spu_for_identity(product_id("新名")) == "1"
+    assert store.spu_for_identity(product_id("旧名")) is None
+
+
+def test_import_xlsx(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["SPU", "Name", "Price", "Category"])
+    sheet.append(["B1", "针织开衫", 399.0, "开衫"])
+    sheet.append([1002, "羊毛大衣", "1299", "大衣"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    store = ProductStore(str(tmp_path / "products.db"))
+    report = import_products(buffer, "products.xlsx", store=store)
+    assert (report["imported"], report["rejected"]) == (2, 0)
+    assert store.get("1002")["price"] == 1299.0
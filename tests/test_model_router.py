@@ -0,0 +1,109 @@
+"""多模型路由：故障转移、熔断与半开试探、对冲请求的 usage 统计"""
+
+import threading
+import time
+
+import pytest
+
+from agents.model_router import (
+    FAILURE_THRESHOLD,
+    CircuitOpenError,
+    HedgePolicy,
+    ModelPool,
+    ModelRouter,
+    NoHealthyPoolError,
+)
+
+from fakes import FakeChatClient, FakeMessage, usage
+
+
+def test_failover_to_next_pool():
+    broken = ModelPool("a", "m", client=FakeChatClient([RuntimeError("500")]))
+    working = ModelPool("b", "m", client=FakeChatClient([FakeMessage("ok", usage(10, 2))]))
+    router = ModelRouter({"a": broken, "b": working}, {"*": {"*": ["a", "b"]}})
+    assert router.invoke("hi").content == "ok"
+    assert broken.errors == 1 and working.requests == 1
+
+
+def trip(pool: ModelPool) -> None:
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(RuntimeError):
+            pool.invoke("x")
+    assert pool.state() == "open"
+
+
+def test_open_circuit_rejects_without_calling():
+    client = FakeChatClient([RuntimeError("500")])
+    pool = ModelPool("a", "m", client=client)
+    trip(pool)
+    with pytest.raises(CircuitOpenError):
+        pool.invoke("x")
+    assert len(client.calls) == FAILURE_THRESHOLD
+    router = ModelRouter({"a": pool})
+    with pytest.raises(NoHealthyPoolError):
+        router.invoke("x")
+    assert len(client.calls) == FAILURE_THRESHOLD
+
+
+def test_half_open_lets_exactly_one_probe_through():
+    client = FakeChatClient([RuntimeError("500")] * FAILURE_THRESHOLD + [FakeMessage("ok")], delay=0.05)
+    pool = ModelPool("a", "m", client=client, max_concurrency=8)
+    trip(pool)
+    pool.open_until = time.monotonic() - 1
+    assert pool.state() == "half_open" and pool.healthy()
+
+    results = []
+
+    def call():
+        try:
+            results.append(pool.invoke("x").content)
+        except CircuitOpenError:
+            results.append("rejected")
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == ["ok"] + ["rejected"] * 4
+    assert len(client.calls) == FAILURE_THRESHOLD + 1
+    assert pool.state() == "closed"
+
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    pool = ModelPool("a", "m", client=FakeChatClient([RuntimeError("500")]))
+    trip(pool)
+    first_cooldown = pool.open_until - time.monotonic()
+    pool.open_until = time.monotonic() - 1
+    with pytest.raises(RuntimeError):
+        pool.invoke("x")
+    assert pool.state() == "open"
+    assert pool.open_until - time.monotonic() > first_cooldown
+
+
+def test_cache_usage_recorded_per_strategy():
+    pool = ModelPool("a", "m", client=FakeChatClient([FakeMessage("ok", usage(100, 10, cached=80))]))
+    router = ModelRouter({"a": pool})
+    router.invoke("x", strategy="comparison")
+    stats = router.cache_usage.stats()["comparison"]
+    assert (stats["input_tokens"], stats["cached_tokens"]) == (100, 80)
+
+
+def test_hedged_stream_reports_cached_tokens():
+    client = FakeChatClient([FakeMessage("streamed reply", usage(200, 30, cached=150))])
+    pool = ModelPool("a", "m", client=client)
+    router = ModelRouter({"a": pool}, hedging=HedgePolicy(enabled=True))
+    response = router.invoke("x", strategy="comparison")
+    assert response.content == "streamed reply"
+    assert client.calls[0]["stream_usage"] is True
+    stats = router.cache_usage.stats()["comparison"]
+    assert (stats["input_tokens"], stats["cached_tokens"]) == (200, 150)
+
+
+def test_hedge_fires_after_delay_and_takes_first_result():
+    slow = ModelPool("slow", "m", client=FakeChatClient([FakeMessage("slow")], delay=0.3))
+    fast = ModelPool("fast", "m", client=FakeChatClient([FakeMessage("fast", usage(10, 1))]))
+    policy = HedgePolicy(enabled=True, budget=1.0, fallback_delay=0.02)
+    router = ModelRouter({"slow": slow, "fast": fast}, {"*": {"*": ["slow", "fast"]}}, hedging=policy)
+    assert router.invoke("x").content == "fast"
+    assert policy.stats()["hedged"] == 1 and policy.stats()["hedge_wins"] == 1
@@ -0,0 +1,76 @@
+"""商品简报缓存：成功复用、失败短时缓存、并发只生成一次"""
+
+import threading
+
+import pytest
+
+from agents.product_brief import BriefCache, BriefUnavailable, parse_brief, render_brief
+
+PRODUCT = {"spu": "1", "name": "纯羊毛外套", "material": "100%羊毛", "mainCategory": "外套", "tags": []}
+BRIEF = {"selling_points": ["纯羊毛"], "materials": [], "care": ["干洗"], "fit": [], "audience": [], "cautions": []}
+
+
+def test_success_is_cached_on_disk(tmp_path):
+    calls = []
+    cache = BriefCache(str(tmp_path))
+    assert cache.get_or_create(PRODUCT, lambda p: calls.append(p) or BRIEF) == BRIEF
+    assert BriefCache(str(tmp_path)).get_or_create(PRODUCT, lambda p: calls.append(p) or BRIEF) == BRIEF
+    assert len(calls) == 1
+
+
+def test_failure_is_cached_for_ttl(tmp_path):
+    calls = []
+
+    def failing(product):
+        calls.append(product)
+        raise RuntimeError("upstream 500")
+
+    cache = BriefCache(str(tmp_path), failure_ttl=60)
+    with pytest.raises(RuntimeError):
+        cache.get_or_create(PRODUCT, failing)
+    for _ in range(3):
+        with pytest.raises(BriefUnavailable, match="upstream 500"):
+            cache.get_or_create(PRODUCT, failing)
+    assert len(calls) == 1
+    assert cache.stats()["failure_hits"] == 3
+
+
+def test_failure_expires(tmp_path):
+    cache = BriefCache(str(tmp_path), failure_ttl=0.01)
+    with pytest.raises(RuntimeError):
+        cache.get_or_create(PRODUCT, lambda p: (_ for _ in ()).throw(RuntimeError("boom")))
+    threading.Event().wait(0.02)
+    assert cache.get_or_create(PRODUCT, lambda p: BRIEF) == BRIEF
+
+
+def test_concurrent_strategies_share_one_failed_call(tmp_path):
+    calls, started = [], threading.Event()
+
+    def slow_failure(product):
+        calls.append(product)
+        started.set()
+        threading.Event().wait(0.05)
+        raise RuntimeError("timeout")
+
+    cache = BriefCache(str(tmp_path), failure_ttl=60)
+    errors = []
+
+    def run():
+        try:
+            cache.get_or_create(PRODUCT, slow_failure)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(errors) == ["BriefUnavailable"] * 3 + ["RuntimeError"]
+
+
+def test_parse_and_render():
+    brief = parse_brief('```json\n{"selling_points": "保暖", "care": ["干洗"]}\n```')
+    assert brief["selling_points"] == ["保暖"]
+    assert "**护理建议**\n- 干洗" in render_brief(brief)
@@ -0,0 +1,69 @@
+"""商品身份：文章存储与生成接口对同一商品得到同一个 product_id"""
+
+import os
+import sys
+
+import pytest
+
+from agents.product_identity import name_id, product_id, resolve_spu, synthetic_spu
+from agents.product_store import ProductStore
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate_product(name, material=None, color=None, category=None) -> dict:
+    """与 api/routers/generate.py 构造商品数据的方式一致"""
+    return {
+        "name": name,
+        "material": material or "未知",
+        "color": color or "未知",
+        "mainCategory": category or "服装",
+    }
+
+
+def test_name_only_identity_matches_generate_defaults():
+    assert product_id(generate_product("纯羊毛修身外套")) == product_id("纯羊毛修身外套")
+    assert product_id({"name": "ZARA 纯羊毛 修身外套！"}) == product_id("纯羊毛修身外套")
+
+
+def test_content_fields_distinguish_colourways():
+    black = generate_product("针织开衫", "100%羊毛", "黑色", "开衫")
+    beige = generate_product("针织开衫", "100%羊毛", "米色", "开衫")
+    assert product_id(black) != product_id(beige)
+    assert name_id(black) == name_id(beige)
+
+
+def test_resolve_spu_only_for_unique_match(tmp_path):
+    store = ProductStore(str(tmp_path / "products.db"))
+    store.upsert_many(iter([
+        {"spu": "A1", "name": "针织开衫", "material": "100%羊毛", "color": "黑色", "mainCategory": "开衫"},
+        {"spu": "A2", "name": "针织开衫", "material": "100%羊毛", "color": "米色", "mainCategory": "开衫"},
+    ]))
+    black = {"name": "针织开衫", "material": "100%羊毛", "color": "黑色", "mainCategory": "开衫"}
+    assert resolve_spu(black, store) == "A1"
+    # 只有商品名时对应两个 SPU，无法确定
+    assert resolve_spu({"name": "针织开衫"}, store) == synthetic_spu({"name": "针织开衫"})
+
+
+@pytest.mark.parametrize("fields", [
+    {},
+    {"material": "100%羊毛", "color": "黑色", "category": "大衣"},
+])
+def test_article_product_id_matches_generate(fields):
+    pytest.importorskip("fastapi")
+    sys.path.insert(0, os.path.join(ROOT_DIR, "api"))
+    from routers.articles import ArticleCreate, article_product_id
+
+    article = ArticleCreate(
+        product_name="纯羊毛大衣",
+        product_price=999,
+        strategy="comparison",
+        strategy_name="评测对比型",
+        content="正文",
+        product_material=fields.get("material"),
+        product_color=fields.get("color"),
+        product_category=fields.get("category"),
+    )
+    expected = product_id(generate_product("纯羊毛大衣", **fields))
+    assert article_product_id(article) == expected
+    assert article_product_id(article.model_copy(update={"product_id": "abc"})) == "abc"
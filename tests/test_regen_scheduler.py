@@ -0,0 +1,67 @@
+"""重新生成调度：预算按模型实际 usage 扣减，预估消耗取实测均值"""
+
+from datetime import datetime
+
+from agents import generate_content, generate_smzdm_content, model_router
+from agents.model_router import ModelPool, ModelRouter, metered_tokens
+from agents.regen_scheduler import STRATEGY_TOKEN_COST, DailyBudget, RegenScheduler, run_plan
+from agents.verify_visibility import VisibilityStore
+
+from fakes import FakeChatClient, FakeMessage, usage
+
+
+def make_router(replies):
+    return ModelRouter({"default": ModelPool("default", "fake", client=FakeChatClient(replies))})
+
+
+def test_metered_tokens_counts_reported_usage():
+    router = make_router([FakeMessage("a", usage(100, 20)), FakeMessage("b", usage(50, 5))])
+    with metered_tokens() as meter:
+        router.invoke("p1")
+        router.invoke("p2")
+    router.invoke("outside")
+    assert (meter.calls, meter.tokens) == (2, 175)
+
+
+def test_budget_learns_strategy_costs(tmp_path):
+    path = str(tmp_path / "budget.json")
+    budget = DailyBudget(limit=10000, path=path)
+    budget.charge(3000, "comparison", measured=True)
+    budget.charge(1000, "comparison", measured=True)
+    budget.charge(9999, "persona")  # 预估值不计入实测均值
+
+    reloaded = DailyBudget(limit=10000, path=path)
+    assert reloaded.spent == 13999
+    costs = reloaded.token_costs()
+    assert costs["comparison"] == 2000
+    assert costs["persona"] == STRATEGY_TOKEN_COST["persona"]
+
+
+def test_scheduler_uses_measured_costs(tmp_path):
+    products = [{"spu": "1", "name": "外套", "price": 399}]
+    scheduler = RegenScheduler(
+        products, freshness={}, visibility=VisibilityStore(str(tmp_path)),
+        strategies=["comparison"], now=datetime.now(), token_costs={"comparison": 1234},
+    )
+    assert scheduler.plan(10000)[0]["tokens"] == 1234
+
+
+def test_run_plan_charges_actual_usage(tmp_path, monkeypatch):
+    router = make_router([FakeMessage("# 评测\n正文", usage(800, 700))])
+    monkeypatch.setenv("GEO_PRODUCT_BRIEF", "0")
+    monkeypatch.setattr(model_router, "_default_router", router)
+    monkeypatch.setattr(generate_content, "router", router)
+    monkeypatch.setattr(generate_smzdm_content, "router", router)
+    saved = []
+    monkeypatch.setattr(generate_content, "save_articles", saved.extend)
+    monkeypatch.setattr(generate_smzdm_content, "save_smzdm_articles", saved.extend)
+
+    product = {"spu": "1", "name": "纯羊毛外套", "price": 599, "material": "100%羊毛", "mainCategory": "外套", "tags": []}
+    plan = [{"spu": "1", "strategy": "comparison", "tokens": 4500}, {"spu": "1", "strategy": "smzdm_short", "tokens": 2000}]
+    budget = DailyBudget(limit=100000, path=str(tmp_path / "budget.json"))
+    articles = run_plan(plan, {"1": product}, budget)
+
+    assert [a["tokens"] for a in articles] == [1500, 1500]
+    assert budget.spent == 3000
+    assert budget.token_costs()["smzdm_short"] == 1500
+    assert len(saved) == 2
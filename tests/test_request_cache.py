@@ -0,0 +1,76 @@
+"""Zara 请求缓存：新鲜/过期/未命中、空结果短缓存、错误返回体不缓存、异步刷新与 drain"""
+
+import asyncio
+import time
+
+from agents.request_cache import DiskBackend, RequestCache, cache_key
+
+ROWS = {"code": 200, "data": {"rows": [{"id": 1}]}}
+EMPTY = {"code": 200, "data": {"rows": []}}
+ERROR = {"code": 500, "msg": "busy"}
+
+
+def age(cache: RequestCache, endpoint: str, body: dict, seconds: float) -> None:
+    key = cache_key(endpoint, body)
+    entry = cache.backend.get(key)
+    entry["stored_at"] -= seconds
+    cache.backend.set(key, entry)
+
+
+def test_key_ignores_whitespace_and_width():
+    assert cache_key("search", {"keyword": "外套 "}) == cache_key("search", {"keyword": "外套"})
+    assert cache_key("search", {"keyword": "ＡＢ"}) == cache_key("search", {"keyword": "AB"})
+
+
+def test_fresh_hit_and_stale_refresh():
+    cache = RequestCache(ttls={"search": 60})
+    calls = []
+    loader = lambda: calls.append(1) or ROWS  # noqa: E731
+    assert cache.fetch("search", {"k": 1}, loader) == ROWS
+    assert cache.fetch("search", {"k": 1}, loader) == ROWS
+    assert len(calls) == 1
+
+    age(cache, "search", {"k": 1}, 120)
+    assert cache.fetch("search", {"k": 1}, loader) == ROWS
+    deadline = time.time() + 2
+    while len(calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 2
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_empty_results_use_negative_ttl():
+    cache = RequestCache(ttls={"search": 3600}, negative_ttl=10)
+    cache.fetch("search", {"k": 1}, lambda: EMPTY)
+    age(cache, "search", {"k": 1}, 30)
+    assert cache.lookup("search", {"k": 1})[1] == "stale"
+
+
+def test_error_bodies_are_not_cached(tmp_path):
+    cache = RequestCache(DiskBackend(str(tmp_path)))
+    assert cache.fetch("product", {"id": 1}, lambda: ERROR) == ERROR
+    assert cache.lookup("product", {"id": 1})[1] == "miss"
+    assert cache.stats()["uncached_errors"] == 1
+
+
+def test_async_refresh_is_drained():
+    cache = RequestCache(ttls={"search": 60})
+    refreshed = []
+
+    async def scenario():
+        async def first():
+            return ROWS
+
+        async def slow_refresh():
+            await asyncio.sleep(0.05)
+            refreshed.append(1)
+            return {"code": 200, "data": {"rows": [{"id": 2}]}}
+
+        await cache.afetch("search", {"k": 1}, first)
+        age(cache, "search", {"k": 1}, 120)
+        assert await cache.afetch("search", {"k": 1}, slow_refresh) == ROWS
+        await cache.drain()
+
+    asyncio.run(scenario())
+    assert refreshed == [1]
+    assert cache.lookup("search", {"k": 1})[2]["data"]["rows"] == [{"id": 2}]
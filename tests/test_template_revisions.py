@@ -0,0 +1,60 @@
+"""模板修订历史：增量/快照存储、任意修订回放、回滚"""
+
+import pytest
+
+from api.template_revisions import (
+    SNAPSHOT_INTERVAL,
+    RevisionNotFound,
+    TemplateRevisionStore,
+    apply_delta,
+    make_delta,
+)
+
+BASE = "你是一位专业的时尚评测博主。\n## 写作要求\n" + "".join(f"{i}. 要求第{i}条，内容要具体\n" for i in range(1, 9))
+
+
+def test_delta_round_trip():
+    target = BASE.replace("要求第3条", "要求第三条（已修改）") + "9. 新增要求\n"
+    assert apply_delta(BASE, make_delta(BASE, target)) == target
+
+
+def test_every_revision_materializes_and_snapshots_are_periodic(tmp_path):
+    store = TemplateRevisionStore(str(tmp_path))
+    prompts = [BASE + f"补充说明 v{i}\n" for i in range(SNAPSHOT_INTERVAL * 2 + 3)]
+    ids = [store.commit("comparison", "评测对比型", p)["id"] for p in prompts]
+
+    # 新开一个实例，从日志文件读取
+    reloaded = TemplateRevisionStore(str(tmp_path))
+    for revision_id, prompt in zip(ids, prompts):
+        assert reloaded.get("comparison", revision_id)["prompt"] == prompt
+    kinds = [r["kind"] for r in reversed(reloaded.list("comparison", limit=100))]
+    assert kinds[0] == "snapshot"
+    assert kinds.count("snapshot") >= len(prompts) // SNAPSHOT_INTERVAL
+    # 两个快照之间的增量不超过 SNAPSHOT_INTERVAL - 1 个
+    run = longest = 0
+    for kind in kinds:
+        run = 0 if kind == "snapshot" else run + 1
+        longest = max(longest, run)
+    assert longest <= SNAPSHOT_INTERVAL - 1
+    listed = reloaded.list("comparison", limit=5, include_prompt=True)
+    assert [r["prompt"] for r in listed] == list(reversed(prompts[-5:]))
+
+
+def test_unchanged_commit_is_a_no_op(tmp_path):
+    store = TemplateRevisionStore(str(tmp_path))
+    first = store.commit("persona", "用户画像", BASE)
+    assert first["action"] == "create"
+    assert store.commit("persona", "用户画像", BASE)["id"] == first["id"]
+    assert len(store.list("persona")) == 1
+
+
+def test_rollback_appends_a_snapshot(tmp_path):
+    store = TemplateRevisionStore(str(tmp_path))
+    first = store.commit("persona", "用户画像", BASE)
+    store.commit("persona", "用户画像", BASE + "新增\n")
+    rolled = store.rollback("persona", first["id"])
+    assert rolled["prompt"] == BASE
+    assert rolled["kind"] == "snapshot" and rolled["rollback_of"] == first["id"]
+    assert [r["action"] for r in store.list("persona")] == ["rollback", "update", "create"]
+    with pytest.raises(RevisionNotFound):
+        store.get("persona", "r99-missing")
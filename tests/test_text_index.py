@@ -0,0 +1,37 @@
+"""BM25 倒排索引：中文分词检索、存储字段与过滤、增量增删"""
+
+from agents.text_index import InvertedIndex, make_snippet, tokenize
+
+
+def build() -> InvertedIndex:
+    index = InvertedIndex(stored_fields=("product_name", "strategy"))
+    index.add("1", {"product_name": "纯羊毛大衣", "content": "羊毛面料保暖，版型挺括", "strategy": "comparison"})
+    index.add("2", {"product_name": "亚麻衬衫", "content": "亚麻透气，夏季通勤", "strategy": "persona"})
+    index.add("3", {"product_name": "羊毛针织衫", "content": "细腻羊毛，可机洗", "strategy": "persona"})
+    return index
+
+
+def test_search_ranks_name_matches_first():
+    hits = build().search("羊毛")
+    assert [doc_id for doc_id, _ in hits][:2] in (["1", "3"], ["3", "1"])
+    assert "2" not in [doc_id for doc_id, _ in hits]
+
+
+def test_match_all_and_where_filter():
+    index = build()
+    assert [d for d, _ in index.search("羊毛 机洗")] == ["3"]
+    assert [d for d, _ in index.search("羊毛", where={"strategy": "comparison"})] == ["1"]
+    assert index.stored("2") == {"product_name": "亚麻衬衫", "strategy": "persona"}
+
+
+def test_stored_override_and_remove():
+    index = InvertedIndex(stored_fields=("content_z",))
+    index.add("1", {"product_name": "外套", "content": "正文"}, stored={"content_z": "压缩正文"})
+    assert index.stored("1") == {"content_z": "压缩正文"}
+    assert index.remove("1") and index.stored("1") is None and index.search("外套") == []
+
+
+def test_tokenize_and_snippet():
+    assert "羊毛" in tokenize("Zara 纯羊毛大衣")
+    snippet = make_snippet("开头" * 50 + "纯羊毛面料" + "结尾" * 50, "羊毛", width=20)
+    assert "羊毛" in snippet and len(snippet) < 60
@@ -0,0 +1,77 @@
+"""效果验证：目标问题生成 + 对 benchmarks/fake_llm 伪服务的离线探测"""
+
+import asyncio
+import json
+import urllib.request
+
+import pytest
+
+from agents.competitors import DEFAULT_CATALOG
+from agents.verify_visibility import (
+    VisibilityStore,
+    brand_aliases,
+    build_target_prompts,
+    short_brand_name,
+    verify_product,
+)
+from benchmarks.fake_llm import FakeLLMConfig, FakeLLMServer
+
+CATEGORIES = sorted({row["category"] for row in DEFAULT_CATALOG}) + ["服装"]
+
+
+def _product(category: str) -> dict:
+    return {"spu": f"spu-{category}", "name": f"测试{category}", "mainCategory": category, "price": 399}
+
+
+def _http_ask(base_url: str):
+    """OpenAI 兼容的 /chat/completions 调用，只用标准库"""
+
+    def post(model_name: str, prompt: str) -> str:
+        body = json.dumps({"model": model_name, "messages": [{"role": "user", "content": prompt}]}).encode("utf-8")
+        request = urllib.request.Request(
+            f"{base_url}/chat/completions", data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())["choices"][0]["message"]["content"]
+
+    async def ask(model_name: str, prompt: str) -> str:
+        return await asyncio.to_thread(post, model_name, prompt)
+
+    return ask
+
+
+def test_short_brand_name():
+    assert short_brand_name("优衣库 (UNIQLO)") == "优衣库"
+    assert short_brand_name("H&M") == "H&M"
+    assert short_brand_name("Massimo Dutti") == "Massimo Dutti"
+    assert "UNIQLO" in brand_aliases("优衣库 (UNIQLO)")
+
+
+@pytest.mark.parametrize("category", CATEGORIES)
+def test_build_target_prompts_every_category(category):
+    prompts = build_target_prompts(_product(category))
+    intents = [p["intent"] for p in prompts]
+    assert intents.count("category_search") == 2
+    assert "budget_oriented" in intents
+    comparison = next(p["prompt"] for p in prompts if p["intent"] == "brand_comparison")
+    brands = [row["brand"] for row in DEFAULT_CATALOG if row["category"] == category] or ["优衣库"]
+    assert short_brand_name(brands[0]) in comparison
+    assert category in comparison
+
+
+def test_verify_every_category_against_fake_llm(tmp_path):
+    config = FakeLLMConfig(latency_ms=0, reply="推荐 Zara，其次是优衣库 (UNIQLO) 和 H&M。", prefix_cache=False)
+    store = VisibilityStore(str(tmp_path))
+    with FakeLLMServer(config) as server:
+        ask = _http_ask(server.base_url)
+        for category in CATEGORIES:
+            product = _product(category)
+            summary = asyncio.run(
+                verify_product(product, ask=ask, models=["fake-model"], repetitions=1, concurrency=4, rate=0, store=store)
+            )
+            probes = len(build_target_prompts(product))
+            assert summary["probes"] == summary["answered"] == probes
+            assert summary["brand_mention_rate"] == 1.0
+            assert summary["first_position_count"] == probes
+            assert len(store.history(product["spu"])) == probes
+    assert config.requests == sum(len(build_target_prompts(_product(c))) for c in CATEGORIES)
@@ -1,6 +1,5 @@
 from typing import Any, Dict, List, Optional
 from BrandMessage.base import BaseShopAPI
-import requests
 import pymysql
 import os
 from pymysql.cursors import DictCursor
@@ -15,9 +14,12 @@ except ModuleNotFoundError:  # pragma: no cover
     sys.path.append(str(Path(__file__).resolve().parent))
     from agents._env import load_dotenv
 
+from agents.tracing import span
+from agents.zara_client import ZaraError, get_zara_client, strip_product_prefix
+
 
 class ZaraShopAPI(BaseShopAPI):
-    """Zara 电商平台 API 实现"""
+    """Zara 电商平台 API 实现（HTTP 接口委托给 agents/zara_client.py 的统一客户端）"""
 
     def __init__(self):
         """
@@ -26,14 +28,8 @@ class ZaraShopAPI(BaseShopAPI):
         Args:
         """
         load_dotenv()
-        self._search_api = "https://search.moechat.cn/api/search/mixed"
-        self._product_list_api = "https://admin.moechat.cn/admin-api/search/product/list"
-        # 召回 token
-        self._recall_token = os.environ.get("ZARA_RECALL_TOKEN", "")
-        # 后台 token
-        self._token = os.environ.get("ZARA_ADMIN_TOKEN", "")
-        self._tag_api = "https://admin.moechat.cn/admin-api/search/product/showTag"
-        self._update_message_api = "https://admin.moechat.cn/admin-api/search/tag/update"
+        # 接口地址、token、连接池和请求缓存都由共享客户端持有
+        self._client = get_zara_client()
         self._config = {
             "db": {
                 "host": os.environ.get("ZARA_DB_HOST", ""),
@@ -47,32 +43,32 @@ class ZaraShopAPI(BaseShopAPI):
     @property
     def search_api(self) -> str:
         """搜索接口地址"""
-        return self._search_api
+        return self._client.settings.search_api
 
     @property
     def product_list_api(self) -> str:
         """商品列表接口地址"""
-        return self._product_list_api
+        return self._client.settings.product_list_api
 
     @property
     def token(self) -> str:
         """令牌"""
-        return self._token
+        return self._client.settings.token
     
     @property
     def recall_token(self) -> str:
         """召回令牌"""
-        return self._recall_token
+        return self._client.settings.recall_token
     
     @property
     def tag_api(self) -> str:
         """标签接口地址"""
-        return self._tag_api
+        return self._client.settings.tag_api
 
     @property
     def update_message_api(self) -> str:
         """标签更新接口地址"""
-        return self._update_message_api
+        return self._client.settings.update_message_api
 
     def get_search_results(self, keyword: str, category : str , pageSize=5, **kwargs) -> Dict[str, Any]:
         """
@@ -86,42 +82,14 @@ class ZaraShopAPI(BaseShopAPI):
         Returns:
             JSON 对象（dict）
         """
-        mapped = {
-            "男士" : "MAN",
-            "女士" : "WOMAN",
-            "儿童" : "KID",
-            "家居" : "HOME"
-        }
-        # TODO: 实现具体搜索逻辑
-        data = {
-            "keyword": keyword,
-            "pageSize": pageSize,
-            "pageNum": 1,
-            "handletype": "200",
-        }
-        if category:
-            data["filters"] = [{
-                "dimensionName" : "gender" ,
-                "tagNames" : [mapped[category]]
-            }]
-        
-        print(data)
-        if not self.recall_token:
-            raise BrandSearchException(
-                brand="zara",
-                keyword=keyword,
-                status_code=500,
-                response_text="缺少 ZARA_RECALL_TOKEN：请在 .env 或环境变量中配置"
-            )
-        result = requests.post(self.search_api, json=data, headers={"Authorization": self.recall_token})
-        if result.status_code == 200:
-            return result.json()
-        else:
+        try:
+            return self._client.search(keyword, category, page_size=pageSize)
+        except ZaraError as e:
             raise BrandSearchException(
                 brand="zara",
                 keyword=keyword,
-                status_code=result.status_code,
-                response_text=result.text
+                status_code=e.status_code,
+                response_text=e.response_text or str(e)
             )
 
     def get_product_details(self, product_id: str, **kwargs) -> Dict[str, Any]:
@@ -135,53 +103,25 @@ class ZaraShopAPI(BaseShopAPI):
         Returns:
             JSON 对象（dict）
         """
-        # TODO: 实现具体详情获取逻辑
-        data = {
-            "spu": product_id,
-            "pageNo" : 1,
-            "pageSize" : 10
-        }
-        if not self.token:
-            raise BrandProductDetailException(
-                brand="zara",
-                product_id=product_id,
-                status_code=500,
-                response_text="缺少 ZARA_ADMIN_TOKEN：请在 .env 或环境变量中配置"
-            )
-        result = requests.post(self.product_list_api, json=data, headers={"Authorization": self.token})
-        if result.status_code == 200:
-            return result.json()
-        else:
+        try:
+            return self._client.product_details(product_id)
+        except ZaraError as e:
             raise BrandProductDetailException(
                 brand="zara",
                 product_id=product_id,
-                status_code=result.status_code,
-                response_text=result.text
+                status_code=e.status_code,
+                response_text=e.response_text or str(e)
             )
     
     def get_tag_info(self, product_id: str, **kwargs) -> Dict[str, Any]:
-        data = {
-            "productId": "zara-new_" + product_id,
-        }
-        headers = {
-            "Authorization": self.token,
-        }
-        if not self.token:
-            raise BrandProductDetailException(
-                brand="zara",
-                product_id=product_id,
-                status_code=500,
-                response_text="缺少 ZARA_ADMIN_TOKEN：请在 .env 或环境变量中配置"
-            )
-        result = requests.get(self.tag_api, params=data, headers=headers)
-        if result.status_code == 200:
-            return result.json()
-        else:
+        try:
+            return self._client.tag_info(product_id)
+        except ZaraError as e:
             raise BrandProductDetailException(
                 brand="zara",
                 product_id=product_id,
-                status_code=result.status_code,
-                response_text=result.text
+                status_code=e.status_code,
+                response_text=e.response_text or str(e)
             )
 
     def update_blackList(self, tag : str, product_id : str, delete : bool = False,**kwargs) -> Dict[str, Any]:
@@ -199,9 +139,7 @@ class ZaraShopAPI(BaseShopAPI):
         process_flag: int = 1,
         **kwargs
     ) -> Dict[str, Any]:
-        spu_value = str(spu or "").strip()
-        if spu_value.startswith("zara-new_"):
-            spu_value = spu_value[len("zara-new_") :]
+        spu_value = strip_product_prefix(spu)
         product_id = f"zara-new_{spu_value}"
 
         tag_resp = {}
@@ -224,20 +162,15 @@ class ZaraShopAPI(BaseShopAPI):
         }
         payload[field_name] = multi_category or ""
 
-        headers = {
-            "Authorization": self.token,
-            "Content-Type": "application/json",
-            "tenant-id": "169",
-        }
-        result = requests.put(self.update_message_api, json=payload, headers=headers)
-        if result.status_code == 200:
-            return result.json()
-        raise BrandProductDetailException(
-            brand="zara",
-            product_id=spu_value,
-            status_code=result.status_code,
-            response_text=result.text
-        )
+        try:
+            return self._client.update_tag(payload)
+        except ZaraError as e:
+            raise BrandProductDetailException(
+                brand="zara",
+                product_id=spu_value,
+                status_code=e.status_code,
+                response_text=e.response_text or str(e)
+            )
 
     def get_top_words(self, weekly : bool = False, start : int = 0,category: str = "女士", **kwargs) -> List[Dict[str, Any]]:
         """
@@ -321,19 +254,22 @@ class ZaraShopAPI(BaseShopAPI):
         conn = None
         try:
             # 连接数据库
-            conn = pymysql.connect(
-                host=db_config["host"],
-                user=db_config["user"],
-                password=db_config["password"],
-                port=db_config["port"],
-                database=db_config["database"],
-                charset='utf8mb4'
-            )
+            with span("db.connect", db_system="mysql", host=db_config["host"]):
+                conn = pymysql.connect(
+                    host=db_config["host"],
+                    user=db_config["user"],
+                    password=db_config["password"],
+                    port=db_config["port"],
+                    database=db_config["database"],
+                    charset='utf8mb4'
+                )
             
             with conn.cursor(DictCursor) as cursor:
 
-                cursor.execute(sql, (category, start))
-                results = cursor.fetchall()
+                with span("db.query", db_system="mysql", statement="get_top_words", weekly=weekly, category=category) as s:
+                    cursor.execute(sql, (category, start))
+                    results = cursor.fetchall()
+                    s.set_attribute("rows", len(results))
                 
                         
                 words_list = [